@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: document boundary accuracy and speed on a labeled mixed stack
+
+Splits synthetic stacks of letters, invoices and bank statements whose true
+document starts are known, once with the previous even-page rule
+(reproduced below) and once with boundary scoring, vectorized and in its
+pure-Python fallback. Reports boundary precision, recall and F1, the share
+of documents reproduced exactly, and the time to split (page features are
+extracted once, outside the timing, as analyze_and_split caches them).
+
+Usage:
+    python3 bench_boundaries.py [--documents 100 1000 5000] [--seed 0] [--repeat 5]
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import boundaries
+from page_analysis import PageFeatures, analyze_page_format
+from synthetic import mixed_stack
+
+
+def legacy_split_points(features: List[PageFeatures]) -> List[int]:
+    """The even-page rule analyze_and_split used before boundary scoring"""
+    return [i for i, page in enumerate(features)
+            if i == 0 or (i % 2 == 0 and (page.page_num == 1 or page.opens_letter))]
+
+
+def python_split_points(features: List[PageFeatures]) -> List[int]:
+    numpy, boundaries.np = boundaries.np, None
+    try:
+        return boundaries.split_points(features)
+    finally:
+        boundaries.np = numpy
+
+
+METHODS = {
+    "legacy": legacy_split_points,
+    "boundaries": boundaries.split_points,
+    "boundaries_python": python_split_points,
+}
+
+
+def page_features(texts: List[str]) -> List[PageFeatures]:
+    features = []
+    for index, text in enumerate(texts):
+        analysis = analyze_page_format(None, text)
+        analysis['index'] = index
+        features.append(PageFeatures.from_analysis(analysis))
+    return features
+
+
+def score(predicted: List[int], truth: List[int], page_count: int) -> Dict:
+    """Boundary precision/recall/F1 (the first page excluded) and exact-document accuracy"""
+    found, expected = set(predicted) - {0}, set(truth) - {0}
+    hits = len(found & expected)
+    precision = hits / len(found) if found else 1.0
+    recall = hits / len(expected) if expected else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    spans = lambda starts: set(zip(starts, starts[1:] + [page_count]))
+    exact = len(spans(predicted) & spans(truth)) / len(truth)
+    return {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4),
+            "exact_documents": round(exact, 4)}
+
+
+def measure(documents: int, seed: int = 0, repeat: int = 5) -> Dict:
+    texts, truth = mixed_stack(documents, seed)
+    start = time.perf_counter()
+    features = page_features(texts)
+    feature_seconds = time.perf_counter() - start
+
+    methods = {}
+    for name, split in METHODS.items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            predicted = split(features)
+            timings.append(time.perf_counter() - start)
+        methods[name] = {
+            **score(predicted, truth, len(features)),
+            "seconds": round(min(timings), 5),
+            "per_page_us": round(min(timings) / len(features) * 1e6, 2),
+        }
+    return {"documents": documents, "pages": len(features),
+            "feature_seconds": round(feature_seconds, 4), "methods": methods}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Document boundary accuracy and speed benchmark')
+    parser.add_argument('--documents', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for documents in args.documents:
+        result = measure(documents, args.seed, args.repeat)
+        results.append(result)
+        summary = "  ".join(f"{name} F1 {m['f1']:.3f} {m['per_page_us']:.1f}us/page"
+                            for name, m in result['methods'].items())
+        print(f"{result['pages']:6d} pages  {summary}", file=sys.stderr)
+
+    report = {
+        "benchmark": "boundaries",
+        "python": platform.python_version(),
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-format regex/strptime extraction vs. the compiled engine
+
+Runs date extraction, date parsing and page-indicator detection over the
+page texts of a synthetic letter stack, once with the previous helpers
+(reproduced below) and once with extraction.py.
+
+Usage:
+    python3 bench_extraction.py [--pages 100 1000 5000] [--repeat 5]
+"""
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import extraction
+from synthetic import letter_page
+
+BODY = (
+    "Wir beziehen uns auf Ihr Schreiben vom 02.12.2025 und die Lieferung vom 15. Dezember 2025.\n"
+    "Zahlbar bis 2026-02-07. Kundennummer 4711, Rechnung Nr. 20260815.\n"
+)
+
+
+def legacy_extract_dates(text):
+    dates = []
+    dates.extend(re.findall(r'\b(\d{1,2}\.\d{1,2}\.\d{2,4})\b', text))
+    dates.extend(re.findall(r'\b(\d{4}-\d{2}-\d{2})\b', text))
+    dates.extend(re.findall(
+        r'\b((?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{4})\b',
+        text, re.IGNORECASE
+    ))
+    return list(set(dates))
+
+
+def legacy_parse_date(date_str):
+    german_months = {
+        'januar': 'January', 'februar': 'February', 'märz': 'March', 'april': 'April',
+        'mai': 'May', 'juni': 'June', 'juli': 'July', 'august': 'August',
+        'september': 'September', 'oktober': 'October', 'november': 'November', 'dezember': 'December'
+    }
+    date_lower = date_str.lower()
+    for de, en in german_months.items():
+        if de in date_lower:
+            date_str = date_str.lower().replace(de, en)
+            break
+    for fmt in ["%d.%m.%Y", "%d.%m.%y", "%Y-%m-%d", "%B %Y", "%b %Y", "%B. %Y", "%b. %Y",
+                "%d. %B %Y", "%d. %b %Y"]:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def legacy_extract_page_indicator(text):
+    for pattern in [r'(\d+)\s*/\s*(\d+)', r'[Pp]age\s+(\d+)\s+of\s+(\d+)', r'[Ss]eite\s+(\d+)\s+von\s+(\d+)']:
+        match = re.search(pattern, text)
+        if match:
+            return (int(match.group(1)), int(match.group(2)))
+    return (None, None)
+
+
+def run(texts, extract_dates, parse_date, extract_page_indicator):
+    for text in texts:
+        extract_page_indicator(text)
+        for found in extract_dates(text):
+            parse_date(found)
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Date and page-indicator extraction benchmark')
+    parser.add_argument('--pages', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for page_count in args.pages:
+        texts = [letter_page(i % 3 + 1, 3).replace("Sehr geehrte", BODY + "Sehr geehrte") for i in range(page_count)]
+        # The engine's indicator must agree with the old one on every page
+        assert [extraction.extract_page_indicator(t) for t in texts] == \
+            [legacy_extract_page_indicator(t) for t in texts]
+
+        legacy, legacy_median = best_of(args.repeat, lambda: run(
+            texts, legacy_extract_dates, legacy_parse_date, legacy_extract_page_indicator))
+        extraction.parse_date.cache_clear()
+        engine, engine_median = best_of(args.repeat, lambda: run(
+            texts, extraction.extract_dates, extraction.parse_date, extraction.extract_page_indicator))
+
+        results.append({
+            "pages": page_count,
+            "legacy_seconds": round(legacy, 5),
+            "engine_seconds": round(engine, 5),
+            "legacy_median": round(legacy_median, 5),
+            "engine_median": round(engine_median, 5),
+            "per_page_us": round(engine / page_count * 1e6, 2),
+            "speedup": round(legacy / engine, 2),
+        })
+        print(f"{page_count:6d} pages  legacy {legacy:8.4f}s  engine {engine:8.4f}s  x{legacy / engine:.2f}",
+              file=sys.stderr)
+
+    print(json.dumps({"benchmark": "extraction", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
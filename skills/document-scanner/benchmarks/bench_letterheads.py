@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: documents identified from known letterheads
+
+Replays a synthetic stream of mail from a fixed set of senders (letters
+and invoices, a few senders sending both, a long tail of rare senders)
+through the letterhead index as the scanner uses it: each document is
+looked up first; a confident, confirmed match is organized without the
+agent and not learned from, anything else goes to the agent, whose answer
+(the true sender and type) is recorded. Reports how many agent round-trips
+are left, the precision of auto-organized and pre-filled documents, and
+the time per lookup and per record.
+
+Usage:
+    python3 bench_letterheads.py [--documents 200 1000 5000] [--senders 30] [--seed 0]
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from letterheads import DEFAULT_LETTERHEAD_SETTINGS, LetterheadIndex, auto_organizable
+from page_analysis import analyze_page_format
+from synthetic import sender_stream
+
+
+def measure(documents: int, senders: int = 30, seed: int = 0) -> Dict:
+    stream = [(analyze_page_format(None, pages[0])['header_shingles'], sender, kind)
+              for pages, sender, kind in sender_stream(documents, senders, seed)]
+    settings = DEFAULT_LETTERHEAD_SETTINGS
+    counts = {"auto": 0, "auto_correct": 0, "prefilled": 0, "prefilled_correct": 0, "agent": 0}
+    lookup_seconds = record_seconds = 0.0
+
+    with tempfile.TemporaryDirectory() as workdir, LetterheadIndex(Path(workdir) / "letterheads.sqlite") as index:
+        for header, sender, kind in stream:
+            start = time.perf_counter()
+            match = index.match(header, settings)
+            lookup_seconds += time.perf_counter() - start
+            correct = bool(match) and (match['sender'], match['type']) == (sender, kind)
+
+            if auto_organizable(match, settings):
+                counts['auto'] += 1
+                counts['auto_correct'] += correct
+                continue
+            counts['agent'] += 1
+            if match and match['confidence'] >= settings['prefill']:
+                counts['prefilled'] += 1
+                counts['prefilled_correct'] += correct
+            start = time.perf_counter()
+            index.record(header, sender, kind, settings)
+            record_seconds += time.perf_counter() - start
+        letterheads = index.count()
+
+    return {
+        "documents": documents,
+        "senders": senders,
+        "letterheads": letterheads,
+        "agent_round_trips": counts['agent'],
+        "auto_organized": counts['auto'],
+        "auto_share": round(counts['auto'] / documents, 4),
+        "auto_precision": round(counts['auto_correct'] / counts['auto'], 4) if counts['auto'] else None,
+        "prefilled": counts['prefilled'],
+        "prefill_precision": round(counts['prefilled_correct'] / counts['prefilled'], 4)
+        if counts['prefilled'] else None,
+        "lookup_us": round(lookup_seconds / documents * 1e6, 1),
+        "record_us": round(record_seconds / max(1, counts['agent']) * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Letterhead identification benchmark')
+    parser.add_argument('--documents', type=int, nargs='+', default=[200, 1000, 5000])
+    parser.add_argument('--senders', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for documents in args.documents:
+        result = measure(documents, args.senders, args.seed)
+        results.append(result)
+        print(f"{documents:6d} docs  agent {result['agent_round_trips']:5d}  auto {result['auto_share']:.1%} "
+              f"(precision {result['auto_precision']})  prefilled {result['prefilled']} "
+              f"(precision {result['prefill_precision']})  lookup {result['lookup_us']:.0f}us",
+              file=sys.stderr)
+
+    report = {
+        "benchmark": "letterheads",
+        "python": platform.python_version(),
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
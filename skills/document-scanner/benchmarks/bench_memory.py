@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak memory of analyze_and_split as the stack grows
+
+Compares the streaming analyze_and_split (compact page features, page
+text spooled next to the page cache) with the previous implementation,
+which kept every page's analysis and text in memory, grouped the full
+dicts and joined each document's text into the result.
+
+Peaks are measured with tracemalloc on cold caches. PyPDF2's own parse of
+the PDF grows with the page count whichever way the pages are analyzed,
+so the parser's peak (open the PDF, extract every page, keep nothing) is
+measured too and the report shows what each implementation needs on top
+of it, per page.
+"""
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import page_analysis
+import scan_and_organize
+from extraction import extract_dates
+from bench_pipeline import redirect_staging
+from synthetic import letter_stack, write_text_pdf
+from PyPDF2 import PdfReader
+
+
+def legacy_analyze_and_split(pdf_path: Path) -> List[Dict]:
+    """analyze_and_split before streaming: whole analyses and texts in memory"""
+    reader = PdfReader(pdf_path)
+    cache = {i: page_analysis.analyze_page(page, i) for i, page in enumerate(reader.pages)}
+    page_analyses = [analysis for analysis in cache.values() if not analysis['is_blank']]
+
+    documents = []
+    current_doc = None
+    for i, analysis in enumerate(page_analyses):
+        page_num, total_pages_ind = analysis['page_indicator']
+        text = analysis['full_text'][:500].lower()
+        start_new = current_doc is None or (
+            i % 2 == 0 and (page_num == 1 or 'sehr geehrte' in text or 'guten tag' in text))
+        if start_new:
+            if current_doc:
+                documents.append(current_doc)
+            current_doc = {'pages': [], 'page_indicators': [], 'analyses': []}
+        current_doc['pages'].append(analysis['index'])
+        current_doc['page_indicators'].append((page_num, total_pages_ind))
+        current_doc['analyses'].append(analysis)
+    if current_doc:
+        documents.append(current_doc)
+
+    for doc in documents:
+        indicators = doc['page_indicators']
+        if all(num is not None for num, _ in indicators):
+            order = sorted(range(len(indicators)), key=lambda i: indicators[i][0])
+            doc['pages'] = [doc['pages'][i] for i in order]
+            doc['analyses'] = [doc['analyses'][i] for i in order]
+        doc['full_text'] = '\n'.join(a['full_text'] for a in doc['analyses'])
+        doc['dates'] = extract_dates(doc['full_text'])
+    return documents
+
+
+def parse_only(pdf_path: Path) -> None:
+    """The parser's share: open the PDF and extract every page's text"""
+    reader = PdfReader(pdf_path)
+    for page in reader.pages:
+        page.extract_text()
+
+
+def peak_bytes(fn: Callable, *args) -> int:
+    """Peak traced memory while fn runs; whatever it returns is kept alive until then"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def measure(pages: int, workdir: Path) -> Dict:
+    """Peaks in bytes for one stack of pages, each on cold caches"""
+    pdf = write_text_pdf(workdir / "stack.pdf", letter_stack(pages))
+    peaks = {}
+    for name, fn in (("parser", parse_only), ("legacy", legacy_analyze_and_split),
+                     ("streaming", scan_and_organize.analyze_and_split)):
+        redirect_staging(workdir / name)
+        page_analysis._readers.clear()
+        page_analysis._text_spools.clear()
+        peaks[name] = peak_bytes(fn, pdf)
+    return {
+        "pages": pages,
+        "peak_bytes": peaks,
+        "bytes_per_page_over_parser": {
+            name: round((peaks[name] - peaks["parser"]) / pages)
+            for name in ("legacy", "streaming")
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak memory of analyze_and_split by stack size')
+    parser.add_argument('--pages', type=int, nargs='+', default=[50, 100, 250, 500])
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for pages in args.pages:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = measure(pages, Path(tmp))
+        results.append(result)
+        peaks = result['peak_bytes']
+        print(f"{pages:5d} pages  parser {peaks['parser'] / 1e6:.1f} MB  "
+              f"legacy {peaks['legacy'] / 1e6:.1f} MB  streaming {peaks['streaming'] / 1e6:.1f} MB", file=sys.stderr)
+
+    report = {
+        "benchmark": "memory",
+        "python": platform.python_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
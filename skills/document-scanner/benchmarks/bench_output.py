@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: storage optimization of pending documents
+
+Writes pending documents as the scanner does after OCR (1-bit Flate page
+images of printed text under an invisible text layer, every fourth page a
+blank back side), then re-encodes them with the output optimizer. Reports
+the bytes before and after, the compression ratio, the average page size,
+the wall time and pages per second for each worker count, and what the
+saved bytes are worth in NAS transfer time at the given link speed.
+
+Usage:
+    python3 bench_output.py [--documents 8] [--pages 3] [--dpi 300] [--workers 1 0] [--max-page-kb 150]
+"""
+import sys
+import json
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from output_optimizer import DEFAULT_OPTIMIZE_SETTINGS, optimize_documents
+from page_analysis import resolve_workers
+from synthetic import letter_page, scan_bitmap, text_bitmap, write_image_pdf
+
+
+def measure(documents: int, pages: int = 3, dpi: int = 300, workers: int = 1,
+            max_page_kb: Optional[int] = None, link_mbps: float = 100.0, seed: int = 0) -> Dict:
+    settings = dict(DEFAULT_OPTIMIZE_SETTINGS, workers=workers)
+    if max_page_kb is not None:
+        settings['max_page_bytes'] = max_page_kb * 1024
+
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = []
+        for doc in range(documents):
+            bitmaps, texts = [], []
+            for page in range(pages):
+                number = doc * pages + page
+                blank = number % 4 == 3
+                bitmaps.append(scan_bitmap(False, dpi, seed + number) if blank else text_bitmap(dpi, seed + number))
+                texts.append("" if blank else letter_page(page + 1, pages, sender=f"Absender {doc}"))
+            paths.append(write_image_pdf(Path(workdir) / f"pending_bench_{doc:02d}.pdf", bitmaps, texts))
+
+        result = optimize_documents(paths, settings)
+
+    total_pages = documents * pages
+    seconds_per_byte = 8 / (link_mbps * 1e6)
+    return {
+        "documents": documents,
+        "pages": total_pages,
+        "dpi": dpi,
+        "workers": resolve_workers(workers),
+        "bytes_before": result["bytes_before"],
+        "bytes_after": result["bytes_after"],
+        "ratio": result["ratio"],
+        "page_kb_before": round(result["bytes_before"] / total_pages / 1024, 1),
+        "page_kb_after": round(result["bytes_after"] / total_pages / 1024, 1),
+        "pages_downsampled": sum(len(doc["pages_downsampled"]) for doc in result["documents"]),
+        "pages_over_budget": result["pages_over_budget"],
+        "seconds": result["seconds"],
+        "pages_per_second": round(total_pages / result["seconds"], 2) if result["seconds"] else None,
+        "transfer_seconds_saved": round((result["bytes_before"] - result["bytes_after"]) * seconds_per_byte, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Output optimization benchmark')
+    parser.add_argument('--documents', type=int, default=8)
+    parser.add_argument('--pages', type=int, default=3, help='Pages per document')
+    parser.add_argument('--dpi', type=int, nargs='+', default=[300])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 0], help='0 = one per core')
+    parser.add_argument('--max-page-kb', type=int, help='Per-page budget (default: the optimizer default)')
+    parser.add_argument('--link-mbps', type=float, default=100.0, help='NAS link speed for transfer estimates')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for dpi in args.dpi:
+        for workers in args.workers:
+            result = measure(args.documents, args.pages, dpi, workers, args.max_page_kb, args.link_mbps, args.seed)
+            results.append(result)
+            print(f"{dpi:4d} dpi  {result['workers']:2d} workers  {result['page_kb_before']:7.1f} -> "
+                  f"{result['page_kb_after']:6.1f} KB/page  ratio {result['ratio']:.2f}  "
+                  f"{result['seconds']:.2f}s ({result['pages_per_second']} pages/s)  "
+                  f"over budget {result['pages_over_budget']}", file=sys.stderr)
+
+    report = {
+        "benchmark": "output",
+        "python": platform.python_version(),
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
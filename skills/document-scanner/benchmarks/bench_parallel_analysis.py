@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serial vs. process-pool page analysis in analyze_and_split
+
+Usage:
+    python3 bench_parallel_analysis.py [--pages 20 60 200] [--workers 1 2 4 8]
+"""
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import page_analysis
+import scan_and_organize
+from synthetic import write_text_pdf, letter_stack
+
+
+def time_split(pdf_path: Path, workers: int) -> float:
+    # Start cold: no in-memory or sidecar features
+    page_analysis._page_cache.clear()
+    page_analysis._page_counts.clear()
+    start = time.perf_counter()
+    scan_and_organize.analyze_and_split(pdf_path, workers=workers)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel page-analysis benchmark')
+    parser.add_argument('--pages', type=int, nargs='+', default=[20, 60, 200])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    scan_and_organize.PAGE_CACHE_DIR = None
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for page_count in args.pages:
+            pdf_path = write_text_pdf(Path(tmp) / f"stack-{page_count}.pdf", letter_stack(page_count))
+            baseline = scan_and_organize.analyze_and_split(pdf_path)
+            serial = None
+            for workers in args.workers:
+                elapsed = time_split(pdf_path, workers)
+                serial = serial or elapsed
+                assert scan_and_organize.analyze_and_split(pdf_path, workers=workers) == baseline
+                results.append({
+                    "pages": page_count,
+                    "workers": workers,
+                    "seconds": round(elapsed, 4),
+                    "speedup": round(serial / elapsed, 2)
+                })
+                print(f"{page_count:5d} pages  {workers:2d} workers  {elapsed:8.3f}s  x{serial / elapsed:.2f}",
+                      file=sys.stderr)
+
+    print(json.dumps({"benchmark": "parallel_analysis", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the scan pipeline end to end on synthetic duplex stacks
+
+Runs front scan, back scan, merge_duplex, analyze_and_split,
+save_pending_documents, organize_document (every document) and sync_spool
+against stub scanline/ocrmypdf, timing each stage. Staging, caches and
+the archive live in a fresh temporary directory per run, so every run
+starts cold.
+
+Results can be saved and compared with an earlier run:
+    python3 bench_pipeline.py --pages 10 100 500 --output before.json
+    python3 bench_pipeline.py --pages 10 100 500 --compare before.json
+
+--compare exits with status 1 if any stage got slower than --tolerance.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+from PyPDF2 import PdfReader
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import page_analysis
+import scan_and_organize
+from stub_tools import install_stubs
+
+STAGES = ["scan_front", "scan_back", "merge_duplex", "analyze_and_split",
+          "save_pending_documents", "organize_document", "sync_spool"]
+
+
+def redirect_staging(workdir: Path) -> Path:
+    """Point every staging path of the scanner at workdir; returns the archive"""
+    staging = workdir / "scan-staging"
+    scan_and_organize.STAGING_DIR = staging
+    scan_and_organize.PENDING_DIR = staging / "pending"
+    scan_and_organize.PAGE_CACHE_DIR = staging / "page-cache"
+    scan_and_organize.OCR_CACHE_DIR = staging / "ocr-cache"
+    scan_and_organize.MANIFEST_FILE = staging / "pending.sqlite"
+    scan_and_organize.FINGERPRINT_FILE = staging / "fingerprints.sqlite"
+    scan_and_organize.LETTERHEAD_FILE = staging / "letterheads.sqlite"
+    scan_and_organize.SPOOL_DIR = staging / "spool"
+    scan_and_organize.JOBS_DIR = staging / "jobs"
+    scan_and_organize.LOCK_DIR = staging / "locks"
+    scan_and_organize.WATCH_STATUS_FILE = staging / "watch-status.json"
+    scan_and_organize.INGEST_LEDGER = staging / "ingested.sqlite"
+    scan_and_organize.PREFERENCES_FILE = workdir / "preferences.json"
+    page_analysis._page_cache.clear()
+    page_analysis._page_counts.clear()
+    archive = workdir / "archive"
+    archive.mkdir(parents=True)
+    return archive
+
+
+def run_pipeline(pages: int, workdir: Path, seed: int = 0, dpi: int = 150) -> Dict:
+    """One cold pass of the pipeline over a pages-sided stack; stage timings in seconds"""
+    archive = redirect_staging(workdir)
+    os.environ["PATH"] = install_stubs(workdir / "bin")
+    os.environ["SYNTHETIC_SCAN_PAGES"] = str(pages)
+    os.environ["SYNTHETIC_SCAN_SEED"] = str(seed)
+    os.environ["SYNTHETIC_SCAN_DPI"] = str(dpi)
+    staging = scan_and_organize.STAGING_DIR
+    timings = {}
+
+    def timed(stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    front = timed("scan_front", scan_and_organize.scan_documents, "front", "Synthetic Scanner", staging)
+    back = timed("scan_back", scan_and_organize.scan_documents, "back", "Synthetic Scanner", staging)
+    merged = timed("merge_duplex", scan_and_organize.merge_duplex, front, back, staging)
+    documents = timed("analyze_and_split", scan_and_organize.analyze_and_split, merged)
+    pending = timed("save_pending_documents", scan_and_organize.save_pending_documents, merged, documents)
+
+    def organize_all():
+        results = []
+        for doc in pending:
+            sender = doc['text_preview'].split("\n", 1)[0] or "Unknown"
+            date = doc['dates_found'][0] if doc['dates_found'] else None
+            results.append(scan_and_organize.organize_document(doc['id'], sender, date, "Rechnung", archive))
+        return results
+
+    organized = timed("organize_document", organize_all)
+    synced = timed("sync_spool", scan_and_organize.sync_spool)
+
+    return {
+        "pages": pages,
+        "merged_pages": len(PdfReader(merged).pages),
+        "documents": len(pending),
+        "organized": sum(1 for r in organized if r['status'] == 'organized'),
+        "written": synced.get('written', 0),
+        "stages": timings,
+    }
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """Stages slower than the baseline by more than tolerance (a fraction)"""
+    before = {r['pages']: r['stages'] for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        old = before.get(result['pages'])
+        if not old:
+            continue
+        for stage, seconds in result['stages'].items():
+            if stage in old and old[stage] > 0 and seconds > old[stage] * (1 + tolerance):
+                regressions.append(f"{result['pages']} pages {stage}: {old[stage]:.4f}s -> {seconds:.4f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan pipeline benchmark on synthetic stacks')
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 50, 100, 250, 500])
+    parser.add_argument('--repeat', type=int, default=3, help='Cold runs per size; the median is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dpi', type=int, default=150, help='Resolution of the synthetic scans')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    parser.add_argument('--compare', help='Earlier results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown per stage (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    results = []
+    for pages in args.pages:
+        runs = []
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as tmp:
+                runs.append(run_pipeline(pages, Path(tmp), args.seed, args.dpi))
+        stages = {stage: round(statistics.median(run['stages'][stage] for run in runs), 4) for stage in STAGES}
+        result = {key: value for key, value in runs[0].items() if key != 'stages'}
+        result["stages"] = stages
+        result["total_seconds"] = round(sum(stages.values()), 4)
+        results.append(result)
+        print(f"{pages:5d} pages  {result['documents']:4d} documents  " +
+              "  ".join(f"{stage} {seconds:.3f}s" for stage, seconds in stages.items()), file=sys.stderr)
+
+    report = {
+        "benchmark": "pipeline",
+        "python": platform.python_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    if args.compare:
+        regressions = compare(results, json.loads(Path(args.compare).read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: budgeted identification previews vs. plain truncation
+
+For every document of a synthetic mixed stack, compares the preview the
+agent reads with the previous truncations (the first 2000 characters saved
+by save_pending_documents, the first 1000 returned by list-pending): its
+size in characters and approximate tokens, and how many of the document's
+identifying facts it still contains (sender, first date, subject or title,
+IBAN, page count). Facts are found with their own patterns, not the
+preview's.
+
+Usage:
+    python3 bench_preview.py [--documents 100 1000] [--max-tokens 50 100 200] [--seed 0]
+"""
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from extraction import extract_dates
+from preview import DEFAULT_PREVIEW_SETTINGS, build_preview
+from synthetic import mixed_stack
+
+FACT_PATTERNS = {
+    "subject": re.compile(r'^(?:Betreff:.*|RECHNUNG Nr\. \d+|Kontoauszug.*)$', re.MULTILINE),
+    "iban": re.compile(r'IBAN CH\d{2}(?: \d{4}){3} \d{4} \d'),
+    "pages": re.compile(r'(?:Seite \d+ von \d+|\b\d/\d\b)'),
+}
+
+
+def identifying_facts(pages: List[str]) -> Dict[str, str]:
+    """The facts an identification needs, as they are written in the document"""
+    text = '\n'.join(pages)
+    facts = {"sender": pages[0].strip().split('\n')[0]}
+    dates = extract_dates(pages[0])
+    if dates:
+        facts["date"] = dates[0]
+    for name, pattern in FACT_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            facts[name] = match.group(0)
+    return facts
+
+
+def truncated(limit: int):
+    return lambda pages, settings: '\n'.join(pages)[:limit]
+
+
+def measure(documents: int, budgets: List[int], seed: int = 0) -> Dict:
+    texts, starts = mixed_stack(documents, seed)
+    docs = [texts[start:end] for start, end in zip(starts, starts[1:] + [len(texts)])]
+    facts = [identifying_facts(pages) for pages in docs]
+
+    methods = {"save_pending_2000": (truncated(2000), None), "list_pending_1000": (truncated(1000), None)}
+    for budget in budgets:
+        methods[f"preview_{budget}_tokens"] = (build_preview, dict(DEFAULT_PREVIEW_SETTINGS, max_tokens=budget))
+
+    full_chars = sum(len('\n'.join(pages)) for pages in docs)
+    results = {}
+    for name, (preview, settings) in methods.items():
+        start = time.perf_counter()
+        previews = [preview(pages, settings) for pages in docs]
+        seconds = time.perf_counter() - start
+        found = sum(value in text for text, doc_facts in zip(previews, facts) for value in doc_facts.values())
+        chars = sum(len(text) for text in previews)
+        results[name] = {
+            "mean_chars": round(chars / len(docs), 1),
+            "mean_tokens": round(chars / len(docs) / DEFAULT_PREVIEW_SETTINGS['chars_per_token'], 1),
+            "fact_recall": round(found / sum(len(doc_facts) for doc_facts in facts), 4),
+            "share_of_text": round(chars / full_chars, 4),
+            "per_document_us": round(seconds / len(docs) * 1e6, 1),
+        }
+    return {"documents": len(docs), "pages": len(texts),
+            "mean_document_chars": round(full_chars / len(docs), 1), "methods": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Identification preview size and recall benchmark')
+    parser.add_argument('--documents', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--max-tokens', type=int, nargs='+', default=[50, 100, 200])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for documents in args.documents:
+        result = measure(documents, args.max_tokens, args.seed)
+        results.append(result)
+        for name, m in result['methods'].items():
+            print(f"{documents:6d} docs  {name:20s} {m['mean_chars']:7.0f} chars  "
+                  f"recall {m['fact_recall']:.3f}  {m['per_document_us']:.0f}us/doc", file=sys.stderr)
+
+    report = {
+        "benchmark": "preview",
+        "python": platform.python_version(),
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
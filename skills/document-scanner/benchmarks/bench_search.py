@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: search latency of the archive index
+
+Builds an index of synthetic letters (OCR-sized pages of common and rare
+words) and times ranked queries against it. The common-word queries match
+most of the archive and show the worst case. Index build time is reported
+separately.
+
+Usage:
+    python3 bench_search.py [--pages 5000 50000] [--pages-per-doc 4] [--repeat 20]
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from archive_index import ArchiveIndex
+
+COMMON = ("Rechnung Betrag Zahlung faellig Konto Kunde Vertrag Bestellung Lieferung Datum "
+          "Seite Herren Damen freundlichen Gruessen Frist Mahnung Offerte Versicherung Police").split()
+QUERIES = ["Rechnung", "Absender 042", "Zahlung faellig", "Mahnung Frist", "wort01234"]
+
+
+def page_text(rng: random.Random, sender: str, words_per_page: int = 250) -> str:
+    """OCR-sized page: a letterhead plus common and rare words"""
+    words = [sender]
+    for _ in range(words_per_page):
+        words.append(rng.choice(COMMON) if rng.random() < 0.3 else f"wort{rng.randrange(20000):05d}")
+    return " ".join(words)
+
+
+def build_index(root: Path, page_count: int, pages_per_doc: int) -> float:
+    rng = random.Random(0)
+    start = time.perf_counter()
+    with ArchiveIndex(root / "index.sqlite") as index:
+        for doc in range(page_count // pages_per_doc):
+            sender = f"Absender {doc % 500:03d} AG"
+            path = root / "archive" / f"doc-{doc:06d}.pdf"
+            path.touch()
+            full_text = "\n".join(page_text(rng, sender) for _ in range(pages_per_doc))
+            index.add(path, full_text, sender, rng.choice(["Rechnung", "Mahnung", "Vertrag"]),
+                      f"20{20 + doc % 6}-0{1 + doc % 9}-1{doc % 9}", [], pages_per_doc)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive search benchmark')
+    parser.add_argument('--pages', type=int, nargs='+', default=[5000, 50000])
+    parser.add_argument('--pages-per-doc', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    results = []
+    for page_count in args.pages:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "archive").mkdir()
+            build = build_index(root, page_count, args.pages_per_doc)
+            with ArchiveIndex(root / "index.sqlite") as index:
+                for query in QUERIES:
+                    timings = []
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        found = index.search(query, limit=20)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    results.append({
+                        "pages": page_count,
+                        "query": query,
+                        "matches": found["total"],
+                        "median_ms": round(statistics.median(timings), 2),
+                        "max_ms": round(max(timings), 2),
+                        "build_seconds": round(build, 2),
+                    })
+                    print(f"{page_count:6d} pages  {query!r:28}  {found['total']:6d} hits  "
+                          f"{statistics.median(timings):8.2f} ms", file=sys.stderr)
+
+    print(json.dumps({"benchmark": "search", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CLI start-up cost of each command
+
+Runs scan_and_organize.py as the agent does, one process per command,
+under `python -X importtime`, and reports how long the command spent
+importing modules (beyond the interpreter's own start-up), its wall time,
+and whether it loaded the PDF stack. The scripts are copied into a
+throwaway workspace with cached scanners, stub scanline/ocrmypdf, a
+pending document already analyzed and an archive, so every command takes
+its normal path without touching the real staging area. organize runs with --wait so no
+background sync outlives the run.
+
+Each command has an import budget; light commands must not import PyPDF2
+or numpy at all. Exits with status 1 if any command is over budget.
+
+Usage:
+    python3 bench_startup.py [--commands list-scanners organize ...] [--repeat 5] [--scale 1.0]
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BENCHMARKS_DIR = Path(__file__).parent
+SCRIPTS_DIR = BENCHMARKS_DIR.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from stub_tools import install_stubs
+from synthetic import letter_page, write_text_pdf
+
+# Command -> (arguments, import budget in ms, may load the PDF stack)
+COMMANDS = {
+    "list-scanners": ([], 50, False),
+    "setup-check": ([], 50, False),
+    "sync": (["--status"], 60, False),
+    "watch": (["--status"], 60, False),
+    "search": (["Muster"], 60, False),
+    "list-pending": ([], 70, False),
+    # --wait also copies to the archive (a thread pool) and updates its search index
+    "organize": (["--sender", "Muster AG", "--date", "08.01.2026", "--type", "Rechnung", "--wait"], 90, False),
+}
+PDF_STACK = ("PyPDF2", "numpy", "PIL")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int]]:
+    """Top-level (module, cumulative microseconds) from -X importtime output"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit() or name.startswith("  "):
+            continue
+        imports.append((name.strip(), int(cumulative)))
+    return imports
+
+
+def run_cli(args: List[str], env: Dict) -> Tuple[Dict, List[Tuple[str, int]], float]:
+    """One CLI process; its JSON result, top-level imports and wall time in ms"""
+    start = datetime.now()
+    proc = subprocess.run([sys.executable, "-X", "importtime", *args], env=env, capture_output=True, text=True)
+    wall_ms = (datetime.now() - start).total_seconds() * 1000
+    try:
+        result = json.loads(proc.stdout)
+    except ValueError:
+        result = {"status": "crashed", "stderr": proc.stderr[-500:]}
+    return result, parse_importtime(proc.stderr), wall_ms
+
+
+def make_workspace(root: Path) -> Tuple[Path, Dict]:
+    """A copy of the scripts with preferences, a pending document and stub tools; returns the CLI and env"""
+    scripts = root / "skills" / "document-scanner" / "scripts"
+    shutil.copytree(SCRIPTS_DIR, scripts, ignore=shutil.ignore_patterns("__pycache__"))
+    archive = root / "archive"
+    archive.mkdir()
+    (root / "memory").mkdir()
+    (root / "memory" / "preferences.json").write_text(json.dumps({
+        "setup_complete": True,
+        "default_scanner": "Synthetic Scanner",
+        "default_output": str(archive),
+        "known_scanners": [{"name": "Synthetic Scanner", "last_seen": datetime.now().isoformat()}],
+    }))
+    write_text_pdf(root / "letter.pdf", [letter_page(1, 2), letter_page(2, 2)])
+    (root / "skills" / "scan-staging" / "pending").mkdir(parents=True)
+    env = dict(os.environ, PATH=install_stubs(root / "bin"))
+    # Measure with cached bytecode, as the CLI normally runs
+    for name in ("PYTHONPATH", "PYTHONDONTWRITEBYTECODE"):
+        env.pop(name, None)
+    return scripts / "scan_and_organize.py", env
+
+
+def measure(commands: List[str], repeat: int = 5, scale: float = 1.0) -> List[Dict]:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        cli, env = make_workspace(root)
+        pending = root / "skills" / "scan-staging" / "pending"
+        _, startup, _ = run_cli(["-c", "pass"], env)
+        interpreter = {name for name, _ in startup}
+        # Pending documents are analyzed when they are saved; list-pending does the same for this copy
+        shutil.copy(root / "letter.pdf", pending / "pending_listed.pdf")
+        run_cli([str(cli), "list-pending"], env)
+
+        results = []
+        for command in commands:
+            extra, budget, pdf_allowed = COMMANDS[command]
+            runs = []
+            # The first run may still compile bytecode; it isn't counted
+            for n in range(repeat + 1):
+                args = [command, *extra]
+                if command == "organize":
+                    # Same content as the listed document, so its page cache applies
+                    shutil.copy(root / "letter.pdf", pending / f"pending_bench{n}.pdf")
+                    args += ["--id", f"bench{n}"]
+                result, imports, wall_ms = run_cli([str(cli), *args], env)
+                imports = [(name, us) for name, us in imports if name not in interpreter]
+                runs.append((sum(us for _, us in imports) / 1000, wall_ms, result, imports))
+            import_ms, wall_ms, result, imports = min(runs[1:], key=lambda run: run[0])
+
+            pdf_stack = sorted({name.split(".")[0] for name, _ in imports} & set(PDF_STACK))
+            over = import_ms > budget * scale or (pdf_stack and not pdf_allowed)
+            results.append({
+                "command": command,
+                "status": result.get("status"),
+                "import_ms": round(import_ms, 1),
+                "budget_ms": round(budget * scale, 1),
+                "wall_ms": round(min(run[1] for run in runs[1:]), 1),
+                "modules": len(imports),
+                "pdf_stack": pdf_stack,
+                "slowest": [name for name, _ in sorted(imports, key=lambda item: -item[1])[:5]],
+                "within_budget": not over,
+            })
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CLI start-up benchmark per command')
+    parser.add_argument('--commands', nargs='+', choices=list(COMMANDS), default=list(COMMANDS))
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per command; the fastest is reported')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every budget (slow machines)')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    results = measure(args.commands, args.repeat, args.scale)
+    for r in results:
+        print(f"{r['command']:14s} {r['status']:8s} imports {r['import_ms']:6.1f}ms (budget {r['budget_ms']:.0f})  "
+              f"wall {r['wall_ms']:6.1f}ms  {'OVER BUDGET ' if not r['within_budget'] else ''}"
+              f"{' '.join(r['pdf_stack'])}", file=sys.stderr)
+
+    report = {
+        "benchmark": "startup",
+        "python": platform.python_version(),
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if not all(r['within_budget'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Stub external tools - offline stand-ins for scanline and ocrmypdf
+
+The stub scanline "scans" a synthetic duplex stack (synthetic.duplex_stack)
+into the -dir it is given, the front or back pass depending on the scan
+name, so scan_documents and everything after it run unchanged without a
+scanner. The stub ocrmypdf copies its input, which already carries a text
+layer. install_stubs() writes both into a bin directory and returns the
+PATH that puts them first.
+"""
+import os
+import sys
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).parent
+
+# Stack size, seed and resolution come from the environment so one install serves many runs
+SCANLINE = """
+import os
+from pathlib import Path
+sys.path.insert(0, {benchmarks!r})
+from synthetic import duplex_stack, write_scan_pdf
+args = sys.argv[1:]
+if '-list' in args:
+    print('* Synthetic Scanner')
+    sys.exit(0)
+name = args[-1]
+out = Path(args[args.index('-dir') + 1]) / name
+out.mkdir(parents=True, exist_ok=True)
+fronts, backs = duplex_stack(int(os.environ.get('SYNTHETIC_SCAN_PAGES', '10')),
+                             int(os.environ.get('SYNTHETIC_SCAN_SEED', '0')))
+sides = backs if name.startswith('back') else fronts
+write_scan_pdf(out / 'scan.pdf', sides, dpi=int(os.environ.get('SYNTHETIC_SCAN_DPI', '150')))
+"""
+
+OCRMYPDF = "shutil.copy(sys.argv[-2], sys.argv[-1])"
+
+
+def write_stub(bin_dir: Path, name: str, body: str) -> Path:
+    """Write an executable Python script named name into bin_dir"""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    path = bin_dir / name
+    path.write_text(f"#!{sys.executable}\nimport sys, shutil\n{body}\n")
+    path.chmod(0o755)
+    return path
+
+
+def install_stubs(bin_dir: Path) -> str:
+    """Write stub scanline and ocrmypdf; returns a PATH with bin_dir first"""
+    write_stub(bin_dir, "scanline", SCANLINE.format(benchmarks=str(BENCHMARKS_DIR)))
+    write_stub(bin_dir, "ocrmypdf", OCRMYPDF)
+    return f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
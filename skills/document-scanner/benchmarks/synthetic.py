@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Synthetic scan corpus - text PDFs that look like scanned letter stacks
+
+Pages carry a real text layer (Helvetica), so PyPDF2's extract_text and the
+page-grouping heuristics see the same kind of input as an OCR'd scan.
+"""
+import zlib
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PyPDF2 import PdfWriter
+from PyPDF2._page import PageObject
+from PyPDF2.generic import (
+    DecodedStreamObject, DictionaryObject, EncodedStreamObject, NameObject, NumberObject
+)
+
+A4_INCHES = (8.27, 11.69)
+
+LETTER = (
+    "Muster AG\nIndustriestrasse 10\n8400 Winterthur\n"
+    "Winterthur, 08.01.2026\n"
+    "Sehr geehrte Damen und Herren\n"
+    "Wir danken Ihnen fuer Ihre Bestellung und senden Ihnen die Rechnung.\n"
+    "Seite {page} von {total}"
+)
+
+
+def _escape(line: str) -> str:
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _helvetica() -> DictionaryObject:
+    return DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+        NameObject('/Encoding'): NameObject('/WinAnsiEncoding'),
+    })
+
+
+def _text_ops(text: str, render_mode: int = 0) -> str:
+    """Content stream drawing text line by line (render mode 3 = invisible, like an OCR layer)"""
+    ops = [f"BT /F1 11 Tf 14 TL {render_mode} Tr 50 800 Td"]
+    ops.extend(f"({_escape(line)}) Tj T*" for line in text.split('\n') if text)
+    ops.append("ET")
+    return "\n".join(ops)
+
+
+def write_text_pdf(path: Path, pages: List[str]) -> Path:
+    """Write a PDF with one Helvetica text page per entry ('' = blank page)"""
+    writer = PdfWriter()
+    font = _helvetica()
+    for text in pages:
+        page = PageObject.create_blank_page(None, 595, 842)
+        content = DecodedStreamObject()
+        content.set_data(_text_ops(text).encode('cp1252'))
+        page[NameObject('/Contents')] = content
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/F1'): font})
+        })
+        writer.add_page(page)
+
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+def letter_page(page: int, total: int, sender: str = "Muster AG") -> str:
+    """Text of one page of a German letter with a 'Seite x von y' indicator"""
+    return LETTER.replace("Muster AG", sender).format(page=page, total=total)
+
+
+BODY_LINE = "Gemaess unseren Unterlagen ist der folgende Betrag zur Zahlung faellig, Position {n}."
+
+
+def letter_stack(page_count: int, pages_per_letter: int = 2, body_lines: int = 40) -> List[str]:
+    """Page texts for a stack of consecutive multi-page letters
+
+    body_lines pads each page to roughly the text volume of an OCR'd A4 page.
+    """
+    body = "\n".join(BODY_LINE.format(n=n) for n in range(body_lines))
+    pages = []
+    letter = 0
+    while len(pages) < page_count:
+        sender = f"Absender {letter:03d} AG"
+        for n in range(1, pages_per_letter + 1):
+            text = letter_page(n, pages_per_letter, sender=sender)
+            pages.append(text.replace("\nSeite", f"\n{body}\nSeite") if body_lines else text)
+        letter += 1
+    return pages[:page_count]
+
+
+ENGLISH_LETTER = (
+    "Example Ltd\n12 High Street\nLondon EC1A 1BB\n"
+    "London, {day} {month_name} 2026\n"
+    "Dear Sir or Madam\n"
+    "Please find enclosed our invoice for your recent order.\n"
+    "Page {page} of {total}"
+)
+ENGLISH_BODY_LINE = "According to our records the following amount is now due for payment, item {n}."
+ENGLISH_MONTHS = ["January", "February", "March", "April", "May", "June",
+                  "July", "August", "September", "October", "November", "December"]
+
+
+def corpus_letters(count: int, seed: int = 0, body_lines: int = 20) -> List[List[str]]:
+    """Page texts of count German and English letters of 1-4 pages each"""
+    rng = np.random.default_rng(seed)
+    letters = []
+    for n in range(count):
+        total = int(rng.integers(1, 5))
+        day, month = int(rng.integers(1, 29)), int(rng.integers(1, 13))
+        if n % 3 == 2:
+            template = ENGLISH_LETTER.replace("Example Ltd", f"Sender {n:03d} Ltd")
+            template = template.replace("{day} {month_name}", f"{day} {ENGLISH_MONTHS[month - 1]}")
+            body = "\n".join(ENGLISH_BODY_LINE.format(n=i) for i in range(body_lines))
+            marker = "\nPage"
+        else:
+            template = LETTER.replace("Muster AG", f"Absender {n:03d} AG").replace("08.01.2026", f"{day:02d}.{month:02d}.2026")
+            body = "\n".join(BODY_LINE.format(n=i) for i in range(body_lines))
+            marker = "\nSeite"
+        pages = [template.format(page=page, total=total) for page in range(1, total + 1)]
+        letters.append([text.replace(marker, f"\n{body}{marker}") if body_lines else text for text in pages])
+    return letters
+
+
+def duplex_stack(page_count: int, seed: int = 0) -> Tuple[List[str], List[str]]:
+    """Front and back passes of a stack of page_count scanned sides ('' = blank back)
+
+    Most letters are printed one-sided, leaving blank backs; every fourth is
+    printed two-sided. Backs come in the order the flipped stack feeds them,
+    last sheet first, as merge_duplex expects.
+    """
+    sheets = max(1, page_count // 2)
+    fronts: List[str] = []
+    backs: List[str] = []
+    for n, letter in enumerate(corpus_letters(sheets, seed)):
+        if n % 4 == 3:
+            for i in range(0, len(letter), 2):
+                fronts.append(letter[i])
+                backs.append(letter[i + 1] if i + 1 < len(letter) else "")
+        else:
+            fronts.extend(letter)
+            backs.extend("" for _ in letter)
+        if len(fronts) >= sheets:
+            break
+    return fronts[:sheets], backs[:sheets][::-1]
+
+
+def write_scan_pdf(path: Path, sides: List[str], dpi: int = 50, seed: int = 0) -> Path:
+    """An image scan of the given sides with an OCR-style text layer ('' = blank side)"""
+    bitmaps = [scan_bitmap(bool(text), dpi=dpi, seed=seed + i) for i, text in enumerate(sides)]
+    return write_image_pdf(path, bitmaps, sides)
+
+
+def scan_bitmap(ink: bool, dpi: int = 100, seed: int = 0) -> np.ndarray:
+    """A mono A4 'scan' as a bool array (True = ink)
+
+    Blank sheets still carry a few dust specks and an edge shadow, like a
+    real ADF back side; inked sheets get rows of word-sized blobs.
+    """
+    rng = np.random.default_rng(seed)
+    height, width = int(A4_INCHES[1] * dpi), int(A4_INCHES[0] * dpi)
+    bitmap = np.zeros((height, width), dtype=bool)
+
+    # Edge shadow from the feeder and isolated specks
+    bitmap[:, :max(1, width // 100)] = True
+    specks = rng.integers(0, [height, width], size=(20, 2))
+    bitmap[specks[:, 0], specks[:, 1]] = True
+
+    if ink:
+        line_height = max(2, dpi // 8)
+        for top in range(height // 8, height - height // 8, line_height * 2):
+            left = width // 10
+            while left < width - width // 10:
+                word = int(rng.integers(dpi // 6, dpi // 2))
+                bitmap[top:top + line_height, left:left + word] = True
+                left += word + dpi // 12
+    return bitmap
+
+
+def text_bitmap(dpi: int = 300, seed: int = 0) -> np.ndarray:
+    """A mono A4 'scan' of a printed page as a bool array (True = ink)
+
+    Lines of letter-sized glyphs built from stems, bars, diagonals and bowls,
+    with ragged edges from the scanner's threshold; unlike scan_bitmap's
+    solid word blobs, this compresses about as a real text scan does.
+    """
+    rng = np.random.default_rng(seed)
+    height, width = int(A4_INCHES[1] * dpi), int(A4_INCHES[0] * dpi)
+    glyph_height, glyph_width, stroke = dpi // 10, dpi // 14, max(2, dpi // 100)
+    ys, xs = np.mgrid[0:glyph_height, 0:glyph_width]
+
+    glyphs = []
+    for _ in range(40):
+        glyph = np.zeros((glyph_height, glyph_width), dtype=bool)
+        for kind in rng.integers(0, 4, size=int(rng.integers(2, 4))):
+            if kind == 0:
+                left = int(rng.integers(0, glyph_width - stroke))
+                glyph[:, left:left + stroke] = True
+            elif kind == 1:
+                top = int(rng.integers(0, glyph_height - stroke))
+                glyph[top:top + stroke, :] = True
+            elif kind == 2:
+                shift = int(rng.integers(-glyph_height // 3, glyph_height // 3))
+                glyph |= np.abs(xs * glyph_height / glyph_width - ys - shift) < stroke
+            else:
+                radius = min(glyph_height, glyph_width) / 2 - stroke
+                distance = np.hypot(ys - glyph_height / 2, (xs - glyph_width / 2) * glyph_height / glyph_width / 1.2)
+                glyph |= np.abs(distance - radius) < stroke / 1.5
+        glyphs.append(glyph)
+
+    bitmap = np.zeros((height, width), dtype=bool)
+    pitch = glyph_width + dpi // 60
+    for top in range(dpi, height - dpi - glyph_height, glyph_height * 2):
+        for left in range(dpi, width - dpi - pitch, pitch):
+            if rng.random() < 0.85:
+                bitmap[top:top + glyph_height, left:left + glyph_width] = glyphs[int(rng.integers(len(glyphs)))]
+    edges = bitmap != np.roll(bitmap, 1, axis=1)
+    return bitmap ^ (edges & (rng.random(bitmap.shape) < 0.25))
+
+
+def write_image_pdf(path: Path, bitmaps: List[np.ndarray], texts: Optional[List[str]] = None) -> Path:
+    """Write a PDF of 1-bit Flate image pages, like a raw scanline -mono scan
+
+    texts adds an invisible text layer per page, as ocrmypdf would.
+    """
+    writer = PdfWriter()
+    font = writer._add_object(_helvetica()) if texts else None
+    for index, bitmap in enumerate(bitmaps):
+        height, width = bitmap.shape
+        # DeviceGray 1-bit: 0 = black
+        packed = np.packbits(~bitmap, axis=1).tobytes()
+        image = EncodedStreamObject()
+        image._data = zlib.compress(packed)
+        image.update({
+            NameObject('/Type'): NameObject('/XObject'),
+            NameObject('/Subtype'): NameObject('/Image'),
+            NameObject('/Width'): NumberObject(width),
+            NameObject('/Height'): NumberObject(height),
+            NameObject('/ColorSpace'): NameObject('/DeviceGray'),
+            NameObject('/BitsPerComponent'): NumberObject(1),
+            NameObject('/Filter'): NameObject('/FlateDecode'),
+        })
+
+        page = PageObject.create_blank_page(None, 595, 842)
+        content = DecodedStreamObject()
+        ops = "q 595 0 0 842 0 0 cm /Im0 Do Q"
+        text = texts[index] if texts else ""
+        if text:
+            ops += "\n" + _text_ops(text, render_mode=3)
+        content.set_data(ops.encode('cp1252'))
+        page[NameObject('/Contents')] = content
+        resources = DictionaryObject({
+            NameObject('/XObject'): DictionaryObject({NameObject('/Im0'): writer._add_object(image)})
+        })
+        if font:
+            resources[NameObject('/Font')] = DictionaryObject({NameObject('/F1'): font})
+        page[NameObject('/Resources')] = resources
+        writer.add_page(page)
+
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+COMPANIES = ["Muster", "Beispiel", "Alpina", "Rhein", "Helvetia", "Nordlicht", "Sonnenberg", "Limmat",
+             "Seeland", "Bergblick", "Aare", "Jura", "Ticino", "Waldner", "Fischer", "Keller"]
+LEGAL_FORMS = ["AG", "GmbH", "Versicherungen AG", "Treuhand GmbH", "Energie AG", "Immobilien AG"]
+STREETS = ["Bahnhofstrasse", "Industriestrasse", "Seestrasse", "Hauptgasse", "Marktplatz", "Ringstrasse"]
+TOWNS = ["8400 Winterthur", "8001 Zuerich", "3011 Bern", "4051 Basel", "6003 Luzern", "9000 St. Gallen"]
+BANKS = ["Kantonalbank Zuerich", "Raiffeisenbank Seeland", "PostFinance AG"]
+SUBJECTS = ["Ihre Bestellung", "Vertragsanpassung", "Jahresabrechnung", "Praemienrechnung",
+            "Kuendigungsbestaetigung", "Mahnung", "Terminbestaetigung", "Offerte"]
+WORDS = ("wir bitten sie den betrag innert dreissig tagen zu ueberweisen die leistungen wurden gemaess "
+         "vereinbarung erbracht fuer fragen steht ihnen unser kundendienst gerne zur verfuegung bitte "
+         "beachten sie die beiliegenden unterlagen sowie die allgemeinen geschaeftsbedingungen der vertrag "
+         "verlaengert sich automatisch um ein weiteres jahr sofern er nicht gekuendigt wird").split()
+
+
+def _body(rng, lines: int) -> str:
+    return "\n".join(
+        " ".join(WORDS[int(i)] for i in rng.integers(0, len(WORDS), size=int(rng.integers(8, 14)))).capitalize() + "."
+        for _ in range(lines)
+    )
+
+
+def _sender(rng) -> Tuple[str, str, str]:
+    name = f"{COMPANIES[int(rng.integers(len(COMPANIES)))]} {LEGAL_FORMS[int(rng.integers(len(LEGAL_FORMS)))]}"
+    return name, STREETS[int(rng.integers(len(STREETS)))] + f" {int(rng.integers(1, 90))}", \
+        TOWNS[int(rng.integers(len(TOWNS)))]
+
+
+def _footer(name: str, street: str, town: str, rng) -> str:
+    return f"{name} - {street} - {town} - Telefon 0{int(rng.integers(21, 92))} {int(rng.integers(100, 999))} 00 00\n" \
+           f"IBAN CH{int(rng.integers(10, 99))} 0070 0110 {int(rng.integers(1000, 9999))} 0000 0"
+
+
+def _letter(rng, indicator: bool, sender: Optional[Tuple[str, str, str]] = None) -> List[str]:
+    """A letter: full letterhead and greeting on page 1, a short running header after that"""
+    name, street, town = sender or _sender(rng)
+    total = int(rng.integers(1, 5))
+    date = f"{int(rng.integers(1, 29)):02d}.{int(rng.integers(1, 13)):02d}.2026"
+    subject = SUBJECTS[int(rng.integers(len(SUBJECTS)))]
+    footer = _footer(name, street, town, rng)
+    pages = []
+    for page in range(1, total + 1):
+        if page == 1:
+            head = f"{name}\n{street}\n{town}\n\nFrau Anna Beispiel\nDorfstrasse 5\n8600 Duebendorf\n\n" \
+                   f"{town.split(' ', 1)[1]}, {date}\nBetreff: {subject}\n\nSehr geehrte Frau Beispiel"
+        else:
+            head = f"{name}\n{subject} vom {date}"
+        mark = f"\nSeite {page} von {total}" if indicator else ""
+        pages.append(f"{head}\n{_body(rng, int(rng.integers(15, 30)))}\n{footer}{mark}")
+    return pages
+
+
+def _invoice(rng, sender: Optional[Tuple[str, str, str]] = None) -> List[str]:
+    """An invoice: no greeting, an 'n/m' indicator in the footer"""
+    name, street, town = sender or _sender(rng)
+    total = int(rng.integers(1, 4))
+    footer = _footer(name, street, town, rng)
+    number = int(rng.integers(100000, 999999))
+    pages = []
+    for page in range(1, total + 1):
+        head = f"{name}\n{street}\n{town}\nRECHNUNG Nr. {number}" if page == 1 else f"{name} Rechnung {number}"
+        lines = "\n".join(f"Position {i} Dienstleistung {int(rng.integers(10, 999))}.00"
+                          for i in range(int(rng.integers(10, 25))))
+        pages.append(f"{head}\n{lines}\n{footer}\n{page}/{total}")
+    return pages
+
+
+def _statement(rng) -> List[str]:
+    """A bank statement: same bank and layout every month, so only the indicator separates them"""
+    bank = BANKS[int(rng.integers(len(BANKS)))]
+    total = int(rng.integers(1, 3))
+    month = int(rng.integers(1, 13))
+    pages = []
+    for page in range(1, total + 1):
+        bookings = "\n".join(f"{int(rng.integers(1, 29)):02d}.{month:02d}.2026 Buchung {int(rng.integers(10, 9999))}.00"
+                             for _ in range(int(rng.integers(15, 30))))
+        pages.append(f"{bank}\nKontoauszug Privatkonto\nPeriode {month:02d}.2026\n{bookings}\n"
+                     f"{bank} - Postfach - 8010 Zuerich\nSeite {page} von {total}")
+    return pages
+
+
+def mixed_stack(documents: int, seed: int = 0) -> Tuple[List[str], List[int]]:
+    """Page texts of a mixed stack and the index of each document's first page
+
+    Letters with and without page indicators, invoices without a greeting
+    and runs of same-bank statements, in random order and lengths, so
+    documents start on odd and even pages alike.
+    """
+    rng = np.random.default_rng(seed)
+    pages: List[str] = []
+    starts: List[int] = []
+    for _ in range(documents):
+        kind = rng.random()
+        if kind < 0.45:
+            document = _letter(rng, indicator=rng.random() < 0.5)
+        elif kind < 0.75:
+            document = _invoice(rng)
+        else:
+            document = _statement(rng)
+        starts.append(len(pages))
+        pages.extend(document)
+    return pages, starts
+
+
+def sender_stream(documents: int, senders: int = 30, seed: int = 0) -> List[Tuple[List[str], str, str]]:
+    """(pages, sender, type) of documents from a fixed set of senders, in arrival order
+
+    Each sender keeps its letterhead and sends letters, invoices or, for one
+    in five, both; how often a sender writes follows a long tail, as real
+    mail does.
+    """
+    rng = np.random.default_rng(seed)
+    profiles = []
+    for n in range(senders):
+        name = f"{COMPANIES[n % len(COMPANIES)]} {LEGAL_FORMS[(n // len(COMPANIES) + n) % len(LEGAL_FORMS)]}"
+        address = (name, STREETS[int(rng.integers(len(STREETS)))] + f" {int(rng.integers(1, 90))}",
+                   TOWNS[int(rng.integers(len(TOWNS)))])
+        kinds = ["Brief", "Rechnung"] if rng.random() < 0.2 else [["Brief", "Rechnung"][int(rng.integers(2))]]
+        profiles.append((address, kinds))
+    weights = 1.0 / np.arange(1, senders + 1)
+    stream = []
+    for n in rng.choice(senders, size=documents, p=weights / weights.sum()):
+        address, kinds = profiles[int(n)]
+        kind = kinds[int(rng.integers(len(kinds)))]
+        pages = _letter(rng, rng.random() < 0.5, address) if kind == "Brief" else _invoice(rng, address)
+        stream.append((pages, address[0], kind))
+    return stream
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Archive Index - full-text search over organized documents
+
+organize_document used to move a file into YYYY/Sender/ and forget the text
+that analysis had already extracted. The index keeps that text, with sender,
+type and dates, in an SQLite FTS5 table next to the archive, so a search is
+one ranked query instead of extracting thousands of PDFs on the NAS.
+reindex walks the archive, re-extracts only files whose mtime/size changed
+(in parallel) and drops entries for files that are gone. Extraction reads
+each file once for its text and its hash, and the results can be shared
+with the fingerprint index's sync so the archive is read only once.
+"""
+import re
+import json
+import hashlib
+import sqlite3
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+INDEX_NAME = ".archive-index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    sender TEXT NOT NULL,
+    doc_type TEXT NOT NULL,
+    doc_date TEXT,
+    dates_found TEXT NOT NULL,
+    pages INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_date ON documents (doc_date);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5 (
+    sender, doc_type, dates, full_text,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# bm25 column weights: sender, type, dates, full text
+RANK = "bm25(10.0, 5.0, 2.0, 1.0)"
+
+FILENAME_DATE = re.compile(r'^(\d{4}-\d{2}-\d{2})_(.*?)(?:_\d+)?$')
+
+
+def index_path(output_base: Path) -> Path:
+    return Path(output_base) / INDEX_NAME
+
+
+def metadata_from_path(path: Path) -> Dict:
+    """Sender, type and date from the YYYY/Sender/YYYY-MM-DD_Sender_Type.pdf layout"""
+    sender = path.parent.name.replace("_", " ")
+    match = FILENAME_DATE.match(path.stem)
+    if not match:
+        return {"sender": sender, "doc_type": "", "doc_date": None}
+    rest = match.group(2).replace("_", " ")
+    if rest.startswith(sender + " "):
+        rest = rest[len(sender) + 1:]
+    return {"sender": sender, "doc_type": rest, "doc_date": match.group(1)}
+
+
+def extract_text(path: Path) -> Dict:
+    """Full text, page count and SHA-256 of one archived PDF (runs in a worker process)"""
+    try:
+        from PyPDF2 import PdfReader
+        data = Path(path).read_bytes()
+        reader = PdfReader(BytesIO(data))
+        texts = [page.extract_text() or "" for page in reader.pages]
+        return {"path": str(path), "pages": len(texts), "full_text": "\n".join(texts),
+                "sha256": hashlib.sha256(data).hexdigest()}
+    except Exception as e:
+        return {"path": str(path), "error": str(e)}
+
+
+def extract_all(paths: List[Path], workers: int = 1, extracted: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+    """extract_text of each path, in worker processes if workers > 1 on the main thread
+    
+    extracted holds results by path from an earlier pass; they are reused,
+    and the new ones added to it.
+    """
+    extracted = {} if extracted is None else extracted
+    missing = [path for path in paths if str(path) not in extracted]
+    from page_analysis import process_pool, process_workers
+    if process_workers(workers) > 1 and len(missing) > 1:
+        with process_pool(workers) as pool:
+            results = list(pool.map(extract_text, missing, chunksize=8))
+    else:
+        results = [extract_text(path) for path in missing]
+    for path, result in zip(missing, results):
+        extracted[str(path)] = result
+    return [extracted[str(path)] for path in paths]
+
+
+def _match_query(query: str) -> str:
+    """Quote each term so user input can't trip FTS5 query syntax"""
+    terms = re.findall(r'\w+', query)
+    return " ".join(f'"{term}"' for term in terms)
+
+
+class ArchiveIndex:
+    """SQLite FTS5 index of organized documents"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            self.conn.execute("INSERT INTO documents_fts (documents_fts, rank) VALUES ('rank', ?)", (RANK,))
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> 'ArchiveIndex':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def add(self, path: Path, full_text: str, sender: str, doc_type: str,
+            doc_date: Optional[str], dates_found: List[str], pages: int) -> None:
+        """Index one archived document, replacing any entry for the same path"""
+        stat = path.stat()
+        with self.conn:
+            self._remove(str(path))
+            cursor = self.conn.execute(
+                "INSERT INTO documents (path, sender, doc_type, doc_date, dates_found, pages, mtime_ns, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(path), sender, doc_type or "", doc_date, json.dumps(dates_found), pages,
+                 stat.st_mtime_ns, stat.st_size)
+            )
+            self.conn.execute(
+                "INSERT INTO documents_fts (rowid, sender, doc_type, dates, full_text) VALUES (?, ?, ?, ?, ?)",
+                (cursor.lastrowid, sender, doc_type or "", " ".join(dates_found), full_text)
+            )
+
+    def _remove(self, path: str) -> None:
+        row = self.conn.execute("SELECT id FROM documents WHERE path = ?", (path,)).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (row['id'],))
+            self.conn.execute("DELETE FROM documents WHERE id = ?", (row['id'],))
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def search(self, query: str, limit: int = 20, offset: int = 0,
+               sender: Optional[str] = None, doc_type: Optional[str] = None,
+               since: Optional[str] = None, until: Optional[str] = None) -> Dict:
+        """Ranked matches with a highlighted snippet of the matching text"""
+        match = _match_query(query)
+        if not match:
+            return {"total": 0, "results": []}
+
+        clauses, params = ["documents_fts MATCH ?"], [match]
+        if sender:
+            clauses.append("d.sender = ? COLLATE NOCASE")
+            params.append(sender)
+        if doc_type:
+            clauses.append("d.doc_type = ? COLLATE NOCASE")
+            params.append(doc_type)
+        if since:
+            clauses.append("d.doc_date >= ?")
+            params.append(since)
+        if until:
+            clauses.append("d.doc_date <= ?")
+            params.append(until)
+        where = " AND ".join(clauses)
+        joined = "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid"
+
+        total = self.conn.execute(f"SELECT COUNT(*) {joined} WHERE {where}", params).fetchone()[0]
+        # Rank first, then build snippets only for the page of results
+        top = [row[0] for row in self.conn.execute(
+            f"SELECT documents_fts.rowid {joined} WHERE {where} ORDER BY rank LIMIT ? OFFSET ?",
+            params + [limit if limit is not None else -1, offset]
+        )]
+        placeholders = ", ".join("?" * len(top))
+        rows = self.conn.execute(
+            f"SELECT d.*, rank AS score, snippet(documents_fts, 3, '[', ']', '…', 16) AS snippet "
+            f"{joined} WHERE documents_fts MATCH ? AND documents_fts.rowid IN ({placeholders})",
+            [match] + top
+        ).fetchall()
+        rows.sort(key=lambda row: top.index(row['id']))
+
+        return {
+            "total": total,
+            "results": [
+                {
+                    "path": row['path'],
+                    "sender": row['sender'],
+                    "type": row['doc_type'],
+                    "date": row['doc_date'],
+                    "pages": row['pages'],
+                    "score": round(-row['score'], 3),
+                    "snippet": row['snippet'],
+                }
+                for row in rows
+            ]
+        }
+
+    def reindex(self, archive_root: Path, extract_dates: Callable[[str], List[str]],
+                workers: int = 1, extracted: Optional[Dict[str, Dict]] = None) -> Dict:
+        """Bring the index in line with the archive, re-extracting only changed files
+        
+        extracted is shared with extract_all, for a later FingerprintIndex.sync.
+        """
+        known = {
+            row['path']: row
+            for row in self.conn.execute("SELECT path, sender, doc_type, doc_date, mtime_ns, size FROM documents")
+        }
+        seen, changed = set(), []
+        for path in sorted(Path(archive_root).rglob("*.pdf")):
+            seen.add(str(path))
+            stat = path.stat()
+            row = known.get(str(path))
+            if row is None or (row['mtime_ns'], row['size']) != (stat.st_mtime_ns, stat.st_size):
+                changed.append(path)
+
+        failed = 0
+        for path, result in zip(changed, extract_all(changed, workers, extracted)):
+            if 'error' in result:
+                failed += 1
+                continue
+            # Keep what organize recorded; the path layout is only a fallback
+            row = known.get(str(path))
+            meta = dict(row) if row else metadata_from_path(path)
+            self.add(path, result['full_text'], meta['sender'], meta['doc_type'], meta['doc_date'],
+                     extract_dates(result['full_text']), result['pages'])
+
+        removed = [path for path in known if path not in seen]
+        with self.conn:
+            for path in removed:
+                self._remove(path)
+
+        return {
+            "indexed": len(changed) - failed,
+            "unchanged": len(seen) - len(changed),
+            "removed": len(removed),
+            "failed": failed,
+            "total": self.count(),
+        }
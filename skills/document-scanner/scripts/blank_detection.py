@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Blank Detection - raster ink-density check for scanned pages
+
+A raw scan has no text layer and every page carries an image XObject, so the
+text-based check in page_analysis can never call it blank. This module
+decodes the page image, crops the margins, downsamples it into blocks and
+measures the share of blocks that carry ink, all as vectorized NumPy.
+Group 4 images (as the output optimizer writes them) decode without Pillow.
+
+Optional dependencies:
+    pip3 install numpy            # required for raster detection
+    pip3 install Pillow           # additionally decodes JPEG and other CCITT images
+"""
+from io import BytesIO
+from typing import Dict, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from ccitt import decode_g4
+from page_analysis import BLANK_TEXT_THRESHOLD
+
+DEFAULT_BLANK_SETTINGS = {
+    'ink_threshold': 0.003,  # share of inked blocks above which a page has content
+    'margin': 0.05,          # fraction cropped from each edge (shadows, punch holes)
+    'block': 4,              # downsampling factor, in pixels per block side
+    'block_ink': 0.25,       # mean darkness for a block to count as inked (drops specks)
+}
+
+RAW_FILTERS = {None, '/FlateDecode', '/LZWDecode', '/RunLengthDecode', '/ASCIIHexDecode', '/ASCII85Decode'}
+PIL_FILTERS = {'/DCTDecode', '/JPXDecode', '/CCITTFaxDecode'}
+
+
+def raster_available() -> bool:
+    """Check if raster blank detection can run"""
+    return np is not None
+
+
+def blank_settings(prefs: Optional[Dict] = None) -> Dict:
+    """Merge the blank_detection preferences over the defaults"""
+    settings = dict(DEFAULT_BLANK_SETTINGS)
+    if prefs:
+        settings.update(prefs.get('blank_detection') or {})
+    return settings
+
+
+def _last_filter(xobject) -> Optional[str]:
+    filters = xobject.get('/Filter')
+    if filters is None:
+        return None
+    if isinstance(filters, list):
+        return str(filters[-1]) if filters else None
+    return str(filters)
+
+
+def _largest_image(page):
+    """The page's largest image XObject, i.e. the scanned bitmap"""
+    try:
+        resources = page.get('/Resources')
+        if not resources or '/XObject' not in resources:
+            return None
+        xobjects = resources['/XObject'].get_object()
+    except (KeyError, TypeError, AttributeError):
+        return None
+
+    best, best_area = None, 0
+    for name in xobjects:
+        xobject = xobjects[name].get_object()
+        if xobject.get('/Subtype') != '/Image':
+            continue
+        area = int(xobject.get('/Width', 0)) * int(xobject.get('/Height', 0))
+        if area > best_area:
+            best, best_area = xobject, area
+    return best
+
+
+def _components(xobject) -> Optional[int]:
+    """Color components per sample, None for unsupported color spaces"""
+    if xobject.get('/ImageMask', False):
+        return 1
+    colorspace = xobject['/ColorSpace'] if '/ColorSpace' in xobject else '/DeviceGray'
+    if isinstance(colorspace, list):
+        if colorspace[0] == '/ICCBased':
+            return int(colorspace[1].get_object().get('/N', 1))
+        colorspace = colorspace[0]
+    return {'/DeviceGray': 1, '/CalGray': 1, '/DeviceRGB': 3, '/CalRGB': 3, '/DeviceCMYK': 4}.get(str(colorspace))
+
+
+def _decode_raw(xobject, data: bytes):
+    """Decode uncompressed samples into a darkness map in [0, 1]"""
+    width = int(xobject['/Width'])
+    height = int(xobject['/Height'])
+    image_mask = bool(xobject.get('/ImageMask', False))
+    bits = 1 if image_mask else int(xobject.get('/BitsPerComponent', 8))
+    components = _components(xobject)
+    if components is None or bits not in (1, 8) or (bits == 1 and components != 1):
+        return None
+
+    row_bytes = (width * components * bits + 7) // 8
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if buffer.size < row_bytes * height:
+        return None
+    rows = buffer[:row_bytes * height].reshape(height, row_bytes)
+
+    if bits == 1:
+        samples = np.unpackbits(rows, axis=1)[:, :width].astype(np.float32)
+    else:
+        samples = rows[:, :width * components].reshape(height, width, components).astype(np.float32) / 255.0
+        if components == 4:
+            # CMYK samples are ink amounts; flip the strongest one to lightness
+            samples = 1.0 - samples.max(axis=2)
+        else:
+            samples = samples.mean(axis=2)
+
+    return _darkness(xobject, samples)
+
+
+def _darkness(xobject, samples):
+    """Darkness from samples in [0, 1] under the image's /Decode and /ImageMask"""
+    # Decode [1 0] swaps the sample meaning; image masks paint where the sample is 0
+    image_mask = bool(xobject.get('/ImageMask', False))
+    decode = xobject.get('/Decode')
+    inverted = bool(decode) and float(decode[0]) == 1.0
+    if image_mask:
+        inverted = not inverted
+    darkness = samples if inverted else 1.0 - samples
+    return darkness
+
+
+def _decode_g4(xobject):
+    """Darkness map of a single-filter Group 4 image, None for other CCITT codings"""
+    filters = xobject['/Filter']
+    params = xobject.get('/DecodeParms') or {}
+    if isinstance(filters, list):
+        if len(filters) > 1:
+            return None
+        params = params[0] if params else {}
+    params = params.get_object() if hasattr(params, 'get_object') else params
+    if int(params.get('/K', 0)) >= 0:
+        return None
+    width = int(params.get('/Columns', 1728))
+    height = int(params.get('/Rows', 0)) or int(xobject['/Height'])
+    black = decode_g4(xobject._data or b'', width, height)
+    if black is None:
+        return None
+    # Decoded pixels are 0 for black unless BlackIs1 (compared, as a PDF false is a truthy object)
+    samples = black if params.get('/BlackIs1', False) == True else ~black  # noqa: E712
+    return _darkness(xobject, samples.astype(np.float32))
+
+
+def _decode_with_pil(data: bytes):
+    if Image is None:
+        return None
+    try:
+        with Image.open(BytesIO(data)) as image:
+            gray = np.asarray(image.convert('L'), dtype=np.float32)
+    except Exception:
+        return None
+    return 1.0 - gray / 255.0
+
+
+def image_darkness(xobject):
+    """Darkness map of an image XObject, or None if undecodable"""
+    if np is None:
+        return None
+    encoding = _last_filter(xobject)
+    if encoding == '/CCITTFaxDecode' and Image is None:
+        return _decode_g4(xobject)
+
+    try:
+        data = xobject.get_data()
+    except Exception:
+        return None
+
+    if encoding in PIL_FILTERS:
+        return _decode_with_pil(data)
+    if encoding in RAW_FILTERS:
+        return _decode_raw(xobject, data)
+    return None
+
+
+def page_darkness(page):
+    """Darkness map of the page's scanned image, or None if undecodable"""
+    xobject = _largest_image(page)
+    if xobject is None or np is None:
+        return None
+    return image_darkness(xobject)
+
+
+def ink_coverage(darkness, settings: Optional[Dict] = None) -> float:
+    """Share of inked blocks after margin cropping and block downsampling"""
+    settings = settings or DEFAULT_BLANK_SETTINGS
+    height, width = darkness.shape
+    margin_y = int(height * settings['margin'])
+    margin_x = int(width * settings['margin'])
+    cropped = darkness[margin_y:height - margin_y, margin_x:width - margin_x]
+
+    block = max(1, int(settings['block']))
+    rows = cropped.shape[0] // block
+    cols = cropped.shape[1] // block
+    if rows == 0 or cols == 0:
+        return 0.0
+
+    blocks = cropped[:rows * block, :cols * block].reshape(rows, block, cols, block).mean(axis=(1, 3))
+    return float((blocks >= settings['block_ink']).mean())
+
+
+def is_blank_raster(page, settings: Optional[Dict] = None) -> Optional[bool]:
+    """Raster blank check: True/False, or None if the image can't be measured
+
+    A page whose text layer reaches the text threshold is never blank, however
+    faint its image: the ink check only looks at the largest image.
+    """
+    settings = settings or DEFAULT_BLANK_SETTINGS
+    darkness = page_darkness(page)
+    if darkness is None:
+        return None
+    if ink_coverage(darkness, settings) >= settings['ink_threshold']:
+        return False
+    try:
+        text = page.extract_text() or ""
+    except Exception:
+        text = ""
+    return len(text.strip()) < BLANK_TEXT_THRESHOLD
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Boundaries - where one document ends and the next begins in a scanned stack
+
+Splitting used to start a document only on an even page whose indicator
+said page 1 or that opened with a greeting, so a three-page letter pulled
+the next letter's first page into itself and an invoice without a greeting
+never split off. Pages of one document share a letterhead and a footer
+(sender line, bank details, "Seite x von y"), and the next document's
+differ. Each page's header and footer are reduced at analysis time to a
+compact signature of hashed word shingles, with digits folded so page
+numbers and dates don't count as differences. Adjacent-page similarity for
+the whole stack is then one NumPy pass over the signatures, combined with
+the indicator and greeting evidence into a boundary score per page, and one
+linear pass picks the split points. Without NumPy the same scores are
+computed page by page. NumPy is only imported the first time a stack is
+scored, so commands that never split don't pay for it.
+"""
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+from extraction import PAGE_INDICATOR_PATTERNS
+
+SHINGLE_BITS = 32
+WORD = re.compile(r'[^\W\d_]+|\d+')
+# Larger totals are more likely a misread date or reference than a page count
+MAX_DECLARED_PAGES = 50
+# Set by _numpy() on first use: the numpy module, or None without it
+_UNLOADED = object()
+np = _UNLOADED
+
+DEFAULT_BOUNDARY_SETTINGS = {
+    'bias': 0.5,                # a page unlike the one before starts a document
+    'first_page': 3.0,          # indicator says page 1
+    'complete': 2.0,            # the current document has every page its indicator counts
+    'sequence': 4.0,            # indicator fills a gap in the current document's numbering
+    'opens_letter': 2.0,        # greeting at the top of the page
+    'header': 2.0,              # weight of header similarity (0..1) against a split
+    'footer': 2.5,              # weight of footer similarity (0..1) against a split
+    'unknown_similarity': 0.5,  # assumed similarity when a page has no header/footer text
+    'threshold': 0.0,           # split where the score is above this
+}
+
+
+def boundary_settings(prefs: Optional[Dict] = None) -> Dict:
+    """Merge the boundary preferences over the defaults"""
+    settings = dict(DEFAULT_BOUNDARY_SETTINGS)
+    if prefs:
+        settings.update(prefs.get('boundaries') or {})
+    return settings
+
+
+def shingle_signature(text: str) -> str:
+    """CRC-32 hashes of text's words and word pairs, sorted and packed as hex
+
+    Page indicators are left out, they are scored on their own; other digits
+    are folded to a single 0, so two dates or amounts in the same format
+    give the same shingles.
+    """
+    for _, pattern in PAGE_INDICATOR_PATTERNS:
+        text = pattern.sub(' ', text)
+    words = ['0' if word.isdigit() else word for word in WORD.findall(text.lower())]
+    shingles = set(words)
+    shingles.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    hashes = sorted({zlib.crc32(shingle.encode('utf-8')) for shingle in shingles})
+    return ''.join(f"{value:08x}" for value in hashes)
+
+
+def _numpy():
+    """The numpy module, imported on first use; None if it isn't installed"""
+    global np
+    if np is _UNLOADED:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+    return np
+
+
+def signature_hashes(signature: str) -> List[int]:
+    return [int(signature[i:i + 8], 16) for i in range(0, len(signature), 8)]
+
+
+def adjacent_similarity(signatures: Sequence[str], unknown: float = 0.5) -> List[float]:
+    """Cosine similarity of each page's shingle set with the previous page's
+
+    Element i compares page i with page i-1; element 0 is always 0. Pages
+    with an empty signature get `unknown` against their neighbours.
+    """
+    n = len(signatures)
+    if _numpy() is None:
+        return _adjacent_similarity_python(signatures, unknown)
+    if n == 0:
+        return []
+
+    lengths = np.fromiter((len(s) // 8 for s in signatures), dtype=np.int64, count=n)
+    packed = ''.join(signatures)
+    hashes = np.frombuffer(bytes.fromhex(packed), dtype='>u4').astype(np.int64) if packed else \
+        np.zeros(0, dtype=np.int64)
+    rows = np.repeat(np.arange(n, dtype=np.int64), lengths)
+
+    # A shingle of page r is shared with page r+1 if (r+1, hash) is also a key
+    keys = (rows << SHINGLE_BITS) | hashes
+    shared = np.isin(keys + (1 << SHINGLE_BITS), keys, assume_unique=True)
+    overlap = np.bincount(rows[shared], minlength=n)[:n - 1].astype(np.float64)
+
+    norms = np.sqrt(lengths[1:] * lengths[:-1])
+    similarity = np.full(n, unknown, dtype=np.float64)
+    np.divide(overlap, norms, out=similarity[1:], where=norms > 0)
+    similarity[0] = 0.0
+    return similarity.tolist()
+
+
+def _adjacent_similarity_python(signatures: Sequence[str], unknown: float) -> List[float]:
+    similarity = [0.0]
+    previous = set(signature_hashes(signatures[0])) if signatures else set()
+    for signature in signatures[1:]:
+        current = set(signature_hashes(signature))
+        if current and previous:
+            similarity.append(len(current & previous) / (len(current) * len(previous)) ** 0.5)
+        else:
+            similarity.append(unknown)
+        previous = current
+    return similarity
+
+
+def boundary_scores(features: Sequence, settings: Optional[Dict] = None) -> List[float]:
+    """Evidence from each page and the one before it that a new document starts there
+
+    features are page_analysis.PageFeatures of the stack's non-blank pages;
+    the first page always starts a document.
+    """
+    settings = settings or DEFAULT_BOUNDARY_SETTINGS
+    unknown = settings['unknown_similarity']
+    header = adjacent_similarity([page.header for page in features], unknown)
+    footer = adjacent_similarity([page.footer for page in features], unknown)
+
+    scores = [float('inf')] if features else []
+    for i in range(1, len(features)):
+        page = features[i]
+        score = settings['bias'] - settings['header'] * header[i] - settings['footer'] * footer[i]
+        if page.page_num == 1:
+            score += settings['first_page']
+        if page.opens_letter:
+            score += settings['opens_letter']
+        scores.append(score)
+    return scores
+
+
+def split_points(features: Sequence, settings: Optional[Dict] = None) -> List[int]:
+    """Positions in features where documents start, in one pass over the scores
+
+    The pass follows the current document's page numbering: a page whose
+    number it is still missing, with the same total, counts against a split
+    (this also keeps pages fed in reverse order together), a document with
+    all of its numbered pages counts for one, and while the indicator says
+    more pages are to come the document only ends early at a page that
+    says it is page 1.
+    """
+    settings = settings or DEFAULT_BOUNDARY_SETTINGS
+    starts: List[int] = []
+    last_page = -1    # position of the current document's declared last page
+    total = None      # the current document's declared page count
+    numbers = set()   # page numbers the current document has so far
+    for i, score in enumerate(boundary_scores(features, settings)):
+        page = features[i]
+        if page.page_num is not None and page.page_total == total and page.page_num not in numbers:
+            score -= settings['sequence']
+        if total is not None and len(numbers) >= total:
+            score += settings['complete']
+        if score > settings['threshold'] and (i > last_page or page.page_num == 1):
+            starts.append(i)
+            last_page, total, numbers = -1, None, set()
+        if page.page_num is not None and page.page_total is not None \
+                and 1 <= page.page_num <= page.page_total <= MAX_DECLARED_PAGES:
+            last_page = max(last_page, i + page.page_total - page.page_num)
+            total = total or page.page_total
+            numbers.add(page.page_num)
+    return starts
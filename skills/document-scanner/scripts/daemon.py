@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Scanner Daemon - long-lived JSON-RPC server on a local Unix socket
+
+Every agent action used to start a new Python process that re-imported
+PyPDF2, re-read preferences and re-ran scanner discovery. In serve mode one
+process keeps that state warm and answers newline-delimited JSON-RPC 2.0
+requests. Scanner commands are queued per scanner (see scheduler), so
+each scanner runs one scan at a time while different scanners scan in
+parallel; everything else runs immediately.
+"""
+import os
+import json
+import socket
+import threading
+import socketserver
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from scheduler import ScanScheduler
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+
+
+class DaemonUnavailable(Exception):
+    """No daemon is listening on the socket"""
+
+
+def _response(request_id: Any, result: Optional[Dict] = None, error: Optional[Dict] = None) -> Dict:
+    response = {"jsonrpc": "2.0", "id": request_id}
+    if error is not None:
+        response["error"] = error
+    else:
+        response["result"] = result
+    return response
+
+
+class ScannerDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """JSON-RPC server: one request per line, one response per line"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, handler: Callable[[str, Dict], Dict],
+                 methods: Iterable[str], serialized: Iterable[str],
+                 scanner_of: Optional[Callable[[str, Dict], str]] = None):
+        self.socket_path = Path(socket_path)
+        self.handler = handler
+        self.methods = set(methods)
+        self.serialized = set(serialized)
+        # Which scanner a serialized command uses; commands on one scanner queue up
+        self.scanner_of = scanner_of or (lambda method, params: params.get('scanner') or '')
+        self.scheduler = ScanScheduler(handler)
+
+        if self.socket_path.exists():
+            if daemon_available(self.socket_path):
+                raise RuntimeError(f"Daemon already running on {self.socket_path}")
+            self.socket_path.unlink()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(str(self.socket_path), _RequestHandler)
+        os.chmod(self.socket_path, 0o600)
+
+    def dispatch(self, request: Dict) -> Dict:
+        request_id = request.get("id")
+        method = request.get("method")
+        params = request.get("params") or {}
+        if not isinstance(method, str) or not isinstance(params, dict):
+            return _response(request_id, error={"code": INVALID_REQUEST, "message": "Invalid request"})
+
+        if method == "ping":
+            return _response(request_id, {"status": "ok", "pid": os.getpid(),
+                                          "scanner_queue": self.scheduler.depth,
+                                          "scanners": self.scheduler.depths()})
+        if method == "shutdown":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return _response(request_id, {"status": "ok", "message": "Shutting down"})
+        if method not in self.methods:
+            return _response(request_id, error={"code": METHOD_NOT_FOUND, "message": f"Unknown method: {method}"})
+
+        try:
+            if method in self.serialized:
+                result = self.scheduler.submit(self.scanner_of(method, params), method, params)
+            else:
+                result = self.handler(method, params)
+        except Exception as e:
+            return _response(request_id, error={"code": INTERNAL_ERROR, "message": str(e)})
+        return _response(request_id, result)
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError:
+                response = _response(None, error={"code": PARSE_ERROR, "message": "Parse error"})
+            else:
+                response = self.server.dispatch(request) if isinstance(request, dict) else \
+                    _response(None, error={"code": INVALID_REQUEST, "message": "Invalid request"})
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+def daemon_available(socket_path: Path) -> bool:
+    """Check if something accepts connections on the socket"""
+    if not Path(socket_path).exists():
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+            return True
+        except OSError:
+            return False
+
+
+def request(socket_path: Path, method: str, params: Optional[Dict] = None,
+            timeout: Optional[float] = None) -> Dict:
+    """Send one JSON-RPC request and return its result
+
+    Raises DaemonUnavailable if nothing is listening, so the caller can run
+    the command locally instead; errors after the request was sent are
+    returned as an error result and never retried.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(str(socket_path))
+        except OSError as e:
+            raise DaemonUnavailable(str(e))
+
+        payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params or {}}
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+        with sock.makefile("rb") as reader:
+            line = reader.readline()
+    finally:
+        sock.close()
+
+    if not line:
+        return {"status": "error", "error": "daemon_failed", "message": "Daemon closed the connection"}
+    response = json.loads(line)
+    if "error" in response:
+        return {"status": "error", "error": "daemon_failed", "message": response["error"]["message"]}
+    return response["result"]
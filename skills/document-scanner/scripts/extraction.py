@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Extraction - compiled date and page-indicator patterns
+
+Every date format we understand is one alternative of a single compiled
+pattern with named groups, so a document's text is scanned once instead of
+once per format, and a candidate is turned into a date straight from its
+groups and a month lookup table instead of trying strptime formats in turn.
+Month names are compiled as a prefix tree rather than a flat alternation.
+Parsed candidates are memoized; the same few dates recur on every page of a
+letter and across a stack. Page-indicator patterns only run when their
+literal ('/', 'Page', 'Seite') occurs on the page at all.
+
+Dates are scored by where they appear: a date in the letterhead block at
+the top of the text ("Winterthur, 8. Januar 2026") is far more likely the
+document date than one quoted in the body or the footer.
+"""
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+MONTHS = {
+    'januar': 1, 'january': 1, 'jan': 1, 'jänner': 1,
+    'februar': 2, 'february': 2, 'feb': 2,
+    'märz': 3, 'maerz': 3, 'march': 3, 'mar': 3, 'mär': 3, 'mrz': 3,
+    'april': 4, 'apr': 4,
+    'mai': 5, 'may': 5,
+    'juni': 6, 'june': 6, 'jun': 6,
+    'juli': 7, 'july': 7, 'jul': 7,
+    'august': 8, 'aug': 8,
+    'september': 9, 'sept': 9, 'sep': 9,
+    'oktober': 10, 'october': 10, 'okt': 10, 'oct': 10,
+    'november': 11, 'nov': 11,
+    'dezember': 12, 'december': 12, 'dez': 12, 'dec': 12,
+}
+
+
+def _prefix_tree(words) -> str:
+    """Alternation of words as a prefix tree, so no shared prefix is read twice"""
+    tree: dict = {}
+    for word in words:
+        node = tree
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if '' in node else body
+
+    return build(tree)
+
+
+# The lookahead rejects most positions on their first character
+DATE_PATTERN = re.compile(
+    r'(?<![\w.])(?=[\dJFMASONDjfmasond])(?:'
+    r'(?P<day>\d{1,2})\.(?P<month>\d{1,2})\.(?P<year>\d{4}|\d{2})'
+    r'|(?P<iso_year>\d{4})-(?P<iso_month>\d{1,2})-(?P<iso_day>\d{1,2})'
+    rf'|(?:(?P<name_day>\d{{1,2}})\.?\s+)?(?P<name>{_prefix_tree(MONTHS)})\.?\s+(?P<name_year>\d{{4}})'
+    r')(?!\w)',
+    re.IGNORECASE
+)
+
+# In priority order; each is only run when its literal occurs in the text
+PAGE_INDICATOR_PATTERNS = (
+    ('/', re.compile(r'(\d+)\s*/\s*(\d+)')),
+    ('age', re.compile(r'[Pp]age\s+(\d+)\s+of\s+(\d+)')),
+    ('eite', re.compile(r'[Ss]eite\s+(\d+)\s+von\s+(\d+)')),
+)
+
+# Share of the text counted as letterhead / footer for scoring
+LETTERHEAD_SHARE = 0.2
+FOOTER_SHARE = 0.1
+
+
+class DateCandidate(NamedTuple):
+    text: str
+    date: datetime
+    position: int
+    score: float
+
+
+def _year(value: str) -> int:
+    """Two-digit years follow strptime's %y: 69-99 -> 19xx, 00-68 -> 20xx"""
+    year = int(value)
+    if len(value) == 2:
+        return year + (1900 if year >= 69 else 2000)
+    return year
+
+
+def _from_match(match: re.Match) -> Optional[datetime]:
+    try:
+        if match.group('day'):
+            return datetime(_year(match.group('year')), int(match.group('month')), int(match.group('day')))
+        if match.group('iso_year'):
+            return datetime(int(match.group('iso_year')), int(match.group('iso_month')), int(match.group('iso_day')))
+        day = int(match.group('name_day') or 1)
+        return datetime(int(match.group('name_year')), MONTHS[match.group('name').lower()], day)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def parse_date(date_str: str) -> Optional[datetime]:
+    """Parse a date in any of the extracted formats; None if it isn't one"""
+    match = DATE_PATTERN.fullmatch(date_str.strip())
+    return _from_match(match) if match else None
+
+
+def _score(position: int, length: int, has_day: bool) -> float:
+    if position < length * LETTERHEAD_SHARE:
+        score = 1.0
+    elif position > length * (1 - FOOTER_SHARE):
+        score = 0.3
+    else:
+        score = 0.5
+    # A full date beats a bare month and year
+    return score + (0.2 if has_day else 0.0)
+
+
+def find_dates(text: str) -> List[DateCandidate]:
+    """Valid dates in text, best candidate first, in one pass over the text"""
+    candidates = []
+    length = max(1, len(text))
+    for match in DATE_PATTERN.finditer(text):
+        raw = match.group(0)
+        parsed = parse_date(raw)
+        if parsed is None:
+            continue
+        has_day = match.group('name') is None or match.group('name_day') is not None
+        candidates.append(DateCandidate(raw, parsed, match.start(), _score(match.start(), length, has_day)))
+    candidates.sort(key=lambda c: (-c.score, c.position))
+    return candidates
+
+
+def extract_dates(text: str) -> List[str]:
+    """Dates found in text, as written, most likely document date first"""
+    seen = {}
+    for candidate in find_dates(text):
+        seen.setdefault(candidate.text, None)
+    return list(seen)
+
+
+def extract_page_indicator(text: str) -> Tuple[Optional[int], Optional[int]]:
+    """Extract page number like '2/5' from text"""
+    for literal, pattern in PAGE_INDICATOR_PATTERNS:
+        if literal in text:
+            match = pattern.search(text)
+            if match:
+                return (int(match.group(1)), int(match.group(2)))
+    return (None, None)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Fingerprints - duplicate detection and filename allocation for the archive
+
+Rescanning a letter used to store it again as ..._1.pdf, found by stat'ing
+the NAS once per existing name. Each organized document is recorded here
+with an exact hash of its file and of its normalized text, plus a MinHash
+signature of its word shingles. Exact duplicates are one indexed lookup.
+Near duplicates (an OCR'd rescan differs in a few words) are found by
+locality-sensitive hashing: the signature is cut into bands, each band is
+an indexed key, and only documents sharing a band key are compared. The
+same table answers which names in a sender folder are taken. A document
+without words to compare (no text layer, OCR off) has no text hash or
+signature and only ever matches on its file hash.
+
+The index lives in local staging, not on the NAS, and sync() rebuilds it
+from the archive, re-reading only files whose mtime/size changed and that
+reindex hasn't just read for the search index.
+"""
+import re
+import random
+import struct
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from archive_index import extract_all
+
+PERMUTATIONS = 64
+BAND_ROWS = 4
+BANDS = PERMUTATIONS // BAND_ROWS
+# Estimated shingle overlap at which a document counts as a near duplicate
+NEAR_SIMILARITY = 0.8
+SHINGLE_WORDS = 3
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5CA7)
+_PERMUTATION_PARAMS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(PERMUTATIONS)]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    file_hash TEXT NOT NULL,
+    text_hash TEXT,
+    signature BLOB,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fingerprints_folder ON fingerprints (folder, name);
+CREATE INDEX IF NOT EXISTS fingerprints_file_hash ON fingerprints (file_hash);
+CREATE INDEX IF NOT EXISTS fingerprints_text_hash ON fingerprints (text_hash);
+CREATE TABLE IF NOT EXISTS bands (
+    key INTEGER NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bands_key ON bands (key);
+CREATE INDEX IF NOT EXISTS bands_path ON bands (path);
+"""
+
+# Indexes written before textless documents were told apart stored the hash
+# and signature of no words, which matched every other textless document
+EMPTY_TEXT_HASH = hashlib.sha256(b"").hexdigest()
+MIGRATE_NULLABLE_TEXT = f"""
+BEGIN;
+ALTER TABLE fingerprints RENAME TO fingerprints_old;
+DROP INDEX fingerprints_folder;
+DROP INDEX fingerprints_file_hash;
+DROP INDEX fingerprints_text_hash;
+{SCHEMA}
+INSERT INTO fingerprints
+    SELECT path, folder, name, file_hash, NULLIF(text_hash, '{EMPTY_TEXT_HASH}'),
+           CASE WHEN text_hash = '{EMPTY_TEXT_HASH}' THEN NULL ELSE signature END, mtime_ns, size
+    FROM fingerprints_old;
+DROP TABLE fingerprints_old;
+DELETE FROM bands WHERE path NOT IN (SELECT path FROM fingerprints WHERE signature IS NOT NULL);
+COMMIT;
+"""
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in re.findall(r'\w+', text.lower()) if len(w) > 1]
+
+
+def text_hash(text: str) -> Optional[str]:
+    """Hash of the text with case, punctuation and layout normalized away; None without words"""
+    words = _words(text)
+    return hashlib.sha256(" ".join(words).encode()).hexdigest() if words else None
+
+
+def _shingles(words: List[str]) -> Iterator[str]:
+    if len(words) < SHINGLE_WORDS:
+        yield " ".join(words)
+        return
+    for i in range(len(words) - SHINGLE_WORDS + 1):
+        yield " ".join(words[i:i + SHINGLE_WORDS])
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+
+def minhash(text: str) -> Optional[List[int]]:
+    """MinHash signature over word shingles; its agreement estimates their overlap. None without words"""
+    words = _words(text)
+    if not words:
+        return None
+    hashes = {_hash64(shingle.encode()) for shingle in _shingles(words)}
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATION_PARAMS]
+
+
+def similarity(first: List[int], second: List[int]) -> float:
+    return sum(x == y for x, y in zip(first, second)) / PERMUTATIONS
+
+
+def band_keys(signature: List[int]) -> List[int]:
+    """One indexed key per band of the signature (signed for SQLite)"""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * BAND_ROWS:(band + 1) * BAND_ROWS]
+        key = _hash64(struct.pack(f">I{BAND_ROWS}Q", band, *rows))
+        keys.append(key - (1 << 64) if key >= 1 << 63 else key)
+    return keys
+
+
+def _pack(signature: List[int]) -> bytes:
+    return struct.pack(f">{PERMUTATIONS}Q", *signature)
+
+
+def _unpack(blob: bytes) -> List[int]:
+    return list(struct.unpack(f">{PERMUTATIONS}Q", blob))
+
+
+def glob_escape(text: str) -> str:
+    """Escape SQLite GLOB metacharacters"""
+    return re.sub(r'([*?\[])', r'[\1]', text)
+
+
+class FingerprintIndex:
+    """SQLite index of archived documents' fingerprints and names"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        text_column = [row for row in self.conn.execute("PRAGMA table_info(fingerprints)") if row['name'] == 'text_hash']
+        if text_column[0]['notnull']:
+            self.conn.executescript(MIGRATE_NULLABLE_TEXT)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> 'FingerprintIndex':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def add(self, path: Path, content_hash: str, text: str, stat_path: Optional[Path] = None) -> None:
+        """Record an archived document, stamped with its current mtime/size
+        
+        stat_path stands in for a file that is still on its way to path.
+        """
+        stat = (stat_path or path).stat()
+        signature = minhash(text)
+        with self.conn:
+            self._remove(str(path))
+            self.conn.execute(
+                "INSERT INTO fingerprints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(path), str(path.parent), path.name, content_hash, text_hash(text),
+                 _pack(signature) if signature else None, stat.st_mtime_ns, stat.st_size)
+            )
+            if signature:
+                self.conn.executemany("INSERT INTO bands VALUES (?, ?)",
+                                      [(key, str(path)) for key in band_keys(signature)])
+
+    def move(self, old: Path, new: Path, content_hash: str, text: str) -> None:
+        """Record a document under the name it was filed with rather than the one it was given
+        
+        The old name keeps its entry if it has since been given to another document.
+        """
+        row = self.conn.execute("SELECT file_hash FROM fingerprints WHERE path = ?", (str(old),)).fetchone()
+        if row and row['file_hash'] == content_hash:
+            with self.conn:
+                self._remove(str(old))
+        self.add(new, content_hash, text)
+
+    def _remove(self, path: str) -> None:
+        self.conn.execute("DELETE FROM fingerprints WHERE path = ?", (path,))
+        self.conn.execute("DELETE FROM bands WHERE path = ?", (path,))
+
+    def duplicates(self, content_hash: str, text: str, threshold: float = NEAR_SIMILARITY) -> List[Dict]:
+        """Archived documents identical to, or a near-rescan of, this one
+        
+        Without words in text only the same file counts.
+        """
+        found: Dict[str, Dict] = {}
+        # A NULL text_hash never equals anything
+        for row in self.conn.execute(
+            "SELECT path FROM fingerprints WHERE file_hash = ? UNION SELECT path FROM fingerprints WHERE text_hash = ?",
+            (content_hash, text_hash(text))
+        ):
+            found[row['path']] = {"path": row['path'], "match": "exact", "similarity": 1.0}
+
+        signature = minhash(text)
+        if signature is None:
+            return sorted(found.values(), key=lambda d: d['path'])
+        keys = band_keys(signature)
+        candidates = self.conn.execute(
+            f"SELECT path, signature FROM fingerprints WHERE path IN "
+            f"(SELECT path FROM bands WHERE key IN ({', '.join('?' * len(keys))}))",
+            keys
+        )
+        for row in candidates:
+            score = similarity(signature, _unpack(row['signature']))
+            if score >= threshold and row['path'] not in found:
+                found[row['path']] = {"path": row['path'], "match": "near", "similarity": round(score, 3)}
+
+        return sorted(found.values(), key=lambda d: (-d['similarity'], d['path']))
+
+    def next_free_name(self, folder: Path, stem: str, reserved: Optional[set] = None) -> Path:
+        """First of stem.pdf, stem_1.pdf, ... not recorded in the folder or reserved"""
+        taken = {path.name for path in reserved or () if path.parent == folder}
+        taken |= {
+            row['name'] for row in self.conn.execute(
+                "SELECT name FROM fingerprints WHERE folder = ? AND (name = ? OR name GLOB ?)",
+                (str(folder), f"{stem}.pdf", f"{glob_escape(stem)}_*.pdf")
+            )
+        }
+        name, counter = f"{stem}.pdf", 1
+        while name in taken:
+            name = f"{stem}_{counter}.pdf"
+            counter += 1
+        return folder / name
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    def sync(self, archive_root: Path, workers: int = 1, keep: Optional[set] = None,
+             extracted: Optional[Dict[str, Dict]] = None) -> Dict:
+        """Rebuild the index from the archive, re-reading only changed files
+        
+        Paths in keep (documents still queued for the archive) aren't dropped.
+        extracted holds extract_text results by path from ArchiveIndex.reindex;
+        those files aren't read again.
+        """
+        root = Path(archive_root)
+        known = {
+            row['path']: (row['mtime_ns'], row['size'])
+            for row in self.conn.execute(
+                "SELECT path, mtime_ns, size FROM fingerprints WHERE path GLOB ?", (f"{glob_escape(str(root))}/*",)
+            )
+        }
+        seen, changed = set(), []
+        for path in sorted(root.rglob("*.pdf")):
+            seen.add(str(path))
+            stat = path.stat()
+            if known.get(str(path)) != (stat.st_mtime_ns, stat.st_size):
+                changed.append(path)
+
+        failed = 0
+        for path, result in zip(changed, extract_all(changed, workers, extracted)):
+            if 'error' in result:
+                failed += 1
+                continue
+            self.add(path, result['sha256'], result['full_text'])
+
+        removed = [path for path in known if path not in seen and path not in (keep or ())]
+        with self.conn:
+            for path in removed:
+                self._remove(path)
+
+        return {"fingerprinted": len(changed) - failed, "removed": len(removed), "failed": failed}
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Hot Folder - ingest PDFs that network scanners push into a folder
+
+Scan-to-folder devices write PDFs to an SMB share instead of being driven
+through scanline. watch mode follows that folder with inotify on Linux
+(through libc, no extra dependency), or by polling it elsewhere, with a
+periodic rescan in either case for events a network filesystem never
+reports. A file counts as complete once its size and mtime have held
+still for settle_seconds and it ends with a PDF trailer. Complete files
+are deduplicated by content hash against a SQLite ledger of everything
+ingested so far, then handed to an ingest callable on a bounded worker
+pool. A failed ingest is retried on a later rescan, up to max_attempts
+times; after that the file is left alone and reported by `watch --status`. When workers plus queue_size files are in flight, the watcher stops
+taking new ones: they wait in the folder (the backlog) until a slot frees
+up. The watcher writes its queue depth and throughput to a status file
+that `watch --status` reads.
+"""
+import os
+import sys
+import json
+import time
+import errno
+import select
+import sqlite3
+import struct
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+# ctypes, hashing and the worker pool are only needed while watching, not for watch --status
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+DEFAULT_WATCH_SETTINGS = {
+    'folder': None,            # the scan-to-folder share
+    'workers': 2,              # files ingested at once
+    'queue_size': 4,           # complete files waiting for a worker
+    'settle_seconds': 3.0,     # size and mtime must hold still this long
+    'poll_interval': 1.0,      # seconds between checks
+    'rescan_interval': 30.0,   # full listing even with inotify
+    'max_attempts': 3,         # failed ingests of a file before it is given up
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingested (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    job TEXT,
+    documents INTEGER,
+    error TEXT,
+    seconds REAL,
+    ingested_at TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ingested_status ON ingested (status);
+"""
+
+PDF_TRAILER = b"%%EOF"
+TRAILER_WINDOW = 1024
+
+
+def watch_settings(prefs: Optional[Dict] = None) -> Dict:
+    """Merge the watch preferences over the defaults"""
+    settings = dict(DEFAULT_WATCH_SETTINGS)
+    if prefs:
+        settings.update(prefs.get('watch') or {})
+    return settings
+
+
+def is_candidate(path: Path) -> bool:
+    """A PDF in the folder, not a hidden or temporary file of the writer"""
+    return path.suffix.lower() == '.pdf' and not path.name.startswith(('.', '~'))
+
+
+def has_trailer(path: Path) -> bool:
+    """True if the file ends with a PDF trailer, i.e. the writer got to the end"""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - TRAILER_WINDOW))
+            return PDF_TRAILER in f.read()
+    except OSError:
+        return False
+
+
+def document_count(result: Dict) -> int:
+    """Documents an ingest produced, pending or organized from a known letterhead"""
+    return len(result.get('documents') or []) + len(result.get('auto_organized') or [])
+
+
+class IngestLedger:
+    """Every file ingested from the hot folder, by content hash"""
+
+    def __init__(self, db_path: Path, max_attempts: int = DEFAULT_WATCH_SETTINGS['max_attempts']):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max(1, max_attempts)
+        self.conn = sqlite3.connect(str(self.db_path))
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(ingested)")]
+        if columns and 'attempts' not in columns:
+            # Ledgers from before retries: every recorded row was one attempt
+            with self.conn:
+                self.conn.execute("ALTER TABLE ingested ADD COLUMN attempts INTEGER NOT NULL DEFAULT 1")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> 'IngestLedger':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def seen(self, sha256: str) -> bool:
+        """True unless the file is new or its failed ingest may still be retried"""
+        return self.conn.execute(
+            "SELECT 1 FROM ingested WHERE sha256 = ? AND (status != 'failed' OR attempts >= ?)",
+            (sha256, self.max_attempts)
+        ).fetchone() is not None
+
+    def start(self, sha256: str, path: Path, size: int) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO ingested (sha256, path, size, status, ingested_at, attempts) "
+                "VALUES (?, ?, ?, 'processing', ?, 1) "
+                "ON CONFLICT (sha256) DO UPDATE SET path = excluded.path, size = excluded.size, "
+                "status = 'processing', ingested_at = excluded.ingested_at, attempts = attempts + 1",
+                (sha256, str(path), size, datetime.now().isoformat(timespec='seconds'))
+            )
+
+    def retryable(self, sha256: str) -> bool:
+        """True if the file's ingest failed and has attempts left"""
+        return self.conn.execute(
+            "SELECT 1 FROM ingested WHERE sha256 = ? AND status = 'failed' AND attempts < ?",
+            (sha256, self.max_attempts)
+        ).fetchone() is not None
+
+    def finish(self, sha256: str, result: Dict, seconds: float) -> None:
+        status = 'failed' if result.get('status') == 'error' else 'done'
+        with self.conn:
+            self.conn.execute(
+                "UPDATE ingested SET status = ?, job = ?, documents = ?, error = ?, seconds = ? WHERE sha256 = ?",
+                (status, result.get('job'), document_count(result), result.get('message')
+                 if status == 'failed' else None, round(seconds, 3), sha256)
+            )
+
+    def interrupted(self) -> List[Tuple[str, Path]]:
+        """Files whose ingest never finished, e.g. because the watcher was killed"""
+        rows = self.conn.execute("SELECT sha256, path FROM ingested WHERE status = 'processing' ORDER BY rowid")
+        return [(sha256, Path(path)) for sha256, path in rows]
+
+    def totals(self) -> Dict[str, int]:
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM ingested GROUP BY status")
+        return {status: count for status, count in rows}
+
+    def given_up(self) -> List[Dict]:
+        """Files whose ingest failed on every attempt"""
+        rows = self.conn.execute(
+            "SELECT path, error, attempts, ingested_at FROM ingested "
+            "WHERE status = 'failed' AND attempts >= ? ORDER BY rowid", (self.max_attempts,)
+        )
+        return [{"path": path, "error": error, "attempts": attempts, "last_attempt": last}
+                for path, error, attempts, last in rows]
+
+
+class _Inotify:
+    """Names written or moved into one directory, from the kernel's inotify"""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, directory: Path):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, str(directory).encode(), self.IN_CLOSE_WRITE | self.IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout: float) -> Set[str]:
+        """Names of files finished or moved in within timeout seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        names: Set[str] = set()
+        if not ready:
+            return names
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return names
+            raise
+        offset = 0
+        while offset + self.EVENT.size <= len(data):
+            _, _, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            names.add(data[offset:offset + length].rstrip(b'\0').decode(errors='replace'))
+            offset += length
+        return names
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class HotFolder:
+    """Watches a folder and ingests each new, complete, unseen PDF once"""
+
+    def __init__(self, folder: Path, ingest: Callable[[Path, str], Dict], ledger_path: Path,
+                 status_path: Path, settings: Optional[Dict] = None, backend: Optional[str] = None):
+        self.folder = Path(folder)
+        self.ingest = ingest
+        self.status_path = Path(status_path)
+        self.settings = settings or DEFAULT_WATCH_SETTINGS
+        self.ledger = IngestLedger(ledger_path, self.settings['max_attempts'])
+        self.capacity = max(1, self.settings['workers']) + max(0, self.settings['queue_size'])
+        from concurrent.futures import ThreadPoolExecutor
+        self.pool = ThreadPoolExecutor(max_workers=max(1, self.settings['workers']),
+                                       thread_name_prefix="ingest")
+
+        self.backend = backend or ('inotify' if sys.platform.startswith('linux') else 'polling')
+        self._inotify = None
+        if self.backend == 'inotify':
+            try:
+                self._inotify = _Inotify(self.folder)
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable ({e}), polling {self.folder}", file=sys.stderr)
+                self.backend = 'polling'
+
+        # path -> (size, mtime_ns, monotonic time it last changed) while settling
+        self._settling: Dict[Path, Tuple[int, int, float]] = {}
+        # path -> (size, mtime_ns) already dealt with, so unchanged files aren't re-hashed
+        self._handled: Dict[Path, Tuple[int, int]] = {}
+        self._backlog: Deque[Tuple[Path, str]] = deque()
+        self._backlogged: Set[str] = set()
+        self._running: Dict['Future', Tuple[Path, str, float]] = {}
+        self._last_rescan = 0.0
+        self.started = time.monotonic()
+        self.counts = {'ingested': 0, 'failed': 0, 'duplicates': 0, 'documents': 0}
+        self.last: Optional[Dict] = None
+
+        # The ingest callable picks up an interrupted file's unfinished job
+        for sha256, path in self.ledger.interrupted():
+            if path.exists():
+                self._backlog.append((path, sha256))
+                self._backlogged.add(sha256)
+
+    def run(self, stop: Optional[Callable[[], bool]] = None) -> None:
+        """Watch until stop() is true or the process is interrupted"""
+        try:
+            while not (stop and stop()):
+                self.step()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def step(self) -> None:
+        """One round: wait for events, settle files, collect finished and start new ingests"""
+        interval = self.settings['poll_interval']
+        now = time.monotonic()
+        if self._inotify and now - self._last_rescan < self.settings['rescan_interval']:
+            names = self._inotify.wait(interval)
+            self._observe([self.folder / name for name in names] + list(self._settling))
+        else:
+            if not self._inotify:
+                time.sleep(interval)
+            self._last_rescan = time.monotonic()
+            self._observe(self._listing())
+
+        self._collect()
+        while self._backlog and len(self._running) < self.capacity:
+            self._submit(*self._backlog.popleft())
+        self.write_status()
+
+    def _listing(self) -> List[Path]:
+        try:
+            return [path for path in self.folder.iterdir() if is_candidate(path)]
+        except FileNotFoundError:
+            return []
+
+    def _observe(self, paths: List[Path]) -> None:
+        """Track files until they hold still, then queue the ones not ingested yet"""
+        from page_analysis import file_hash
+        now = time.monotonic()
+        for path in set(paths):
+            if not is_candidate(path):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                self._settling.pop(path, None)
+                continue
+            state = (stat.st_size, stat.st_mtime_ns)
+            if self._handled.get(path) == state:
+                continue
+
+            settling = self._settling.get(path)
+            if settling is None or settling[:2] != state:
+                self._settling[path] = state + (now,)
+                continue
+            if now - settling[2] < self.settings['settle_seconds'] or not has_trailer(path):
+                continue
+
+            del self._settling[path]
+            self._handled[path] = state
+            sha256 = file_hash(path)
+            if sha256 in self._backlogged or self.ledger.seen(sha256):
+                self.counts['duplicates'] += 1
+                continue
+            self._backlog.append((path, sha256))
+            self._backlogged.add(sha256)
+
+    def _submit(self, path: Path, sha256: str) -> None:
+        try:
+            self.ledger.start(sha256, path, path.stat().st_size)
+        except FileNotFoundError:
+            self._backlogged.discard(sha256)
+            return
+        self._running[self.pool.submit(self.ingest, path, sha256)] = (path, sha256, time.monotonic())
+
+    def _collect(self) -> None:
+        """Record ingests that finished since the last round"""
+        for future in [f for f in self._running if f.done()]:
+            path, sha256, started = self._running.pop(future)
+            self._backlogged.discard(sha256)
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"status": "error", "error": "ingest_failed", "message": str(e)}
+            seconds = time.monotonic() - started
+            self.ledger.finish(sha256, result, seconds)
+
+            failed = result.get('status') == 'error'
+            if failed and self.ledger.retryable(sha256):
+                # Taken again once a rescan finds it settled
+                self._handled.pop(path, None)
+            self.counts['failed' if failed else 'ingested'] += 1
+            self.counts['documents'] += document_count(result)
+            self.last = {"path": str(path), "status": result.get('status'), "job": result.get('job'),
+                         "seconds": round(seconds, 3)}
+            print(f"Ingested {path.name}: {result.get('status')}", file=sys.stderr)
+
+    def status(self) -> Dict:
+        """Queue depth and throughput of this watcher"""
+        running = len(self._running)
+        active = min(running, max(1, self.settings['workers']))
+        minutes = max((time.monotonic() - self.started) / 60, 1e-9)
+        return {
+            "pid": os.getpid(),
+            "folder": str(self.folder),
+            "backend": self.backend,
+            "updated": datetime.now().isoformat(timespec='seconds'),
+            "uptime_seconds": round(minutes * 60, 1),
+            "queue": {
+                "settling": len(self._settling),
+                "backlog": len(self._backlog),
+                "queued": running - active,
+                "active": active,
+                "capacity": self.capacity,
+            },
+            **self.counts,
+            "files_per_minute": round(self.counts['ingested'] / minutes, 2),
+            "documents_per_minute": round(self.counts['documents'] / minutes, 2),
+            "last": self.last,
+        }
+
+    def write_status(self) -> None:
+        self.status_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.status_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.status(), f, indent=2)
+        os.replace(tmp_path, self.status_path)
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+        self._collect()
+        self.write_status()
+        if self._inotify:
+            self._inotify.close()
+        self.ledger.close()
+
+
+def read_status(status_path: Path, ledger_path: Path, settings: Optional[Dict] = None) -> Dict:
+    """The last status a watcher wrote, whether it is still running, the ledger totals
+    and the files given up on after max_attempts failed ingests
+    """
+    settings = settings or DEFAULT_WATCH_SETTINGS
+    status: Dict = {}
+    try:
+        with open(status_path, 'r') as f:
+            status = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        pass
+
+    watching = False
+    if status.get('pid'):
+        try:
+            os.kill(status['pid'], 0)
+            watching = True
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            watching = True
+
+    totals: Dict[str, int] = {}
+    given_up: List[Dict] = []
+    if Path(ledger_path).exists():
+        with IngestLedger(ledger_path, settings['max_attempts']) as ledger:
+            totals = ledger.totals()
+            given_up = ledger.given_up()
+    return {"watching": watching, **status, "totals": totals, "given_up": given_up}
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Jobs - checkpointed scan runs that can be resumed
+
+A scan used to leave merged-scan.pdf and merged-scan-ocr.pdf under fixed
+names in the shared staging folder, and a crash after scanline finished
+meant rescanning the paper. Each run is now a job with its own directory
+under scan-staging/jobs/<id> and a manifest.json recording, per completed
+stage, the content hashes of its inputs and outputs plus any small result
+(the split documents, the pending entries). resume --job <id> re-enters the
+pipeline: a stage whose inputs still hash the same and whose outputs are
+intact is skipped, so OCR and analysis never run twice for the same scan.
+
+A finished job's scans are deleted, since resume only returns its recorded
+result; the manifest stays until it is older than keep_days. Unfinished
+jobs keep everything for resume until keep_unfinished_days.
+"""
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from page_analysis import file_hash
+
+MANIFEST_VERSION = 1
+JOB_ID_FORMAT = "%Y%m%d_%H%M%S"
+
+DEFAULT_JOB_SETTINGS = {
+    'keep_days': 30,             # finished jobs' manifests, so resume can still answer
+    'keep_unfinished_days': 14,  # failed or interrupted jobs, with their scans
+}
+
+
+def job_settings(prefs: Optional[Dict] = None) -> Dict:
+    """Merge the jobs preferences over the defaults"""
+    settings = dict(DEFAULT_JOB_SETTINGS)
+    if prefs:
+        settings.update(prefs.get('jobs') or {})
+    return settings
+
+
+def value_hash(value) -> str:
+    """Stable hash of a JSON-serializable stage result"""
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ScanJob:
+    """One scan run's directory and manifest of completed stages"""
+
+    def __init__(self, directory: Path, manifest: Dict):
+        self.directory = Path(directory)
+        self.manifest = manifest
+
+    @property
+    def id(self) -> str:
+        return self.manifest['job']
+
+    @property
+    def mode(self) -> str:
+        return self.manifest['mode']
+
+    @property
+    def params(self) -> Dict:
+        return self.manifest['params']
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / "manifest.json"
+
+    @classmethod
+    def create(cls, jobs_dir: Path, mode: str, params: Dict) -> 'ScanJob':
+        """Start a job; its id is the start time, suffixed if another job took it"""
+        jobs_dir.mkdir(parents=True, exist_ok=True)
+        now = datetime.now()
+        base = now.strftime(JOB_ID_FORMAT)
+        job_id = base
+        n = 1
+        while True:
+            try:
+                (jobs_dir / job_id).mkdir()
+                break
+            except FileExistsError:
+                n += 1
+                job_id = f"{base}-{n}"
+
+        job = cls(jobs_dir / job_id, {
+            'version': MANIFEST_VERSION,
+            'job': job_id,
+            'mode': mode,
+            'params': params,
+            'created': now.isoformat(timespec='seconds'),
+            'status': 'running',
+            'stages': {},
+        })
+        job.save()
+        return job
+
+    @classmethod
+    def load(cls, jobs_dir: Path, job_id: str) -> Optional['ScanJob']:
+        """The job with this id, or None if there is no readable manifest"""
+        directory = jobs_dir / job_id
+        try:
+            with open(directory / "manifest.json", 'r') as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('job') != job_id:
+            return None
+        return cls(directory, manifest)
+
+    @staticmethod
+    def unfinished(jobs_dir: Path) -> List[str]:
+        """Ids of jobs that did not complete, oldest first"""
+        if not jobs_dir.exists():
+            return []
+        ids = []
+        for directory in sorted(jobs_dir.iterdir()):
+            job = ScanJob.load(jobs_dir, directory.name)
+            if job and job.manifest['status'] != 'complete':
+                ids.append(job.id)
+        return ids
+
+    @staticmethod
+    def prune(jobs_dir: Path, settings: Optional[Dict] = None, keep: Iterable[str] = ()) -> List[str]:
+        """Delete jobs not updated within their retention, except those in keep; the ids removed"""
+        settings = settings or DEFAULT_JOB_SETTINGS
+        if not jobs_dir.exists():
+            return []
+        now = datetime.now()
+        removed = []
+        for directory in sorted(jobs_dir.iterdir()):
+            job = ScanJob.load(jobs_dir, directory.name)
+            if job is None or job.id in keep:
+                continue
+            days = settings['keep_days'] if job.manifest['status'] == 'complete' else settings['keep_unfinished_days']
+            updated = datetime.fromisoformat(job.manifest.get('updated', job.manifest['created']))
+            if now - updated > timedelta(days=days):
+                shutil.rmtree(directory, ignore_errors=True)
+                removed.append(job.id)
+        return removed
+
+    def save(self) -> None:
+        """Write the manifest atomically, so a crash never leaves half of it"""
+        self.manifest['updated'] = datetime.now().isoformat(timespec='seconds')
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def stage(self, name: str, inputs: Optional[Dict[str, str]] = None) -> Optional[Dict]:
+        """The recorded stage if it can be reused: same inputs, outputs unchanged on disk"""
+        record = self.manifest['stages'].get(name)
+        if record is None:
+            return None
+        if inputs is not None and record['inputs'] != inputs:
+            return None
+        for output in record['outputs'].values():
+            path = Path(output['path'])
+            if not path.exists() or file_hash(path) != output['sha256']:
+                return None
+        return record
+
+    def complete(self, name: str, inputs: Dict[str, str], outputs: Optional[Dict[str, Path]] = None,
+                 **data) -> Dict:
+        """Record a finished stage with the hashes of its inputs and output files"""
+        record = {
+            'inputs': inputs,
+            'outputs': {
+                key: {'path': str(path), 'sha256': file_hash(Path(path))}
+                for key, path in (outputs or {}).items()
+            },
+            'completed': datetime.now().isoformat(timespec='seconds'),
+            **data,
+        }
+        self.manifest['stages'][name] = record
+        self.save()
+        return record
+
+    def output(self, name: str, key: str = 'pdf') -> Path:
+        return Path(self.manifest['stages'][name]['outputs'][key]['path'])
+
+    def finish(self, result: Dict, keep: Iterable[Path] = ()) -> Dict:
+        """Mark the job done and delete its working files; resume then returns this result as is
+        
+        Files in keep (a front scan waiting for its back side) stay with the manifest.
+        """
+        result = dict(result, job=self.id)
+        self.manifest['status'] = 'complete'
+        self.manifest['result'] = result
+        self.manifest.pop('error', None)
+        self.save()
+        # Entries of the job directory holding a kept file
+        kept = {self.directory / Path(path).relative_to(self.directory).parts[0] for path in keep}
+        kept.add(self.manifest_path)
+        for path in self.directory.iterdir():
+            if path in kept:
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+        return result
+
+    def fail(self, message: str) -> None:
+        self.manifest['status'] = 'failed'
+        self.manifest['error'] = message
+        self.save()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Letterheads - sender and type of documents from senders organized before
+
+Most mail comes from the same few dozen senders, yet every pending
+document went to the agent for identification. When a document is
+organized, the shingle signature of its first page's header (normalized
+as for boundary scoring: lower case, digits folded, page indicators
+dropped) is recorded here with the sender and type it was given. A new
+document's header is looked up by its shingles: each shingle is an indexed
+key, and only letterheads sharing one are compared. Shingles that occur
+under several senders (the recipient's own address, a town, "AG") identify
+nobody and are left out when the sender is matched. The type is then told
+apart by the whole header ("RECHNUNG Nr." against "Betreff:") among that
+sender's letterheads. The best match's similarity, discounted by how much
+the matching letterheads disagree, is the confidence the caller acts on.
+"""
+import sqlite3
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from boundaries import signature_hashes
+
+DEFAULT_LETTERHEAD_SETTINGS = {
+    'enabled': True,
+    'min_similarity': 0.6,     # letterheads less alike than this don't match at all
+    'merge_similarity': 0.9,   # a letterhead this close to a known one (same sender and type) counts for it
+    'common_senders': 2,       # shingles seen under this many senders are ignored
+    'type_margin': 0.1,        # a sender's letterheads this close to its best one vote on the type
+    'type_similarity': 0.8,    # a closest whole header less alike than this may be a type not seen yet
+    'prefill': 0.5,            # confidence to return a suggested sender and type
+    'auto_organize': 0.85,     # confidence to organize without the agent (null: never)
+    'min_seen': 2,             # ...once the sender and type were confirmed this often
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS letterheads (
+    id INTEGER PRIMARY KEY,
+    signature TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    doc_type TEXT NOT NULL,
+    seen INTEGER NOT NULL,
+    updated TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shingles (
+    hash INTEGER NOT NULL,
+    letterhead INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS shingles_hash ON shingles (hash);
+CREATE TABLE IF NOT EXISTS shingle_senders (
+    hash INTEGER PRIMARY KEY,
+    senders INTEGER NOT NULL
+);
+"""
+
+
+def letterhead_settings(prefs: Optional[Dict] = None) -> Dict:
+    """Merge the letterhead preferences over the defaults"""
+    settings = dict(DEFAULT_LETTERHEAD_SETTINGS)
+    if prefs:
+        settings.update(prefs.get('letterheads') or {})
+    return settings
+
+
+def cosine(first: Set[int], second: Set[int]) -> float:
+    if not first or not second:
+        return 0.0
+    return len(first & second) / (len(first) * len(second)) ** 0.5
+
+
+def auto_organizable(match: Optional[Dict], settings: Dict) -> bool:
+    """Whether a match is confident and confirmed enough to organize without the agent"""
+    threshold = settings['auto_organize']
+    return bool(match) and threshold is not None and match['confidence'] >= threshold \
+        and match['seen'] >= settings['min_seen']
+
+
+class LetterheadIndex:
+    """SQLite index of the letterheads of organized documents"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self._common = None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> 'LetterheadIndex':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def common(self, senders: int) -> Set[int]:
+        """Shingles that occur in the letterheads of at least this many senders"""
+        if self._common is None or self._common[0] != senders:
+            rows = self.conn.execute("SELECT hash FROM shingle_senders WHERE senders >= ?", (senders,))
+            self._common = (senders, {row['hash'] for row in rows})
+        return self._common[1]
+
+    def similar(self, signature: str, settings: Optional[Dict] = None) -> List[Tuple[float, float, sqlite3.Row]]:
+        """Known letterheads at least min_similarity alike, most similar first
+
+        Each comes with its similarity on the shingles that identify a sender
+        and on the whole header.
+        """
+        settings = settings or DEFAULT_LETTERHEAD_SETTINGS
+        common = self.common(settings['common_senders'])
+        hashes = set(signature_hashes(signature))
+        distinctive = hashes - common
+        if not distinctive:
+            return []
+        candidates = self.conn.execute(
+            f"SELECT * FROM letterheads WHERE id IN "
+            f"(SELECT letterhead FROM shingles WHERE hash IN ({', '.join('?' * len(distinctive))}))",
+            list(distinctive)
+        )
+        scored = []
+        for row in candidates:
+            known = set(signature_hashes(row['signature']))
+            score = cosine(distinctive, known - common)
+            if score >= settings['min_similarity']:
+                scored.append((score, cosine(hashes, known), row))
+        return sorted(scored, key=lambda item: (-item[0], item[2]['id']))
+
+    def match(self, signature: str, settings: Optional[Dict] = None) -> Optional[Dict]:
+        """Most likely sender and type for a letterhead, with a confidence from 0 to 1
+
+        Each matching letterhead votes for its sender as often as it was
+        confirmed; the sender's confidence is its best similarity times its
+        share of the votes. Among that sender's letterheads, those within
+        type_margin of the closest whole header vote on the type the same way;
+        a closest header below type_similarity also scales the confidence
+        down, as the sender may be writing a kind of document it never has.
+        """
+        settings = settings or DEFAULT_LETTERHEAD_SETTINGS
+        scored = self.similar(signature, settings)
+        if not scored:
+            return None
+
+        votes: Dict[str, int] = defaultdict(int)
+        best: Dict[str, float] = {}
+        for score, _, row in scored:
+            votes[row['sender']] += row['seen']
+            best.setdefault(row['sender'], score)
+        total = sum(votes.values())
+        sender = max(votes, key=lambda name: (best[name] * votes[name], votes[name]))
+        sender_confidence = best[sender] * votes[sender] / total
+
+        own = [(full, row) for _, full, row in scored if row['sender'] == sender]
+        closest = max(full for full, _ in own)
+        type_votes: Dict[str, int] = defaultdict(int)
+        for full, row in own:
+            if full >= closest - settings['type_margin']:
+                type_votes[row['doc_type']] += row['seen']
+        doc_type = max(type_votes, key=lambda name: (type_votes[name],
+                                                      max(full for full, row in own if row['doc_type'] == name)))
+        type_confidence = type_votes[doc_type] / sum(type_votes.values())
+        if closest < settings['type_similarity']:
+            type_confidence *= closest
+        return {
+            "sender": sender,
+            "type": doc_type or None,
+            "confidence": round(sender_confidence * type_confidence, 3),
+            "sender_confidence": round(sender_confidence, 3),
+            "similarity": round(best[sender], 3),
+            "seen": type_votes[doc_type],
+        }
+
+    def record(self, signature: str, sender: str, doc_type: Optional[str],
+               settings: Optional[Dict] = None) -> None:
+        """Remember that a document with this letterhead was organized as sender and type
+
+        A letterhead close to one already known for the same sender and type
+        confirms that one instead of adding another.
+        """
+        settings = settings or DEFAULT_LETTERHEAD_SETTINGS
+        hashes = set(signature_hashes(signature))
+        if not hashes:
+            return
+        doc_type = doc_type or ''
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.conn:
+            for score, _, row in self.similar(signature, settings):
+                if score < settings['merge_similarity']:
+                    break
+                if row['sender'] == sender and row['doc_type'] == doc_type:
+                    self.conn.execute("UPDATE letterheads SET seen = seen + 1, updated = ? WHERE id = ?",
+                                      (now, row['id']))
+                    return
+
+            known = {
+                row['hash'] for row in self.conn.execute(
+                    "SELECT DISTINCT s.hash AS hash FROM shingles s JOIN letterheads l ON l.id = s.letterhead "
+                    "WHERE l.sender = ?", (sender,)
+                )
+            }
+            letterhead = self.conn.execute(
+                "INSERT INTO letterheads (signature, sender, doc_type, seen, updated) VALUES (?, ?, ?, 1, ?)",
+                (signature, sender, doc_type, now)
+            ).lastrowid
+            self.conn.executemany("INSERT INTO shingles VALUES (?, ?)", [(value, letterhead) for value in hashes])
+            self.conn.executemany(
+                "INSERT INTO shingle_senders VALUES (?, 1) ON CONFLICT (hash) DO UPDATE SET senders = senders + 1",
+                [(value,) for value in hashes - known]
+            )
+        self._common = None
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM letterheads").fetchone()[0]
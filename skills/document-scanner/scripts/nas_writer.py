@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+NAS Writer - verified, atomic, concurrent copies into the archive
+
+shutil.move across filesystems is an unverified copy followed by a delete.
+copy_verified hashes the source while copying it to a temporary name next to
+the destination, fsyncs, re-reads the copy to compare hashes and only then
+links it into place, retrying with exponential backoff when the share
+hiccups. A file already at the destination is never replaced: the copy
+takes the next free numbered name beside it instead (a document filed
+while the archive was offline can't know what arrived there meanwhile),
+unless that file is this very copy from an interrupted run. Deleting the
+source is left to the caller, after the copy is known to be good. copy_all
+runs many such copies on a bounded thread pool.
+"""
+import os
+import re
+import time
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+CHUNK_SIZE = 1 << 20
+# Numbered names tried beside an occupied destination before giving up
+MAX_RENAMES = 1000
+
+DEFAULT_WRITE_SETTINGS = {
+    'workers': 4,      # concurrent copies to the NAS
+    'retries': 3,      # extra attempts per file after the first
+    'backoff': 0.5,    # seconds before the first retry, doubled each time
+}
+
+
+class VerificationError(OSError):
+    """The copy on the destination doesn't match the source"""
+
+
+def write_settings(prefs: Optional[Dict] = None) -> Dict:
+    """Merge the nas_writes preferences over the defaults"""
+    settings = dict(DEFAULT_WRITE_SETTINGS)
+    if prefs:
+        settings.update(prefs.get('nas_writes') or {})
+    return settings
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _free_names(dest: Path) -> Iterator[Path]:
+    """dest, then the numbered names after it: name_1.pdf, name_2.pdf, ..."""
+    yield dest
+    match = re.fullmatch(r'(.+)_(\d+)', dest.stem)
+    stem, first = (match.group(1), int(match.group(2)) + 1) if match else (dest.stem, 1)
+    for counter in range(first, first + MAX_RENAMES):
+        yield dest.with_name(f"{stem}_{counter}{dest.suffix}")
+
+
+def _link_new(tmp_path: Path, dest: Path) -> None:
+    """Give tmp_path the name dest; raises FileExistsError instead of replacing a file"""
+    try:
+        os.link(tmp_path, dest)
+    except FileExistsError:
+        raise
+    except OSError:
+        # Shares without hard links: claim the name exclusively, then fill it
+        os.close(os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+        os.replace(tmp_path, dest)
+        return
+    tmp_path.unlink()
+
+
+def _publish(tmp_path: Path, dest: Path, checksum: str) -> Path:
+    """Move a verified copy to dest or the next free name beside it; the path it ended up at"""
+    for candidate in _free_names(dest):
+        try:
+            _link_new(tmp_path, candidate)
+            return candidate
+        except FileExistsError:
+            if sha256_file(candidate) == checksum:
+                # Our own copy, placed by a run that was interrupted before it was recorded
+                tmp_path.unlink()
+                return candidate
+    raise FileExistsError(f"No free name for {dest}")
+
+
+def _copy_once(src: Path, dest: Path) -> Tuple[str, int, Path]:
+    """Copy through a temporary name, verify, then link into place without replacing anything"""
+    tmp_path = dest.with_name(f".{dest.name}.{os.getpid()}.partial")
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with open(src, 'rb') as source, open(tmp_path, 'wb') as target:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                target.write(chunk)
+                size += len(chunk)
+            target.flush()
+            os.fsync(target.fileno())
+        shutil.copystat(src, tmp_path)
+
+        expected = digest.hexdigest()
+        if sha256_file(tmp_path) != expected:
+            raise VerificationError(f"Checksum mismatch writing {dest}")
+        return expected, size, _publish(tmp_path, dest, expected)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def copy_verified(src: Path, dest: Path, retries: int = DEFAULT_WRITE_SETTINGS['retries'],
+                  backoff: float = DEFAULT_WRITE_SETTINGS['backoff']) -> Dict:
+    """Copy src to dest with checksum verification and retries; raises OSError when out of attempts
+
+    The report's path is where the copy landed, which differs from dest
+    when a file was already there.
+    """
+    start = time.perf_counter()
+    for attempt in range(1, retries + 2):
+        try:
+            checksum, size, path = _copy_once(Path(src), Path(dest))
+            return {
+                "path": str(path),
+                "sha256": checksum,
+                "bytes": size,
+                "attempts": attempt,
+                "seconds": round(time.perf_counter() - start, 4),
+            }
+        except FileExistsError:
+            raise
+        except OSError:
+            if attempt > retries:
+                raise
+            time.sleep(backoff * 2 ** (attempt - 1))
+
+
+def copy_all(jobs: List[Tuple[Path, Path]], settings: Optional[Dict] = None) -> List[Dict]:
+    """Run copy_verified for each (src, dest) on a bounded pool, one report per job"""
+    settings = settings or DEFAULT_WRITE_SETTINGS
+
+    def run(job: Tuple[Path, Path]) -> Dict:
+        try:
+            return {"status": "ok", **copy_verified(job[0], job[1], settings['retries'], settings['backoff'])}
+        except OSError as e:
+            return {"status": "error", "error": "write_failed", "message": str(e)}
+
+    if not jobs:
+        return []
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=max(1, min(settings['workers'], len(jobs)))) as pool:
+        return list(pool.map(run, jobs))
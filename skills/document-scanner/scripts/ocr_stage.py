@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+OCR Stage - page-sharded parallel OCR with per-page result reuse
+
+Instead of one ocrmypdf run over the whole merged scan (one timeout for the
+whole stack, all-or-nothing fallback), the PDF is split into chunks of
+consecutive pages that are OCR'd concurrently by a bounded worker pool. Each
+OCR'd page is cached under the hash of the original page and of the OCR
+command line, so a retried or rescanned page is never OCR'd twice, while a
+changed language or option OCRs it afresh. A failed chunk only falls back
+for its own pages. The cache is pruned like the page cache (prune_cache).
+"""
+import os
+import json
+import shutil
+import hashlib
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from io import BytesIO
+from typing import List, Dict, Optional
+
+from PyPDF2 import PdfReader, PdfWriter
+
+# Input and output paths are appended; --jobs 1 because we parallelize per chunk
+OCR_COMMAND = ["ocrmypdf", "--skip-text", "--optimize", "1", "--jobs", "1", "--output-type", "pdf"]
+
+DEFAULT_OCR_SETTINGS = {
+    'command': OCR_COMMAND,
+    'workers': 2,            # concurrent OCR processes
+    'chunk_pages': 4,        # consecutive pages per OCR process
+    'timeout_per_page': 60,  # seconds, scaled by chunk size
+}
+
+
+def ocr_settings(prefs: Optional[Dict] = None) -> Dict:
+    """Merge the ocr preferences over the defaults"""
+    settings = dict(DEFAULT_OCR_SETTINGS)
+    if prefs:
+        settings.update(prefs.get('ocr') or {})
+    return settings
+
+
+def ocr_available(settings: Optional[Dict] = None) -> bool:
+    """Check if the configured OCR command is installed"""
+    command = (settings or DEFAULT_OCR_SETTINGS)['command']
+    return shutil.which(command[0]) is not None
+
+
+def config_digest(settings: Dict) -> str:
+    """Digest of the OCR configuration that decides a page's output: the command line"""
+    return hashlib.sha256(json.dumps([str(arg) for arg in settings['command']]).encode()).hexdigest()
+
+
+def cache_key(page, config: str) -> str:
+    """OCR cache name of a page under the configuration with this config_digest"""
+    return hashlib.sha256(f"{config}:{page_hash(page)}".encode()).hexdigest()
+
+
+def page_hash(page) -> str:
+    """Hash of what a page looks like: content stream, images and size"""
+    digest = hashlib.sha256()
+    digest.update(str([float(v) for v in page.mediabox]).encode())
+
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+
+    try:
+        resources = page.get('/Resources')
+        xobjects = resources['/XObject'].get_object() if resources and '/XObject' in resources else {}
+    except (KeyError, TypeError, AttributeError):
+        xobjects = {}
+    for name in sorted(xobjects):
+        # The serialized object: its dictionary and still-encoded data
+        serialized = BytesIO()
+        xobjects[name].get_object().write_to_stream(serialized, None)
+        digest.update(str(name).encode())
+        digest.update(serialized.getvalue())
+
+    return digest.hexdigest()
+
+
+def _chunk_runs(indices: List[int], chunk_pages: int) -> List[List[int]]:
+    """Group page indices into runs of consecutive pages, at most chunk_pages long"""
+    chunks = []
+    for index in indices:
+        if chunks and index == chunks[-1][-1] + 1 and len(chunks[-1]) < chunk_pages:
+            chunks[-1].append(index)
+        else:
+            chunks.append([index])
+    return chunks
+
+
+def _write_chunk(reader: PdfReader, chunk: List[int], path: Path) -> None:
+    writer = PdfWriter()
+    for index in chunk:
+        writer.add_page(reader.pages[index])
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def _run_ocr(chunk_in: Path, chunk_out: Path, page_count: int, settings: Dict) -> bool:
+    """Run the OCR command on one chunk file; this is the only parallel part"""
+    try:
+        result = subprocess.run(
+            list(settings['command']) + [str(chunk_in), str(chunk_out)],
+            capture_output=True, text=True, timeout=settings['timeout_per_page'] * page_count
+        )
+        return result.returncode == 0 and chunk_out.exists()
+    except Exception:
+        return False
+
+
+def _store_chunk(chunk_out: Path, chunk: List[int], hashes: List[str], cache_dir: Path) -> None:
+    """Split an OCR'd chunk into single-page cache entries"""
+    try:
+        ocr_reader = PdfReader(chunk_out)
+        if len(ocr_reader.pages) != len(chunk):
+            return
+    except Exception:
+        return
+
+    for offset, index in enumerate(chunk):
+        page_writer = PdfWriter()
+        page_writer.add_page(ocr_reader.pages[offset])
+        cached = cache_dir / f"{hashes[index]}.pdf"
+        tmp_path = cached.with_suffix('.tmp')
+        with open(tmp_path, "wb") as f:
+            page_writer.write(f)
+        os.replace(tmp_path, cached)
+
+
+def ocr_pages(pdf_path: Path, output_path: Path, cache_dir: Path,
+              settings: Optional[Dict] = None) -> Dict:
+    """OCR a PDF chunk by chunk, reusing cached pages, and reassemble in order
+
+    Returns counts of pages taken from the cache, newly OCR'd, and left
+    without OCR because their chunk failed.
+    """
+    settings = settings or DEFAULT_OCR_SETTINGS
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    reader = PdfReader(pdf_path)
+    config = config_digest(settings)
+    hashes = [cache_key(page, config) for page in reader.pages]
+    missing = [i for i, h in enumerate(hashes) if not (cache_dir / f"{h}.pdf").exists()]
+    # Identical pages within one scan only need OCR once
+    first_seen = {}
+    for i in missing:
+        first_seen.setdefault(hashes[i], i)
+    chunks = _chunk_runs(sorted(first_seen.values()), max(1, settings['chunk_pages']))
+
+    # PdfReader isn't thread-safe: split and reassemble here, only OCR runs in the pool
+    with tempfile.TemporaryDirectory(dir=output_path.parent) as tmp:
+        work_dir = Path(tmp)
+        jobs = []
+        for chunk in chunks:
+            chunk_in = work_dir / f"chunk-{chunk[0]:04d}.pdf"
+            chunk_out = work_dir / f"chunk-{chunk[0]:04d}-ocr.pdf"
+            _write_chunk(reader, chunk, chunk_in)
+            jobs.append((chunk, chunk_in, chunk_out))
+
+        workers = max(1, min(settings['workers'], len(jobs)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(
+                lambda job: _run_ocr(job[1], job[2], len(job[0]), settings), jobs
+            ))
+
+        for (chunk, _, chunk_out), ok in zip(jobs, outcomes):
+            if ok:
+                _store_chunk(chunk_out, chunk, hashes, cache_dir)
+
+    writer = PdfWriter()
+    # PdfWriter maps source objects by id(reader): keep every reader alive until written
+    page_readers = []
+    fallback = 0
+    for index, page in enumerate(reader.pages):
+        cached = cache_dir / f"{hashes[index]}.pdf"
+        if cached.exists():
+            # Marks the entry as used for prune_cache
+            os.utime(cached)
+            page_readers.append(PdfReader(cached))
+            writer.add_page(page_readers[-1].pages[0])
+        else:
+            writer.add_page(page)
+            fallback += 1
+
+    with open(output_path, "wb") as f:
+        writer.write(f)
+
+    return {
+        "pages": len(reader.pages),
+        "cached": len(reader.pages) - len(missing),
+        "ocr": len(missing) - fallback,
+        "failed": fallback,
+    }
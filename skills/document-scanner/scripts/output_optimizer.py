@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Output Optimizer - bilevel re-encoding of pending documents within a size budget
+
+Scans arrive as 1-bit images compressed with Flate; ocrmypdf --optimize 1
+keeps them that way and single mode skips even that, so every archived
+page costs several times what it needs to and organize spends its time
+pushing those bytes to the NAS. Each pending document is rewritten once,
+before it is seeded into the page cache: every 1-bit image is coded as
+CCITT Group 4 and kept if that is smaller, identical images are coded once
+and stored once, and content streams, fonts and the OCR text layer are
+copied untouched. A page whose images still exceed max_page_bytes has its
+scan downsampled towards the budget (area pooling that keeps thin strokes),
+never below min_dpi; pages that can't fit are reported. Gray and color
+images are left alone, as making them bilevel would lose content.
+Documents are optimized in parallel processes.
+
+Optional dependencies:
+    pip3 install numpy            # required; without it documents stay as written
+"""
+import os
+import time
+from io import BytesIO
+from itertools import repeat
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from blank_detection import image_darkness
+from ccitt import available, encode_g4
+from page_analysis import process_pool, process_workers, resolve_workers
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if TYPE_CHECKING:
+    from PyPDF2.generic import StreamObject
+
+DEFAULT_OPTIMIZE_SETTINGS = {
+    'enabled': True,
+    'max_page_bytes': 150 * 1024,  # image bytes per page above which the scan is downsampled
+    'min_dpi': 200,                # ...but never below this resolution
+    'workers': 0,                  # documents optimized in parallel (0 = one per core)
+}
+
+# Images already coded for their content; decoding them to recode is no gain
+CODED_FILTERS = {'/CCITTFaxDecode', '/JBIG2Decode', '/DCTDecode', '/JPXDecode'}
+# Share of a pooled block that must be ink: a 1-pixel stroke survives halving, a lone speck doesn't
+BLOCK_INK = 0.25
+FIT_ATTEMPTS = 4
+
+
+def optimize_settings(prefs: Optional[Dict] = None) -> Dict:
+    """Merge the optimize preferences over the defaults"""
+    settings = dict(DEFAULT_OPTIMIZE_SETTINGS)
+    if prefs:
+        settings.update(prefs.get('optimize') or {})
+    return settings
+
+
+def optimize_available() -> bool:
+    """Check if documents can be re-encoded"""
+    return available()
+
+
+def downsample(ink, scale: float):
+    """Area-pooled bilevel image scaled by scale < 1"""
+    height, width = ink.shape
+    rows = max(1, round(height * scale))
+    cols = max(1, round(width * scale))
+    ys = np.arange(rows) * height // rows
+    xs = np.arange(cols) * width // cols
+    sums = np.add.reduceat(np.add.reduceat(ink.astype(np.int32), ys, axis=0), xs, axis=1)
+    areas = np.outer(np.diff(np.append(ys, height)), np.diff(np.append(xs, width)))
+    return sums > areas * BLOCK_INK
+
+
+def _filters(xobject) -> List[str]:
+    filters = xobject.get('/Filter')
+    if filters is None:
+        return []
+    return [str(name) for name in filters] if isinstance(filters, list) else [str(filters)]
+
+
+def _is_bilevel(xobject) -> bool:
+    """A 1-bit gray image painted as it is, without a mask"""
+    # A PDF false is a truthy object, hence the comparison
+    if xobject.get('/ImageMask', False) == True or '/SMask' in xobject or '/Mask' in xobject:  # noqa: E712
+        return False
+    return int(xobject.get('/BitsPerComponent', 8)) == 1
+
+
+def _ink(xobject):
+    """Ink (True = black) of a bilevel image, None if it can't be decoded"""
+    darkness = image_darkness(xobject)
+    return None if darkness is None else darkness > 0.5
+
+
+def _page_images(page) -> List['StreamObject']:
+    """The distinct image XObjects a page draws"""
+    try:
+        resources = page.get('/Resources')
+        if not resources or '/XObject' not in resources.get_object():
+            return []
+        xobjects = resources.get_object()['/XObject'].get_object()
+    except (KeyError, TypeError, AttributeError):
+        return []
+    images = {}
+    for name in xobjects:
+        xobject = xobjects[name].get_object()
+        if xobject.get('/Subtype') == '/Image':
+            images[id(xobject)] = xobject
+    return list(images.values())
+
+
+def _set_g4(xobject, data: bytes, shape: Tuple[int, int]) -> None:
+    from PyPDF2.generic import DictionaryObject, NameObject, NumberObject
+    height, width = shape
+    for key in ('/DecodeParms', '/Decode', '/DL'):
+        xobject.pop(key, None)
+    xobject.update({
+        NameObject('/Width'): NumberObject(width),
+        NameObject('/Height'): NumberObject(height),
+        NameObject('/ColorSpace'): NameObject('/DeviceGray'),
+        NameObject('/BitsPerComponent'): NumberObject(1),
+        NameObject('/Filter'): NameObject('/CCITTFaxDecode'),
+        NameObject('/DecodeParms'): DictionaryObject({
+            NameObject('/K'): NumberObject(-1),
+            NameObject('/Columns'): NumberObject(width),
+            NameObject('/Rows'): NumberObject(height),
+        }),
+    })
+    xobject._data = data
+    if hasattr(xobject, 'decoded_self'):
+        xobject.decoded_self = None
+
+
+def _fit(ink, budget: int, floor: float) -> Tuple[bytes, Tuple[int, int]]:
+    """Group 4 code of the image scaled down until it fits the budget or reaches the floor scale"""
+    scale, image = 1.0, ink
+    data = encode_g4(image)
+    for _ in range(FIT_ATTEMPTS):
+        if len(data) <= budget or scale <= floor:
+            break
+        # Coded size grows about linearly with resolution (one code per edge per row)
+        scale = max(floor, scale * budget / len(data) * 0.9)
+        image = downsample(ink, scale)
+        data = encode_g4(image)
+    return data, image.shape
+
+
+def _optimize_page(page, settings: Dict, coded: Dict[str, Optional[Tuple[bytes, Tuple[int, int]]]],
+                   done: set) -> Dict:
+    """Recode a page's 1-bit images in place; its image bytes and whether its scan was downsampled"""
+    from bulk_split import stream_key
+    inks, recoded = {}, 0
+    for xobject in _page_images(page):
+        if id(xobject) in done or not _is_bilevel(xobject) or CODED_FILTERS.intersection(_filters(xobject)):
+            continue
+        done.add(id(xobject))
+        key = stream_key(xobject)
+        if key not in coded:
+            ink = _ink(xobject)
+            if ink is None:
+                continue
+            inks[id(xobject)] = ink
+            data = encode_g4(ink)
+            coded[key] = (data, ink.shape) if len(data) < len(xobject._data or b'') else None
+        if coded[key] is not None:
+            _set_g4(xobject, *coded[key])
+            recoded += 1
+
+    images = _page_images(page)
+    size = sum(len(xobject._data or b'') for xobject in images)
+    budget = settings['max_page_bytes']
+    bilevel = [xobject for xobject in images if _is_bilevel(xobject)]
+    if not budget or size <= budget or not bilevel:
+        return {"bytes": size, "recoded": recoded, "downsampled": False}
+
+    # The page's largest bilevel image is its scan; it gets what the other images leave of the budget
+    scan = max(bilevel, key=lambda xobject: int(xobject['/Width']) * int(xobject['/Height']))
+    ink = inks[id(scan)] if id(scan) in inks else _ink(scan)
+    width_inches = float(page.mediabox.width) / 72
+    dpi = int(scan['/Width']) / width_inches if width_inches else 0
+    floor = min(1.0, settings['min_dpi'] / dpi) if dpi else 1.0
+    if ink is None or floor >= 1.0:
+        return {"bytes": size, "recoded": recoded, "downsampled": False}
+    others = size - len(scan._data or b'')
+    data, shape = _fit(ink, max(1, budget - others), floor)
+    if len(data) >= len(scan._data or b''):
+        return {"bytes": size, "recoded": recoded, "downsampled": False}
+    _set_g4(scan, data, shape)
+    return {"bytes": others + len(data), "recoded": recoded, "downsampled": True}
+
+
+def optimize_document(pdf_path: Path, settings: Optional[Dict] = None) -> Dict:
+    """Re-encode one PDF in place; the report has its bytes before and after, and the time taken
+
+    A document with no image to recode, or that can't be parsed or would not
+    get smaller, is left as it was.
+    """
+    from PyPDF2 import PdfReader, PdfWriter
+    from bulk_split import dedupe_streams
+    settings = settings or DEFAULT_OPTIMIZE_SETTINGS
+    start = time.perf_counter()
+    pdf_path = Path(pdf_path)
+    before = pdf_path.stat().st_size
+    report = {"path": str(pdf_path), "bytes_before": before, "bytes_after": before, "images_recoded": 0,
+              "pages_downsampled": [], "pages_over_budget": []}
+
+    try:
+        writer = PdfWriter()
+        for page in PdfReader(str(pdf_path)).pages:
+            writer.add_page(page)
+        coded: Dict[str, Optional[Tuple[bytes, Tuple[int, int]]]] = {}
+        done: set = set()
+        for number, page in enumerate(writer.pages, start=1):
+            result = _optimize_page(page, settings, coded, done)
+            report["images_recoded"] += result["recoded"]
+            if result["downsampled"]:
+                report["pages_downsampled"].append(number)
+            if settings['max_page_bytes'] and result["bytes"] > settings['max_page_bytes']:
+                report["pages_over_budget"].append(number)
+        if report["images_recoded"] or report["pages_downsampled"]:
+            # Distinct source images may have coded identically
+            dedupe_streams(writer)
+            buffer = BytesIO()
+            writer.write(buffer)
+            data = buffer.getvalue()
+            if len(data) < before:
+                tmp_path = pdf_path.with_suffix('.tmp')
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, pdf_path)
+                report["bytes_after"] = len(data)
+    except Exception as e:
+        report["error"] = str(e)
+
+    report["ratio"] = round(before / report["bytes_after"], 2) if report["bytes_after"] else 1.0
+    report["seconds"] = round(time.perf_counter() - start, 4)
+    return report
+
+
+def optimize_documents(paths: List[Path], settings: Optional[Dict] = None) -> Dict:
+    """Optimize PDFs in place, one process per document up to the workers setting
+
+    Returns the per-document reports and the totals: bytes before and
+    after, the compression ratio and the wall time.
+    """
+    settings = settings or DEFAULT_OPTIMIZE_SETTINGS
+    start = time.perf_counter()
+    workers = max(1, min(process_workers(resolve_workers(settings['workers'])), len(paths)))
+    if workers == 1:
+        reports = [optimize_document(path, settings) for path in paths]
+    else:
+        with process_pool(workers) as pool:
+            reports = list(pool.map(optimize_document, paths, repeat(settings)))
+
+    before = sum(report["bytes_before"] for report in reports)
+    after = sum(report["bytes_after"] for report in reports)
+    return {
+        "documents": reports,
+        "bytes_before": before,
+        "bytes_after": after,
+        "ratio": round(before / after, 2) if after else 1.0,
+        "pages_over_budget": sum(len(report["pages_over_budget"]) for report in reports),
+        "seconds": round(time.perf_counter() - start, 4),
+    }
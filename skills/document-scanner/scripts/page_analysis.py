@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""
+Page Analysis - extract each page's text once per scan
+
+Blank detection, format analysis, splitting and list-pending all need the
+same per-page text. PageAnalysis extracts it once and keeps the resulting
+features in memory and in a JSON sidecar keyed by the PDF's content hash and
+page index, so later calls and later invocations reuse it.
+
+Only the small features stay in memory. With a cache directory each page's
+text is appended to a text spool next to the sidecar and read back on
+demand, so a several-hundred-page stack costs a few hundred bytes per page
+rather than its whole text, held several times over.
+
+Both tiers are bounded for long-running serve and watch processes: memory
+holds the features of the most recently used MAX_CACHED_DOCUMENTS PDFs,
+and prune_cache() drops the least recently used sidecars and spools once
+the cache directory is over its size or age limit (cache preferences).
+The module caches are shared by the threads of concurrent ingest jobs and
+guarded by one lock; text extraction runs outside it, and each thread
+parses its own PdfReader, which is not thread-safe.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from itertools import repeat
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Dict, Iterable, Iterator, Tuple, Optional
+
+from extraction import extract_page_indicator
+from boundaries import shingle_signature
+
+# PyPDF2 is imported where a PDF is opened: a cached analysis never loads it
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+    from PyPDF2 import PdfReader
+
+SIDECAR_VERSION = 3
+BLANK_TEXT_THRESHOLD = 50
+MIN_PAGES_PER_WORKER = 8
+# A page whose opening contains one of these starts a new letter
+GREETINGS = ('sehr geehrte', 'guten tag')
+# Per-page features kept in memory and in the sidecar; the text is spooled
+CACHED_FEATURES = ('index', 'is_blank', 'page_indicator', 'opens_letter', 'header_shingles', 'footer_shingles',
+                   'text_length', 'line_count')
+
+# (content_hash, page_index) -> page features
+_page_cache: Dict[Tuple[str, int], Dict] = {}
+# content_hash -> page count
+_page_counts: Dict[str, int] = {}
+# (resolved path, mtime_ns, size) -> content hash
+_file_hashes: Dict[Tuple[str, int, int], str] = {}
+# content_hash -> text spool holding the pages' text
+_text_spools: Dict[str, Path] = {}
+# (thread, content_hash) -> parsed reader, so analysis and splitting share one parse
+_readers: Dict[Tuple[int, str], 'PdfReader'] = {}
+MAX_OPEN_READERS = 4
+# content hashes with features in memory, least recently used first
+_documents: Dict[str, None] = {}
+MAX_CACHED_DOCUMENTS = 256
+MAX_FILE_HASHES = 4096
+# Guards all of the above
+_lock = threading.RLock()
+
+DEFAULT_CACHE_SETTINGS = {
+    'max_mb': 512,        # per cache directory; least recently used entries go first above this
+    'max_age_days': 90,   # entries unused for this long are dropped
+}
+
+
+def cache_settings(prefs: Optional[Dict] = None) -> Dict:
+    """Merge the cache preferences over the defaults"""
+    settings = dict(DEFAULT_CACHE_SETTINGS)
+    if prefs:
+        settings.update(prefs.get('cache') or {})
+    return settings
+
+
+def prune_cache(cache_dir: Path, settings: Optional[Dict] = None) -> Dict:
+    """Delete cache entries unused for max_age_days, then the oldest until under max_mb
+
+    An entry is all files sharing a name up to the first dot (a sidecar and
+    its text spool); its age is that of its newest file. Entries dropped
+    from disk are forgotten in memory too.
+    """
+    settings = settings or DEFAULT_CACHE_SETTINGS
+    cache_dir = Path(cache_dir)
+    if not cache_dir.is_dir():
+        return {"removed": 0, "bytes_freed": 0}
+    entries: Dict[str, List] = {}
+    for path in cache_dir.iterdir():
+        try:
+            if not path.is_file():
+                continue
+            stat = path.stat()
+        except OSError:
+            continue
+        entry = entries.setdefault(path.name.split('.')[0], [0.0, 0, []])
+        entry[0] = max(entry[0], stat.st_mtime)
+        entry[1] += stat.st_size
+        entry[2].append(path)
+
+    cutoff = time.time() - settings['max_age_days'] * 86400
+    budget = settings['max_mb'] * 1024 * 1024
+    kept, removed, freed = 0, 0, 0
+    # Newest first: everything older than the entry that overflows the budget goes
+    for key, (mtime, size, paths) in sorted(entries.items(), key=lambda item: -item[1][0]):
+        kept += size
+        if mtime >= cutoff and kept <= budget:
+            continue
+        for path in paths:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        forget(key)
+        removed += 1
+        freed += size
+    return {"removed": removed, "bytes_freed": freed}
+
+
+def forget(content_hash: str) -> None:
+    """Drop a PDF's features, spool location and parses from memory"""
+    with _lock:
+        _documents.pop(content_hash, None)
+        for key in [key for key in _page_cache if key[0] == content_hash]:
+            del _page_cache[key]
+        _page_counts.pop(content_hash, None)
+        _text_spools.pop(content_hash, None)
+        for key in [key for key in _readers if key[1] == content_hash]:
+            del _readers[key]
+
+
+def _touch(content_hash: str) -> None:
+    """Mark a PDF's features as recently used, forgetting the least recently used beyond the cap"""
+    with _lock:
+        _documents.pop(content_hash, None)
+        _documents[content_hash] = None
+        while len(_documents) > MAX_CACHED_DOCUMENTS:
+            forget(next(iter(_documents)))
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 of a file's contents, memoized by path, mtime and size"""
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if key in _file_hashes:
+            return _file_hashes[key]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    with _lock:
+        if len(_file_hashes) >= MAX_FILE_HASHES:
+            del _file_hashes[next(iter(_file_hashes))]
+        _file_hashes[key] = digest.hexdigest()
+    return digest.hexdigest()
+
+
+def has_xobjects(page) -> bool:
+    """Check if a page references any image/form XObjects"""
+    try:
+        resources = page.get('/Resources')
+        if resources and '/XObject' in resources:
+            xobjects = resources['/XObject'].get_object()
+            return len(xobjects) > 0
+    except (KeyError, TypeError, AttributeError):
+        pass
+    return False
+
+
+def is_blank_page(page, text: Optional[str] = None) -> bool:
+    """Check if a page is blank"""
+    try:
+        if text is None:
+            text = page.extract_text() or ""
+        if len(text.strip()) >= BLANK_TEXT_THRESHOLD:
+            return False
+
+        # Check for image resources
+        if has_xobjects(page):
+            return False
+
+        return True
+    except Exception:
+        return False
+
+
+def analyze_page_format(page, text: Optional[str] = None) -> Dict:
+    """Analyze page formatting"""
+    if text is None:
+        text = page.extract_text() or ""
+    lines = text.split('\n')
+
+    page_num, total_pages = extract_page_indicator(text)
+
+    # Header and footer from the printed lines, not the trailing newlines
+    content = text.strip().split('\n')
+    header_lines = content[:max(1, len(content) // 5)]
+    header_text = '\n'.join(header_lines)
+
+    footer_lines = content[-max(1, len(content) // 10):]
+    footer_text = '\n'.join(footer_lines)
+
+    opening = text[:500].lower()
+
+    return {
+        'page_indicator': (page_num, total_pages),
+        'header_text': header_text[:200],
+        'footer_text': footer_text[-200:],
+        'header_shingles': shingle_signature(header_text[:200]),
+        'footer_shingles': shingle_signature(footer_text[-200:]),
+        'full_text': text,
+        'opens_letter': any(greeting in opening for greeting in GREETINGS),
+        'text_length': len(text),
+        'line_count': len(lines)
+    }
+
+
+def analyze_page(page, index: int) -> Dict:
+    """Extract a page's text once and derive all per-page features from it"""
+    try:
+        text = page.extract_text() or ""
+    except Exception:
+        # Unreadable text layer: keep the page, it may still carry an image
+        analysis = analyze_page_format(page, "")
+        analysis['index'] = index
+        analysis['is_blank'] = False
+        return analysis
+
+    analysis = analyze_page_format(page, text)
+    analysis['index'] = index
+    analysis['is_blank'] = is_blank_page(page, text)
+    return analysis
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """Normalize a worker setting: None/1 = serial, 0 = one per core"""
+    if workers is None:
+        return 1
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def process_workers(workers: int) -> int:
+    """Worker processes a job may start: none of its own off the main thread
+
+    Jobs on threads (watch ingests, daemon requests) already run side by
+    side, and a pool per job would multiply the process count.
+    """
+    return workers if threading.current_thread() is threading.main_thread() else 1
+
+
+def process_pool(workers: int) -> 'ProcessPoolExecutor':
+    """A pool of spawned interpreters: a forked child of a threaded process
+    inherits locks that other threads held at the fork
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def shard_indices(indices: List[int], shards: int) -> List[List[int]]:
+    """Split page indices into contiguous, near-equal shards"""
+    shards = max(1, min(shards, len(indices)))
+    size, extra = divmod(len(indices), shards)
+    result = []
+    start = 0
+    for n in range(shards):
+        end = start + size + (1 if n < extra else 0)
+        result.append(indices[start:end])
+        start = end
+    return result
+
+
+def _analyze_shard(pdf_path: str, indices: List[int]) -> List[Dict]:
+    """Process-pool worker: open the PDF itself and analyze a shard of pages"""
+    from PyPDF2 import PdfReader
+    reader = PdfReader(pdf_path)
+    return [analyze_page(reader.pages[i], i) for i in indices]
+
+
+class PageFeatures:
+    """What grouping needs to know about one non-blank page, without its text
+
+    header and footer are the shingle signatures of the page's top and
+    bottom lines (see boundaries.shingle_signature).
+    """
+
+    __slots__ = ('index', 'page_num', 'page_total', 'opens_letter', 'header', 'footer')
+
+    def __init__(self, index: int, page_num: Optional[int], page_total: Optional[int], opens_letter: bool,
+                 header: str = '', footer: str = ''):
+        self.index = index
+        self.page_num = page_num
+        self.page_total = page_total
+        self.opens_letter = opens_letter
+        self.header = header
+        self.footer = footer
+
+    @classmethod
+    def from_analysis(cls, analysis: Dict) -> 'PageFeatures':
+        page_num, page_total = analysis['page_indicator']
+        return cls(analysis['index'], page_num, page_total, analysis['opens_letter'],
+                   analysis.get('header_shingles', ''), analysis.get('footer_shingles', ''))
+
+
+class PageAnalysis:
+    """Per-page features of one PDF, shared across the whole run"""
+
+    def __init__(self, pdf_path: Path, reader: Optional['PdfReader'] = None,
+                 cache_dir: Optional[Path] = None):
+        self.pdf_path = Path(pdf_path)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.content_hash = file_hash(self.pdf_path)
+        self._reader = reader
+        self._dirty = False
+        _touch(self.content_hash)
+        if self.content_hash not in _page_counts:
+            self._load_sidecar()
+
+    @property
+    def reader(self) -> 'PdfReader':
+        """The parsed PDF, opened only when a page is not cached"""
+        key = (threading.get_ident(), self.content_hash)
+        if self._reader is None:
+            with _lock:
+                self._reader = _readers.get(key)
+            if self._reader is None:
+                from PyPDF2 import PdfReader
+                self._reader = PdfReader(self.pdf_path)
+        with _lock:
+            if key not in _readers:
+                if len(_readers) >= MAX_OPEN_READERS:
+                    del _readers[next(iter(_readers))]
+                _readers[key] = self._reader
+        return self._reader
+
+    @property
+    def page_count(self) -> int:
+        with _lock:
+            count = _page_counts.get(self.content_hash)
+        if count is None:
+            count = len(self.reader.pages)
+            with _lock:
+                _page_counts[self.content_hash] = count
+            self._dirty = True
+        return count
+
+    @property
+    def sidecar_path(self) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{self.content_hash}.json"
+
+    @property
+    def text_path(self) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{self.content_hash}.txt"
+
+    def page(self, index: int) -> Dict:
+        """Features for one page, extracting its text at most once"""
+        with _lock:
+            entry = _page_cache.get((self.content_hash, index))
+        if entry is None:
+            entry = self._remember(analyze_page(self.reader.pages[index], index))
+        return entry
+
+    def pages(self, workers: int = 1) -> List[Dict]:
+        """Features for every page in order, optionally analyzed in parallel"""
+        if workers > 1:
+            self._analyze_parallel(workers)
+        return [self.page(i) for i in range(self.page_count)]
+
+    def features(self, workers: int = 1) -> Iterator[PageFeatures]:
+        """Compact features of each non-blank page in order, analyzed as they are needed"""
+        if workers > 1:
+            self._analyze_parallel(workers)
+        for i in range(self.page_count):
+            analysis = self.page(i)
+            if not analysis['is_blank']:
+                yield PageFeatures.from_analysis(analysis)
+
+    def text(self, index: int) -> str:
+        """One page's full text, read back from the text spool"""
+        analysis = self.page(index)
+        if 'full_text' in analysis:
+            return analysis['full_text']
+
+        offset, length = analysis['text_span']
+        with _lock:
+            spool = _text_spools.get(self.content_hash)
+        try:
+            with open(spool, 'rb') as f:
+                f.seek(offset)
+                data = f.read(length)
+            if len(data) == length:
+                return data.decode('utf-8')
+        except (TypeError, OSError, UnicodeDecodeError):
+            pass
+        # The spool is gone or damaged; extract the page again
+        return analyze_page(self.reader.pages[index], index)['full_text']
+
+    def full_text(self, limit: Optional[int] = None) -> str:
+        """All pages' text joined by newlines, reading only the pages limit needs"""
+        parts = []
+        size = 0
+        for i in range(self.page_count):
+            if limit is not None and size >= limit:
+                break
+            parts.append(self.text(i))
+            size += len(parts[-1]) + 1
+        text = '\n'.join(parts)
+        return text if limit is None else text[:limit]
+
+    def _remember(self, analysis: Dict) -> Dict:
+        """Cache a page's features, moving its text to the spool if there is one; the cached entry
+        
+        A page whose text is already spooled keeps its span rather than being appended again.
+        """
+        entry = {key: analysis[key] for key in CACHED_FEATURES}
+        # Held across the append, so spans of pages spooled by other threads don't interleave
+        with _lock:
+            cached = _page_cache.get((self.content_hash, analysis['index']))
+            if self.text_path is None:
+                entry['full_text'] = analysis['full_text']
+            elif cached and 'text_span' in cached and _text_spools.get(self.content_hash) == self.text_path:
+                entry['text_span'] = cached['text_span']
+            else:
+                data = analysis['full_text'].encode('utf-8')
+                self.text_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.text_path, 'ab') as f:
+                    f.write(data)
+                    end = f.tell()
+                entry['text_span'] = [end - len(data), len(data)]
+                _text_spools[self.content_hash] = self.text_path
+            _page_cache[(self.content_hash, analysis['index'])] = entry
+        self._dirty = True
+        return entry
+
+    def _analyze_parallel(self, workers: int) -> None:
+        """Shard uncached pages across a process pool and merge the results"""
+        count = self.page_count
+        with _lock:
+            missing = [i for i in range(count) if (self.content_hash, i) not in _page_cache]
+        workers = min(process_workers(workers), len(missing) // MIN_PAGES_PER_WORKER)
+        if workers < 2:
+            return
+
+        # One contiguous shard per worker so each worker parses the PDF once
+        shards = shard_indices(missing, workers)
+        with process_pool(workers) as pool:
+            for results in pool.map(_analyze_shard, repeat(str(self.pdf_path)), shards):
+                for analysis in results:
+                    self._remember(analysis)
+
+    def is_blank(self, index: int) -> bool:
+        return self.page(index)['is_blank']
+
+    def _load_sidecar(self) -> None:
+        path = self.sidecar_path
+        if path is None or not path.exists():
+            return
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return
+        if data.get('version') != SIDECAR_VERSION or data.get('content_hash') != self.content_hash:
+            return
+        # Its mtime is what prune_cache ages the entry by
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        for analysis in data.get('pages', {}).values():
+            analysis['page_indicator'] = tuple(analysis['page_indicator'])
+        with _lock:
+            if data.get('page_count') is not None:
+                _page_counts[self.content_hash] = data['page_count']
+            if self.text_path.exists():
+                _text_spools[self.content_hash] = self.text_path
+            for index, analysis in data.get('pages', {}).items():
+                _page_cache[(self.content_hash, int(index))] = analysis
+
+    def save(self) -> None:
+        """Write the cached features to the sidecar if anything changed"""
+        path = self.sidecar_path
+        if path is None or not self._dirty:
+            return
+
+        with _lock:
+            pages = {
+                str(index): analysis
+                for (content_hash, index), analysis in _page_cache.items()
+                if content_hash == self.content_hash
+            }
+            page_count = _page_counts.get(self.content_hash)
+        data = {
+            'version': SIDECAR_VERSION,
+            'content_hash': self.content_hash,
+            'page_count': page_count,
+            'pages': pages
+        }
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Per thread: two jobs may save the same PDF's sidecar at once
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        self._dirty = False
+
+    @classmethod
+    def seed(cls, pdf_path: Path, analyses: List[Dict], cache_dir: Optional[Path] = None,
+             texts: Optional[Iterable[str]] = None) -> 'PageAnalysis':
+        """Register features for a freshly written PDF built from known pages
+
+        texts are the pages' text, by default each analysis' full_text; they
+        are consumed one page at a time.
+        """
+        # A PDF seeded before keeps the text already spooled for it
+        instance = cls(pdf_path, cache_dir=cache_dir)
+        with _lock:
+            _page_counts[instance.content_hash] = len(analyses)
+
+        if texts is None:
+            texts = (analysis['full_text'] for analysis in analyses)
+        for index, (analysis, text) in enumerate(zip(analyses, texts)):
+            instance._remember(dict(analysis, index=index, full_text=text))
+        instance.save()
+        return instance
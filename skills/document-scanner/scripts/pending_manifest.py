@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Pending Manifest - indexed record of documents awaiting identification
+
+save_pending_documents already knows each pending document's id, page
+count, dates and text preview. The manifest keeps them in SQLite so
+list-pending can answer with paging and filters without opening a PDF.
+Files that appear or change on disk (by mtime/size) are re-described
+incrementally on the next sync; files that vanish are dropped.
+"""
+import json
+import sqlite3
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending (
+    id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    pages INTEGER NOT NULL,
+    dates_found TEXT NOT NULL,
+    text_preview TEXT NOT NULL,
+    scanned_at TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pending_scanned_at ON pending (scanned_at);
+"""
+
+
+def pending_id(path: Path) -> str:
+    return path.stem.replace("pending_", "", 1)
+
+
+def scanned_at(doc_id: str, path: Path) -> str:
+    """Scan time from the id's timestamp, falling back to the file's mtime"""
+    try:
+        return datetime.strptime(doc_id[:15], "%Y%m%d_%H%M%S").isoformat()
+    except ValueError:
+        return datetime.fromtimestamp(path.stat().st_mtime).isoformat()
+
+
+class PendingManifest:
+    """SQLite manifest of pending_*.pdf files"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> 'PendingManifest':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def upsert(self, path: Path, pages: int, dates_found: List[str], text_preview: str) -> None:
+        """Record a pending document, stamped with its current mtime/size"""
+        stat = path.stat()
+        doc_id = pending_id(path)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pending VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (doc_id, str(path), pages, json.dumps(dates_found), text_preview,
+                 scanned_at(doc_id, path), stat.st_mtime_ns, stat.st_size)
+            )
+
+    def remove(self, doc_id: str) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM pending WHERE id = ?", (doc_id,))
+
+    def sync(self, pending_dir: Path, describe: Callable[[Path], Dict]) -> Dict:
+        """Bring the manifest in line with the directory using only stat calls
+
+        describe(path) is called for new or changed files and must return
+        pages, dates_found and text_preview.
+        """
+        known = {
+            row['id']: (row['mtime_ns'], row['size'])
+            for row in self.conn.execute("SELECT id, mtime_ns, size FROM pending")
+        }
+        seen = set()
+        updated = 0
+
+        if pending_dir.exists():
+            for path in pending_dir.glob("pending_*.pdf"):
+                doc_id = pending_id(path)
+                seen.add(doc_id)
+                stat = path.stat()
+                if known.get(doc_id) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                try:
+                    entry = describe(path)
+                except Exception:
+                    continue
+                self.upsert(path, entry['pages'], entry.get('dates_found', []), entry.get('text_preview', ""))
+                updated += 1
+
+        removed = [doc_id for doc_id in known if doc_id not in seen]
+        with self.conn:
+            self.conn.executemany("DELETE FROM pending WHERE id = ?", [(doc_id,) for doc_id in removed])
+
+        return {"updated": updated, "removed": len(removed)}
+
+    def query(self, limit: Optional[int] = None, offset: int = 0,
+              since: Optional[str] = None, until: Optional[str] = None,
+              older_than_days: Optional[float] = None) -> Dict:
+        """Pending documents, oldest scan first, with paging and scan-date filters"""
+        clauses, params = [], []
+        if since:
+            clauses.append("scanned_at >= ?")
+            params.append(since)
+        if until:
+            # A bare date is inclusive: anything scanned that day matches
+            if len(until) == 10:
+                until = (date.fromisoformat(until) + timedelta(days=1)).isoformat()
+            clauses.append("scanned_at < ?")
+            params.append(until)
+        if older_than_days is not None:
+            cutoff = datetime.fromtimestamp(datetime.now().timestamp() - older_than_days * 86400)
+            clauses.append("scanned_at < ?")
+            params.append(cutoff.isoformat())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        total = self.conn.execute(f"SELECT COUNT(*) FROM pending {where}", params).fetchone()[0]
+        sql = f"SELECT * FROM pending {where} ORDER BY scanned_at, id LIMIT ? OFFSET ?"
+        rows = self.conn.execute(sql, params + [limit if limit is not None else -1, offset]).fetchall()
+
+        return {
+            "total": total,
+            "pending": [
+                {
+                    "id": row['id'],
+                    "path": row['path'],
+                    "pages": row['pages'],
+                    "scanned_at": row['scanned_at'],
+                    "dates_found": json.loads(row['dates_found']),
+                    "text_preview": row['text_preview'],
+                }
+                for row in rows
+            ]
+        }
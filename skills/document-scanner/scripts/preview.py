@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Preview - the lines of a document that identify it, within a budget
+
+The agent identifies a pending document (sender, date, type) from its
+text_preview, which used to be the first 2000 characters of the text:
+mostly body copy, and cut off before the footer where IBANs and customer
+numbers live. build_preview instead ranks every line by the kind of signal
+it carries (letterhead, subject/Betreff, document title, dates near the
+top, IBAN and reference numbers, page indicator, address window, greeting)
+and keeps the best lines that fit a character budget, in their original
+order. Lines repeated on every page are kept once. It runs once per
+document at split time, when the text is read for dates anyway, and the
+result is stored with the pending document.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from extraction import DATE_PATTERN, extract_page_indicator
+
+DEFAULT_PREVIEW_SETTINGS = {
+    'max_tokens': 200,       # budget for the whole preview
+    'chars_per_token': 4,    # rough size of a token, for the character budget
+    'max_line_chars': 120,   # longer lines are cut
+    'letterhead_lines': 6,   # lines at the top of the first page that form the letterhead
+    'top_lines': 15,         # region of the first page where dates and addresses are looked for
+}
+
+SUBJECT = re.compile(r'^(?:betreff|betr\.|subject|re|objet|oggetto)\b\s*:?', re.IGNORECASE)
+IBAN = re.compile(r'\b[A-Z]{2}\d{2}(?: ?[A-Z0-9]{4}){3,7}')
+POSTAL_LINE = re.compile(r'^(?:[A-Z]{1,2}-)?\d{4,5} +[A-ZÄÖÜ][a-zäöüß]')
+DOCUMENT_TYPES = ('rechnung', 'mahnung', 'kontoauszug', 'police', 'offerte', 'vertrag', 'kuendigung',
+                  'kündigung', 'bestaetigung', 'bestätigung', 'abrechnung', 'verfügung', 'verfuegung',
+                  'gutschrift', 'lohnausweis', 'steuer', 'invoice', 'statement', 'reminder', 'quote',
+                  'contract', 'receipt', 'policy')
+IDENTIFIERS = ('iban', 'kunden', 'vertrags', 'rechnungs', 'policen', 'konto', 'referenz', 'versicherten',
+               'mitglied', 'nr.', 'nummer', 'customer', 'account', 'invoice', 'policy', 'reference',
+               'number', 'no.', 'uid', 'mwst')
+GREETINGS = ('sehr geehrte', 'guten tag', 'liebe', 'dear', 'hello')
+
+# Priorities, best first
+LETTERHEAD, TITLE, KEY, CONTEXT, ADDRESS, OPENING = range(6)
+
+
+def preview_settings(prefs: Optional[Dict] = None) -> Dict:
+    """Merge the preview preferences over the defaults"""
+    settings = dict(DEFAULT_PREVIEW_SETTINGS)
+    if prefs:
+        settings.update(prefs.get('preview') or {})
+    return settings
+
+
+def preview_budget(settings: Dict) -> int:
+    """The preview's size limit in characters"""
+    return settings['max_tokens'] * settings['chars_per_token']
+
+
+def is_title(line: str, lower: str) -> bool:
+    """A short heading naming a document type, e.g. 'RECHNUNG Nr. 123' (not a body sentence)"""
+    return len(line) <= 60 and not line.endswith('.') and any(word in lower for word in DOCUMENT_TYPES)
+
+
+def rank_lines(pages: Iterable[str], settings: Dict) -> List[Tuple[int, int, str]]:
+    """(priority, position, line) for every line worth showing, each distinct line once"""
+    ranked: Dict[str, Tuple[int, int, str]] = {}
+    page_start = 0
+    indicator_seen = date_seen = False
+    for page_index, text in enumerate(pages):
+        lines = [line.strip() for line in text.split('\n')]
+        lines = [line for line in lines if line]
+        first_page = page_index == 0
+        greeting_at = None
+        for n, line in enumerate(lines):
+            lower = line.lower()
+            top = first_page and n < settings['top_lines']
+            candidates = []
+
+            if first_page and n < settings['letterhead_lines']:
+                candidates.append(LETTERHEAD if n < 3 else ADDRESS)
+            if first_page and (SUBJECT.match(line) or is_title(line, lower)):
+                candidates.append(TITLE)
+            if IBAN.search(line) or (any(c.isdigit() for c in line) and any(word in lower for word in IDENTIFIERS)):
+                candidates.append(KEY)
+            if top and not date_seen and DATE_PATTERN.search(line):
+                # The first date near the top is the likely document date
+                candidates.append(KEY)
+                date_seen = True
+            if not indicator_seen and extract_page_indicator(line) != (None, None):
+                candidates.append(CONTEXT)
+                indicator_seen = True
+            if top and POSTAL_LINE.search(line):
+                # The address window: postal code and town, with the name and street above
+                candidates.append(ADDRESS)
+                for m in range(max(0, n - 2), n):
+                    _keep(ranked, lines[m], ADDRESS, page_start + m)
+            if first_page and greeting_at is None and lower.startswith(GREETINGS):
+                greeting_at = n
+                candidates.append(OPENING)
+            elif greeting_at is not None and n == greeting_at + 1:
+                candidates.append(OPENING)
+
+            if candidates:
+                _keep(ranked, line, min(candidates), page_start + n)
+        page_start += len(lines)
+    return sorted(ranked.values())
+
+
+def _keep(ranked: Dict[str, Tuple[int, int, str]], line: str, priority: int, position: int) -> None:
+    key = ' '.join(line.lower().split())
+    if key not in ranked or ranked[key][:2] > (priority, position):
+        ranked[key] = (priority, position, line)
+
+
+def build_preview(pages: Iterable[str], settings: Optional[Dict] = None) -> str:
+    """The highest-ranked lines of a document's pages that fit the budget, in reading order"""
+    settings = settings or DEFAULT_PREVIEW_SETTINGS
+    budget = preview_budget(settings)
+    limit = settings['max_line_chars']
+
+    chosen = []
+    used = 0
+    for _, position, line in rank_lines(pages, settings):
+        if len(line) > limit:
+            line = line[:limit - 1] + '…'
+        if used + len(line) + 1 > budget + 1:
+            continue
+        chosen.append((position, line))
+        used += len(line) + 1
+    return '\n'.join(line for _, line in sorted(chosen))
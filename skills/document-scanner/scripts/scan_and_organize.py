@@ -4,30 +4,44 @@ Document Scanner - Self-configuring with preference support
 
 Dependencies (install before use):
     pip3 install PyPDF2
+    pip3 install numpy   # optional, raster blank-page detection and vectorized split scoring
     brew install ocrmypdf scanline
 
 Document identification is handled by the agent using AI, not hardcoded patterns.
+
+Only the CLI core (arguments, preferences, the scanner cache, the daemon
+client) is imported at start-up. The PDF stack (PyPDF2, blank detection,
+OCR, streaming, bulk split), the SQLite indexes, the regex tables and
+subprocess are imported by the functions that use them, so list-scanners
+or setup-check never load them; benchmarks/bench_startup.py holds each
+command to an import budget. A missing PyPDF2 is reported only by the
+commands that may open a PDF.
 """
-import subprocess
+import os
 import sys
-import re
 import json
 import shutil
 import argparse
+import importlib.util
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
-
-# Check dependencies at import time
-try:
-    from PyPDF2 import PdfReader, PdfWriter, PdfMerger
-except ImportError:
-    print(json.dumps({
-        "status": "error",
-        "error": "missing_dependency",
-        "message": "PyPDF2 not installed. Run: pip3 install PyPDF2"
-    }))
-    sys.exit(1)
+from typing import TYPE_CHECKING, List, Dict, Iterable, Iterator, Tuple, Optional
+
+from timing import Timings, append_trace, trace_settings, write_profile
+from scheduler import new_files, reported_paths, scanner_lock, snapshot
+from daemon import ScannerDaemon, DaemonUnavailable, request as daemon_request
+
+# The other modules are imported by the functions that use them
+if TYPE_CHECKING:
+    from fingerprints import FingerprintIndex
+    from jobs import ScanJob
+    from letterheads import LetterheadIndex
+    from page_analysis import PageFeatures
+    from pending_manifest import PendingManifest
+    from spool import WriteSpool
+    from streaming import PageStream
 
 # Paths
 SCRIPT_DIR = Path(__file__).parent
@@ -36,6 +50,42 @@ MEMORY_DIR = WORKSPACE_DIR / "memory"
 PREFERENCES_FILE = MEMORY_DIR / "preferences.json"
 STAGING_DIR = WORKSPACE_DIR / "skills" / "scan-staging"
 PENDING_DIR = STAGING_DIR / "pending"
+PAGE_CACHE_DIR = STAGING_DIR / "page-cache"
+OCR_CACHE_DIR = STAGING_DIR / "ocr-cache"
+MANIFEST_FILE = STAGING_DIR / "pending.sqlite"
+FINGERPRINT_FILE = STAGING_DIR / "fingerprints.sqlite"
+LETTERHEAD_FILE = STAGING_DIR / "letterheads.sqlite"
+SPOOL_DIR = STAGING_DIR / "spool"
+SOCKET_PATH = STAGING_DIR / "scanner.sock"
+TRACE_FILE = STAGING_DIR / "trace.jsonl"
+PROFILE_DIR = STAGING_DIR / "profiles"
+JOBS_DIR = STAGING_DIR / "jobs"
+LOCK_DIR = STAGING_DIR / "locks"
+WATCH_STATUS_FILE = STAGING_DIR / "watch-status.json"
+INGEST_LEDGER = STAGING_DIR / "ingested.sqlite"
+
+# Commands the daemon accepts; scanner commands are queued one at a time
+COMMANDS = ['front', 'back', 'single', 'list-scanners', 'setup-check', 'organize', 'list-pending',
+            'organize-batch', 'sync', 'search', 'reindex', 'resume', 'watch']
+SCANNER_COMMANDS = ['front', 'back', 'single', 'resume']
+# Commands that may open a PDF; the others run without PyPDF2
+PDF_COMMANDS = SCANNER_COMMANDS + ['setup-check', 'organize', 'list-pending', 'organize-batch', 'reindex',
+                                   'watch', 'serve']
+DEFAULT_SCANNER_CACHE_TTL = 600
+PROBE_TIMEOUT = 5
+REFRESH_LOCK = STAGING_DIR / "scanner-refresh.lock"
+SPOOL_RETRY_INTERVAL = 60
+
+
+def missing_dependency(command: str) -> Optional[Dict]:
+    """Error result if command needs PyPDF2 and it is not installed"""
+    if command in PDF_COMMANDS and importlib.util.find_spec('PyPDF2') is None:
+        return {
+            "status": "error",
+            "error": "missing_dependency",
+            "message": "PyPDF2 not installed. Run: pip3 install PyPDF2"
+        }
+    return None
 
 
 def check_tools() -> List[str]:
@@ -47,8 +97,21 @@ def check_tools() -> List[str]:
     return missing
 
 
+def parse_scanner_line(line: str) -> Optional[str]:
+    """Scanner name from one line of 'scanline -list' output"""
+    line = line.strip()
+    # Skip headers, footers, and comments
+    if line and not line.startswith('#') and line.startswith('*'):
+        # Extract scanner name after the asterisk
+        scanner_name = line[1:].strip()
+        if scanner_name and scanner_name.lower() != 'done':
+            return scanner_name
+    return None
+
+
 def detect_scanners() -> List[str]:
     """Detect available scanners using scanline"""
+    import subprocess
     try:
         result = subprocess.run(['scanline', '-list'], capture_output=True, text=True, timeout=30)
         if result.returncode != 0:
@@ -56,18 +119,80 @@ def detect_scanners() -> List[str]:
         
         scanners = []
         for line in result.stdout.strip().split('\n'):
-            line = line.strip()
-            # Skip headers, footers, and comments
-            if line and not line.startswith('#') and line.startswith('*'):
-                # Extract scanner name after the asterisk
-                scanner_name = line[1:].strip()
-                if scanner_name and scanner_name.lower() != 'done':
-                    scanners.append(scanner_name)
+            scanner_name = parse_scanner_line(line)
+            if scanner_name:
+                scanners.append(scanner_name)
         return scanners
     except Exception:
         return []
 
 
+def probe_scanner(scanner: str, timeout: float = PROBE_TIMEOUT) -> bool:
+    """Check one scanner, returning as soon as scanline lists it"""
+    import subprocess
+    try:
+        process = subprocess.Popen(['scanline', '-list'], stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL, text=True)
+    except OSError:
+        return False
+    
+    timer = threading.Timer(timeout, process.kill)
+    timer.start()
+    try:
+        for line in process.stdout:
+            if parse_scanner_line(line) == scanner:
+                return True
+        return False
+    finally:
+        timer.cancel()
+        process.kill()
+        process.wait()
+
+
+def known_scanner_ages(prefs: Dict) -> Dict[str, float]:
+    """Seconds since each known scanner was last seen"""
+    now = datetime.now()
+    ages = {}
+    for entry in prefs.get('known_scanners') or []:
+        if isinstance(entry, str):
+            # Older preferences stored bare names without a timestamp
+            ages[entry] = float('inf')
+            continue
+        try:
+            ages[entry['name']] = (now - datetime.fromisoformat(entry['last_seen'])).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            continue
+    return ages
+
+
+def record_scanners(seen: List[str], full: bool = False) -> None:
+    """Stamp scanners as seen now in known_scanners
+    
+    A full discovery replaces the list; a probe only updates its scanner.
+    Preferences are re-read first so concurrent updates aren't lost.
+    """
+    prefs = load_preferences()
+    now = datetime.now().isoformat()
+    known = {}
+    if not full:
+        for entry in prefs.get('known_scanners') or []:
+            if isinstance(entry, str):
+                known[entry] = entry
+            elif isinstance(entry, dict) and entry.get('name'):
+                known[entry['name']] = entry
+    for name in seen:
+        known[name] = {"name": name, "last_seen": now}
+    prefs['known_scanners'] = list(known.values())
+    save_preferences(prefs)
+
+
+def refresh_scanners() -> List[str]:
+    """Run a full discovery and cache the result"""
+    scanners = detect_scanners()
+    record_scanners(scanners, full=True)
+    return scanners
+
+
 def load_preferences() -> Dict:
     """Load preferences from memory file"""
     if not PREFERENCES_FILE.exists():
@@ -82,15 +207,27 @@ def load_preferences() -> Dict:
 
 def save_preferences(prefs: Dict) -> None:
     """Save preferences to memory file"""
-    MEMORY_DIR.mkdir(parents=True, exist_ok=True)
+    PREFERENCES_FILE.parent.mkdir(parents=True, exist_ok=True)
     prefs['last_updated'] = datetime.now().isoformat()
     
-    with open(PREFERENCES_FILE, 'w') as f:
+    # Atomic replace: background scanner refreshes write here too
+    tmp_path = PREFERENCES_FILE.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
         json.dump(prefs, f, indent=2)
+    os.replace(tmp_path, PREFERENCES_FILE)
+
+
+def output_available(path: Path) -> bool:
+    """Check if an output directory exists or sits on a mounted volume"""
+    return path.exists() or (path.parent.exists() and path.parent.is_mount())
 
 
 def get_output_base(prefs: Dict, override: str = None) -> Path:
-    """Get output directory, with fallback logic"""
+    """Get output directory, with fallback logic
+    
+    A configured default_output is returned even while it is unreachable:
+    organized documents wait in the spool until it is back.
+    """
     if override:
         path = Path(override).expanduser()
         path.mkdir(parents=True, exist_ok=True)
@@ -98,27 +235,21 @@ def get_output_base(prefs: Dict, override: str = None) -> Path:
     
     default_output = prefs.get('default_output')
     if default_output:
-        path = Path(default_output)
-        # Check if it's a mounted volume
-        if path.exists() or (path.parent.exists() and path.parent.is_mount()):
+        path = Path(default_output).expanduser()
+        if output_available(path):
             path.mkdir(parents=True, exist_ok=True)
-            return path
+        return path
     
-    # Fallback to local directory
+    # No configured output: use the local directory
     fallback = prefs.get('local_fallback', '~/Documents/Scanned')
     path = Path(fallback).expanduser()
     path.mkdir(parents=True, exist_ok=True)
     return path
 
 
-def scan_documents(side: str, scanner: str, staging_dir: Path) -> Optional[Path]:
-    """Scan documents using scanline"""
-    print(f"Scanning {side} sides with {scanner}...", file=sys.stderr)
-    
-    staging_dir.mkdir(parents=True, exist_ok=True)
-    scan_start_time = datetime.now().timestamp()
-    
-    result = subprocess.run([
+def scanline_command(side: str, scanner: str, staging_dir: Path) -> List[str]:
+    """The scanline invocation for one side of a scan"""
+    return [
         "scanline",
         "-verbose",
         "-scanner", scanner,
@@ -127,27 +258,34 @@ def scan_documents(side: str, scanner: str, staging_dir: Path) -> Optional[Path]
         "-mono",
         "-dir", str(staging_dir),
         f"{side}-scan"
-    ], capture_output=True, text=True)
+    ]
+
+
+def scan_documents(side: str, scanner: str, staging_dir: Path) -> Optional[Path]:
+    """Scan documents using scanline
+    
+    The scan is the PDF scanline reports writing or, if it names none, the
+    newest PDF a snapshot diff shows appeared in staging_dir during the
+    scan; files from other scans are never picked up.
+    """
+    import subprocess
+    from PyPDF2 import PdfReader
+    print(f"Scanning {side} sides with {scanner}...", file=sys.stderr)
+    
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    before = snapshot(staging_dir)
+    
+    result = subprocess.run(scanline_command(side, scanner, staging_dir), capture_output=True, text=True)
     
     if result.returncode != 0:
         if "error" in result.stderr.lower() and "empty" not in result.stderr.lower():
             raise Exception(f"Scanner error: {result.stderr}")
     
-    # Find PDFs created after scan started
-    pdf_files = []
-    for pdf_path in staging_dir.glob(f"{side}-scan/**/*.pdf"):
-        if pdf_path.stat().st_mtime > scan_start_time:
-            pdf_files.append(pdf_path)
-    
-    # Also check root of staging dir
-    for pdf_path in staging_dir.glob(f"{side}-scan*.pdf"):
-        if pdf_path.stat().st_mtime > scan_start_time:
-            pdf_files.append(pdf_path)
-    
+    pdf_files = reported_paths(result.stdout + result.stderr) or new_files(before, snapshot(staging_dir))
     if not pdf_files:
         return None
     
-    pdf_path = max(pdf_files, key=lambda p: p.stat().st_mtime)
+    pdf_path = pdf_files[-1]
     
     try:
         reader = PdfReader(pdf_path)
@@ -160,266 +298,249 @@ def scan_documents(side: str, scanner: str, staging_dir: Path) -> Optional[Path]
         return None
 
 
-def merge_duplex(front_pdf: Path, back_pdf: Path, staging_dir: Path) -> Path:
-    """Merge front and back sides with proper page interleaving"""
-    front_reader = PdfReader(front_pdf)
-    back_reader = PdfReader(back_pdf)
+def scan_documents_streaming(side: str, scanner: str, stream: 'PageStream') -> Optional[Path]:
+    """Scan with scanline while pages are pruned, OCR'd and analyzed as they land"""
+    print(f"Scanning {side} sides with {scanner} (streaming)...", file=sys.stderr)
     
-    front_pages = len(front_reader.pages)
-    back_pages = len(back_reader.pages)
+    result = stream.run(scanline_command(side, scanner, stream.watch_dir))
     
-    writer = PdfWriter()
+    if result.returncode != 0:
+        if "error" in result.stderr.lower() and "empty" not in result.stderr.lower():
+            raise Exception(f"Scanner error: {result.stderr}")
+    
+    return stream.combine(stream.watch_dir.parent / f"{side}-scan-stream.pdf")
+
+
+def interleave_duplex(front: List, back: List) -> List:
+    """Order duplex pages: front[0], back[LAST], front[1], back[LAST-1], ..."""
+    front_pages = len(front)
+    back_pages = len(back)
     min_pages = min(front_pages, back_pages)
+    ordered = []
     
-    # Interleave: front[0], back[LAST], front[1], back[LAST-1], ...
     for i in range(min_pages):
-        writer.add_page(front_reader.pages[i])
-        back_index = back_pages - 1 - i
-        writer.add_page(back_reader.pages[back_index])
+        ordered.append(front[i])
+        ordered.append(back[back_pages - 1 - i])
     
     # Handle extra pages
     if front_pages > back_pages:
         for i in range(back_pages, front_pages):
-            writer.add_page(front_reader.pages[i])
+            ordered.append(front[i])
     elif back_pages > front_pages:
         for i in range(front_pages, back_pages):
-            back_index = back_pages - 1 - i
-            writer.add_page(back_reader.pages[back_index])
+            ordered.append(back[back_pages - 1 - i])
     
-    merged_path = staging_dir / "merged-scan.pdf"
-    with open(merged_path, "wb") as f:
-        writer.write(f)
-    
-    # Try OCR if available
-    if shutil.which('ocrmypdf'):
-        ocr_path = staging_dir / "merged-scan-ocr.pdf"
-        try:
-            result = subprocess.run([
-                "ocrmypdf", "--skip-text", "--optimize", "1",
-                "--output-type", "pdf", str(merged_path), str(ocr_path)
-            ], capture_output=True, text=True, timeout=300)
-            
-            if result.returncode == 0:
-                return ocr_path
-        except Exception:
-            pass
+    return ordered
+
+
+def merge_duplex(front_pdf: Path, back_pdf: Path, staging_dir: Path,
+                 settings: Optional[Dict] = None, ocr_config: Optional[Dict] = None,
+                 timings: Optional[Timings] = None) -> Path:
+    """Merge front and back sides with proper page interleaving
     
-    return merged_path
+    Pages whose scanned image is blank by ink coverage are pruned here, so
+    blank duplex backs never reach OCR. OCR then runs per page chunk and
+    reuses pages already OCR'd in an earlier attempt. The merge and the OCR
+    are timed as merge_duplex.merge and merge_duplex.ocr.
+    """
+    from PyPDF2 import PdfReader
+    front_reader = PdfReader(front_pdf)
+    back_reader = PdfReader(back_pdf)
+    return prune_and_ocr(interleave_duplex(front_reader.pages, back_reader.pages),
+                         staging_dir / "merged-scan.pdf", staging_dir / "merged-scan-ocr.pdf",
+                         settings, ocr_config, timings)
 
 
-def is_blank_page(page) -> bool:
-    """Check if a page is blank"""
-    try:
-        text = page.extract_text() or ""
-        if len(text.strip()) >= 50:
-            return False
+def prune_and_ocr(pages: Iterable, pdf_path: Path, ocr_path: Path,
+                  settings: Optional[Dict] = None, ocr_config: Optional[Dict] = None,
+                  timings: Optional[Timings] = None,
+                  spans: Tuple[str, str] = ("merge_duplex.merge", "merge_duplex.ocr")) -> Path:
+    """Write pages without the blank ones to pdf_path, then OCR them to ocr_path
+    
+    Returns ocr_path, or pdf_path if OCR is unavailable or failed for every page.
+    """
+    from PyPDF2 import PdfWriter
+    from blank_detection import is_blank_raster, DEFAULT_BLANK_SETTINGS
+    from ocr_stage import ocr_pages, ocr_available, DEFAULT_OCR_SETTINGS
+    timings = timings or Timings()
+    with timings.span(spans[0]):
+        writer = PdfWriter()
+        settings = settings or DEFAULT_BLANK_SETTINGS
+        pruned = 0
         
-        # Check for image resources
-        try:
-            resources = page.get('/Resources')
-            if resources and '/XObject' in resources:
-                xobjects = resources['/XObject'].get_object()
-                if len(xobjects) > 0:
-                    return False
-        except (KeyError, TypeError, AttributeError):
-            pass
+        for page in pages:
+            if is_blank_raster(page, settings):
+                pruned += 1
+                continue
+            writer.add_page(page)
         
-        return True
-    except Exception:
-        return False
-
-
-def extract_page_indicator(text: str) -> Tuple[Optional[int], Optional[int]]:
-    """Extract page number like '2/5' from text"""
-    patterns = [
-        r'(\d+)\s*/\s*(\d+)',
-        r'[Pp]age\s+(\d+)\s+of\s+(\d+)',
-        r'[Ss]eite\s+(\d+)\s+von\s+(\d+)',
-    ]
+        if pruned:
+            print(f"Pruned {pruned} blank pages before OCR", file=sys.stderr)
+        
+        with open(pdf_path, "wb") as f:
+            writer.write(f)
     
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            return (int(match.group(1)), int(match.group(2)))
+    # Try OCR if available, in parallel page chunks with per-page reuse
+    ocr_config = ocr_config or DEFAULT_OCR_SETTINGS
+    if ocr_available(ocr_config) and len(writer.pages) > 0:
+        try:
+            with timings.span(spans[1]):
+                stats = ocr_pages(pdf_path, ocr_path, OCR_CACHE_DIR, ocr_config)
+            if stats['failed']:
+                print(f"OCR failed for {stats['failed']} of {stats['pages']} pages", file=sys.stderr)
+            if stats['failed'] < stats['pages']:
+                return ocr_path
+        except Exception:
+            pass
     
-    return (None, None)
+    return pdf_path
 
 
-def analyze_page_format(page) -> Dict:
-    """Analyze page formatting"""
-    text = page.extract_text() or ""
-    lines = text.split('\n')
+def group_pages(features: Iterable['PageFeatures'],
+                settings: Optional[Dict] = None) -> Iterator[List['PageFeatures']]:
+    """Group non-blank pages into documents at the split points boundaries scores
     
-    page_num, total_pages = extract_page_indicator(text)
-    
-    header_lines = lines[:max(1, len(lines) // 5)]
-    header_text = '\n'.join(header_lines)
-    
-    footer_lines = lines[-max(1, len(lines) // 10):]
-    footer_text = '\n'.join(footer_lines)
-    
-    return {
-        'page_indicator': (page_num, total_pages),
-        'header_text': header_text[:200],
-        'footer_text': footer_text[:200],
-        'full_text': text,
-        'text_length': len(text),
-        'line_count': len(lines)
-    }
+    A document starts where a page's header and footer stop resembling the
+    previous page's, weighed against its page indicator and greeting.
+    """
+    from boundaries import split_points
+    features = list(features)
+    starts = split_points(features, settings)
+    for start, end in zip(starts, starts[1:] + [len(features)]):
+        yield features[start:end]
 
 
-def extract_dates(text: str) -> List[str]:
-    """Extract dates from text"""
-    dates = []
-    dates.extend(re.findall(r'\b(\d{1,2}\.\d{1,2}\.\d{2,4})\b', text))
-    dates.extend(re.findall(r'\b(\d{4}-\d{2}-\d{2})\b', text))
-    dates.extend(re.findall(
-        r'\b((?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{4})\b',
-        text, re.IGNORECASE
-    ))
-    return list(set(dates))
-
-
-def parse_date(date_str: str) -> Optional[datetime]:
-    """Parse date string"""
-    german_months = {
-        'januar': 'January', 'februar': 'February', 'märz': 'March', 'april': 'April',
-        'mai': 'May', 'juni': 'June', 'juli': 'July', 'august': 'August',
-        'september': 'September', 'oktober': 'October', 'november': 'November', 'dezember': 'December'
-    }
-    
-    date_lower = date_str.lower()
-    for de, en in german_months.items():
-        if de in date_lower:
-            date_str = date_str.lower().replace(de, en)
-            break
-    
-    formats = [
-        "%d.%m.%Y", "%d.%m.%y", "%Y-%m-%d",
-        "%B %Y", "%b %Y", "%B. %Y", "%b. %Y",
-        "%d. %B %Y", "%d. %b %Y",
-    ]
-    
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str, fmt)
-        except ValueError:
-            continue
-    return None
+def order_pages(group: List['PageFeatures']) -> List['PageFeatures']:
+    """Reorder a document's pages by their indicators when every page has one"""
+    if all(page.page_num is not None for page in group):
+        return sorted(group, key=lambda page: page.page_num)
+    return group
 
 
-def analyze_and_split(pdf_path: Path) -> List[Dict]:
-    """Analyze PDF and split into documents"""
-    reader = PdfReader(pdf_path)
-    total_pages = len(reader.pages)
+def analyze_and_split(pdf_path: Path, workers: int = 1, settings: Optional[Dict] = None,
+                      preview_config: Optional[Dict] = None) -> List[Dict]:
+    """Analyze PDF and split into documents
     
-    page_analyses = []
-    non_blank_pages = []
-    
-    for i, page in enumerate(reader.pages):
-        if is_blank_page(page):
-            continue
-        
-        analysis = analyze_page_format(page)
-        analysis['index'] = i
-        page_analyses.append(analysis)
-        non_blank_pages.append(i)
+    Pages flow through as compact PageFeatures and each document's text is
+    read back from the page text spool only while its dates and preview are
+    extracted, so memory does not grow with the stack's text. settings are
+    the boundary-scoring weights (boundary_settings), preview_config the
+    preview budget (preview_settings). With workers > 1 the
+    per-page analysis is sharded across a process pool first; grouping is
+    the same either way.
+    """
+    from page_analysis import PageAnalysis
+    from extraction import extract_dates
+    from preview import build_preview
+    page_analysis = PageAnalysis(pdf_path, cache_dir=PAGE_CACHE_DIR)
     
-    # Group into documents based on page indicators and content breaks
     documents = []
-    current_doc = None
-    
-    for i, analysis in enumerate(page_analyses):
-        page_num, total_pages_ind = analysis['page_indicator']
-        text = analysis['full_text'][:500].lower()
-        
-        start_new = False
-        
-        if current_doc is None:
-            start_new = True
-        elif i % 2 == 0:
-            if page_num == 1:
-                start_new = True
-            elif 'sehr geehrte' in text or 'guten tag' in text:
-                start_new = True
-        
-        if start_new:
-            if current_doc:
-                documents.append(current_doc)
-            current_doc = {
-                'pages': [analysis['index']],
-                'page_indicators': [(page_num, total_pages_ind)],
-                'analyses': [analysis]
-            }
-        else:
-            current_doc['pages'].append(analysis['index'])
-            current_doc['page_indicators'].append((page_num, total_pages_ind))
-            current_doc['analyses'].append(analysis)
-    
-    if current_doc:
-        documents.append(current_doc)
-    
-    # Reorder based on page indicators and extract text
-    for doc in documents:
-        indicators = doc['page_indicators']
-        if all(num is not None for num, _ in indicators):
-            expected_order = sorted(range(len(indicators)), key=lambda i: indicators[i][0])
-            current_order = list(range(len(indicators)))
-            
-            if expected_order != current_order:
-                doc['pages'] = [doc['pages'][i] for i in expected_order]
-                doc['page_indicators'] = [doc['page_indicators'][i] for i in expected_order]
-                doc['analyses'] = [doc['analyses'][i] for i in expected_order]
-        
-        doc_text = '\n'.join(a['full_text'] for a in doc['analyses'])
-        doc['dates'] = extract_dates(doc_text)
-        doc['full_text'] = doc_text
+    for group in group_pages(page_analysis.features(workers=workers), settings):
+        pages = order_pages(group)
+        texts = [page_analysis.text(page.index) for page in pages]
+        documents.append({
+            'pages': [page.index for page in pages],
+            'page_indicators': [(page.page_num, page.page_total) for page in pages],
+            'dates': extract_dates('\n'.join(texts)),
+            'preview': build_preview(texts, preview_config)
+        })
     
+    page_analysis.save()
     return documents
 
 
-def save_pending_documents(pdf_path: Path, documents: List[Dict]) -> List[Dict]:
-    """Save documents to pending folder for agent identification"""
-    reader = PdfReader(pdf_path)
+def save_pending_documents(pdf_path: Path, documents: List[Dict], batch_id: Optional[str] = None,
+                           preview_config: Optional[Dict] = None, optimize_config: Optional[Dict] = None,
+                           timings: Optional[Timings] = None) -> List[Dict]:
+    """Save documents to pending folder for agent identification
+    
+    Pages come from the reader analysis already parsed and are trusted to be
+    non-blank; all documents are written in one bulk pass. Ids are
+    <batch_id>_<nn>, by default a timestamp; a job passes its own id, so
+    saving it again after a crash overwrites rather than duplicates. The
+    text_preview is the one analyze_and_split built, if it did. With an
+    enabled optimize_config the written documents are re-encoded for
+    storage before their pages are seeded, as seeding hashes the file.
+    """
+    from page_analysis import PageAnalysis
+    from pending_manifest import PendingManifest
+    from preview import build_preview
+    from bulk_split import write_documents
+    from output_optimizer import optimize_available, optimize_documents
+    timings = timings or Timings()
+    page_analysis = PageAnalysis(pdf_path, cache_dir=PAGE_CACHE_DIR)
     PENDING_DIR.mkdir(parents=True, exist_ok=True)
     
     pending_docs = []
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    batch_id = batch_id or datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    for idx, doc in enumerate(documents):
-        writer = PdfWriter()
-        
-        for page_num in doc['pages']:
-            page = reader.pages[page_num]
-            if not is_blank_page(page):
-                writer.add_page(page)
-        
-        if len(writer.pages) == 0:
-            continue
-        
-        # Save to pending with temporary name
-        pending_name = f"pending_{timestamp}_{idx:02d}.pdf"
-        pending_path = PENDING_DIR / pending_name
-        
-        with open(pending_path, "wb") as f:
-            writer.write(f)
-        
-        # Extract text preview for agent identification
-        text_preview = doc['full_text'][:2000] if doc.get('full_text') else ""
-        
-        pending_docs.append({
-            "id": f"{timestamp}_{idx:02d}",
-            "pending_path": str(pending_path),
-            "pages": len(writer.pages),
-            "dates_found": doc.get('dates', []),
-            "text_preview": text_preview
-        })
+    # Save to pending with temporary names
+    documents = [(idx, doc) for idx, doc in enumerate(documents) if doc['pages']]
+    pending_paths = [PENDING_DIR / f"pending_{batch_id}_{idx:02d}.pdf" for idx, _ in documents]
+    reports = write_documents(page_analysis.reader, [doc['pages'] for _, doc in documents], pending_paths)
+    optimized = {}
+    if optimize_config and optimize_config['enabled'] and optimize_available():
+        with timings.span("save_pending_documents.optimize"):
+            optimized = {report['path']: report
+                         for report in optimize_documents(pending_paths, optimize_config)['documents']}
+    
+    with PendingManifest(MANIFEST_FILE) as manifest:
+        for (idx, doc), pending_path, report in zip(documents, pending_paths, reports):
+            # Pending pages are known already, so list-pending never re-extracts them;
+            # seeding also spools the document's own text
+            pending_analysis = PageAnalysis.seed(
+                pending_path, [page_analysis.page(p) for p in doc['pages']], cache_dir=PAGE_CACHE_DIR,
+                texts=(page_analysis.text(p) for p in doc['pages'])
+            )
+            
+            # The identifying lines of the document, for agent identification
+            text_preview = doc.get('preview')
+            if text_preview is None:
+                text_preview = build_preview((pending_analysis.text(i) for i in range(pending_analysis.page_count)),
+                                             preview_config)
+
+            pending_doc = {
+                "id": f"{batch_id}_{idx:02d}",
+                "pending_path": str(pending_path),
+                "pages": report['pages'],
+                "dates_found": doc.get('dates', []),
+                "text_preview": text_preview,
+                "bytes_written": report['bytes_written'],
+                "write_seconds": report['seconds']
+            }
+            optimization = optimized.get(str(pending_path))
+            if optimization:
+                pending_doc["optimized_bytes"] = optimization['bytes_after']
+                pending_doc["optimize_seconds"] = optimization['seconds']
+                if optimization['pages_over_budget']:
+                    pending_doc["pages_over_budget"] = optimization['pages_over_budget']
+            pending_docs.append(pending_doc)
+            manifest.upsert(pending_path, report['pages'], doc.get('dates', []), text_preview)
     
     return pending_docs
 
 
-def organize_document(pending_id: str, sender: str, date: str, doc_type: str, output_base: Path) -> Dict:
-    """Move a pending document to its final location with proper naming"""
+def describe_pending(pdf_path: Path, preview_config: Optional[Dict] = None) -> Dict:
+    """Manifest entry for a pending PDF that changed on disk"""
+    from page_analysis import PageAnalysis
+    from extraction import extract_dates
+    from preview import build_preview
+    page_analysis = PageAnalysis(pdf_path, cache_dir=PAGE_CACHE_DIR)
+    texts = [page_analysis.text(i) for i in range(page_analysis.page_count)]
+    page_analysis.save()
+    return {
+        "pages": page_analysis.page_count,
+        "dates_found": extract_dates('\n'.join(texts)),
+        "text_preview": build_preview(texts, preview_config)
+    }
+
+
+def prepare_organize(pending_id: str, sender: str, date: str, doc_type: str, output_base: Path,
+                     fingerprints: 'FingerprintIndex', reserved: Optional[set] = None,
+                     output_up: bool = True) -> Dict:
+    """Work out where a pending document goes and what it duplicates, without writing it"""
+    from page_analysis import PageAnalysis, file_hash
+    from extraction import parse_date
     pending_path = PENDING_DIR / f"pending_{pending_id}.pdf"
     
     if not pending_path.exists():
@@ -436,229 +557,948 @@ def organize_document(pending_id: str, sender: str, date: str, doc_type: str, ou
     folder_name = sender.replace(" ", "_")
     year_folder = output_base / str(doc_date.year)
     sender_folder = year_folder / folder_name
-    sender_folder.mkdir(parents=True, exist_ok=True)
     
     # Build filename: YYYY-MM-DD_Sender_Type.pdf
     date_str = doc_date.strftime("%Y-%m-%d")
     type_clean = doc_type.replace(" ", "_") if doc_type else "Document"
-    filename = f"{date_str}_{sender}_{type_clean}.pdf"
+    stem = f"{date_str}_{sender}_{type_clean}"
     
-    # Handle duplicates
-    final_path = sender_folder / filename
-    counter = 1
-    while final_path.exists():
-        filename = f"{date_str}_{sender}_{type_clean}_{counter}.pdf"
-        final_path = sender_folder / filename
-        counter += 1
+    # Text was already extracted at split time; read it before the file leaves
+    page_analysis = PageAnalysis(pending_path, cache_dir=PAGE_CACHE_DIR)
+    doc_text = page_analysis.full_text()
+    content_hash = file_hash(pending_path)
+    duplicates = fingerprints.duplicates(content_hash, doc_text)
     
-    # Move file
-    shutil.move(str(pending_path), str(final_path))
+    # Take the next free name from the index; one stat guards against files it hasn't seen
+    final_path = fingerprints.next_free_name(sender_folder, stem, reserved)
+    if output_up and final_path.exists():
+        fingerprints.sync(sender_folder)
+        final_path = fingerprints.next_free_name(sender_folder, stem, reserved)
+    if reserved is not None:
+        reserved.add(final_path)
     
     return {
-        "status": "organized",
+        "status": "ready",
+        "id": pending_id,
+        "pending_path": pending_path,
+        "final_path": final_path,
         "sender": sender,
         "date": date_str,
         "type": doc_type,
-        "saved_to": str(final_path)
+        "text": doc_text,
+        "pages": page_analysis.page_count,
+        "content_hash": content_hash,
+        "duplicates": duplicates,
+        "letterhead": page_analysis.page(0)['header_shingles'] if page_analysis.page_count else '',
     }
 
 
-def cleanup(staging_dir: Path):
-    """Clean up staging directory"""
-    if staging_dir.exists() and staging_dir.is_dir():
-        # Safety check: only delete if it's under our workspace
+def commit_organize(plan: Dict, output_base: Path, fingerprints: 'FingerprintIndex',
+                    manifest: 'PendingManifest', spool: 'WriteSpool',
+                    letterheads: Optional['LetterheadIndex'] = None,
+                    letterhead_config: Optional[Dict] = None) -> Dict:
+    """Queue a prepared document in the write spool and record it as organized
+    
+    With letterheads, its letterhead is remembered under the sender and
+    type it was given.
+    """
+    final_path = plan['final_path']
+    payload = {key: plan[key] for key in ('text', 'sender', 'type', 'date', 'pages')}
+    spooled = spool.enqueue(plan['pending_path'], final_path, output_base, plan['content_hash'], payload)
+    fingerprints.add(final_path, plan['content_hash'], plan['text'], stat_path=spooled)
+    manifest.remove(plan['id'])
+    if letterheads is not None:
+        letterheads.record(plan['letterhead'], plan['sender'], plan['type'], letterhead_config)
+    
+    return {
+        "status": "organized",
+        "sender": plan['sender'],
+        "date": plan['date'],
+        "type": plan['type'],
+        "saved_to": str(final_path),
+        "queued": True,
+        "duplicates": plan['duplicates']
+    }
+
+
+def organize_document(pending_id: str, sender: str, date: str, doc_type: str, output_base: Path,
+                      letterhead_config: Optional[Dict] = None) -> Dict:
+    """Move a pending document to its final location with proper naming
+    
+    The document lands in the local write spool; sync_spool() copies it to
+    saved_to. Its letterhead is remembered for identify_pending.
+    """
+    from fingerprints import FingerprintIndex
+    from pending_manifest import PendingManifest
+    from spool import WriteSpool
+    from letterheads import LetterheadIndex
+    with FingerprintIndex(FINGERPRINT_FILE) as fingerprints:
+        plan = prepare_organize(pending_id, sender, date, doc_type, output_base, fingerprints,
+                                output_up=output_available(output_base))
+        if plan['status'] != 'ready':
+            return plan
+        
+        with PendingManifest(MANIFEST_FILE) as manifest, WriteSpool(SPOOL_DIR) as spool, \
+                LetterheadIndex(LETTERHEAD_FILE) as letterheads:
+            return commit_organize(plan, output_base, fingerprints, manifest, spool,
+                                   letterheads, letterhead_config)
+
+
+def load_batch(source: str) -> List[Dict]:
+    """Organize entries from a JSON list or JSON Lines file ('-' = stdin)"""
+    text = sys.stdin.read() if source == '-' else Path(source).expanduser().read_text()
+    text = text.strip()
+    if text.startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def organize_batch(entries: List[Dict], output_base: Path, letterhead_config: Optional[Dict] = None,
+                   learn: bool = True) -> Dict:
+    """Organize many pending documents with one output base
+    
+    Names and duplicates are resolved serially against the local indexes
+    and every document is queued in the write spool; sync_spool() then
+    writes them to the archive concurrently. Letterheads are remembered
+    unless learn is False (the entries came from the letterhead index).
+    """
+    from fingerprints import FingerprintIndex
+    from pending_manifest import PendingManifest
+    from spool import WriteSpool
+    from letterheads import LetterheadIndex
+    start = time.perf_counter()
+    results = []
+    output_up = output_available(output_base)
+    
+    with FingerprintIndex(FINGERPRINT_FILE) as fingerprints, PendingManifest(MANIFEST_FILE) as manifest, \
+            WriteSpool(SPOOL_DIR) as spool, LetterheadIndex(LETTERHEAD_FILE) as letterheads:
+        reserved = set()
+        for entry in entries:
+            if not isinstance(entry, dict) or not entry.get('id') or not entry.get('sender'):
+                results.append({"status": "error", "error": "missing_params",
+                                "message": "each entry needs id and sender"})
+                continue
+            plan = prepare_organize(entry['id'], entry['sender'], entry.get('date'), entry.get('type'),
+                                    output_base, fingerprints, reserved, output_up)
+            if plan['status'] == 'ready':
+                plan = commit_organize(plan, output_base, fingerprints, manifest, spool,
+                                       letterheads if learn else None, letterhead_config)
+            results.append(dict(plan, id=entry['id']))
+    
+    organized = sum(1 for result in results if result['status'] == 'organized')
+    return {
+        "status": "ok" if organized == len(entries) else ("partial" if organized else "error"),
+        "organized": organized,
+        "failed": len(entries) - organized,
+        "output": str(output_base),
+        "seconds": round(time.perf_counter() - start, 4),
+        "documents": results
+    }
+
+
+def identify_pending(pending_docs: List[Dict], output_base: Path, settings: Dict) -> Dict:
+    """Match pending documents against the letterheads of documents organized before
+    
+    A confident match confirmed often enough, on a document with a date,
+    is organized right away (without being learned from); a match above
+    the prefill confidence comes back as the document's 'suggested'
+    sender, type and date for the agent to check. Returns the documents
+    still pending and those organized.
+    """
+    from page_analysis import PageAnalysis
+    from letterheads import LetterheadIndex, auto_organizable
+    if not settings['enabled']:
+        return {"pending": pending_docs, "auto_organized": []}
+    
+    remaining, entries = [], []
+    with LetterheadIndex(LETTERHEAD_FILE) as letterheads:
+        for doc in pending_docs:
+            pending_path = Path(doc['pending_path'])
+            if not pending_path.exists():
+                continue  # organized since it was saved
+            header = PageAnalysis(pending_path, cache_dir=PAGE_CACHE_DIR).page(0)['header_shingles']
+            match = letterheads.match(header, settings)
+            date = doc['dates_found'][0] if doc['dates_found'] else None
+            if auto_organizable(match, settings) and date:
+                entries.append({"id": doc['id'], "sender": match['sender'], "date": date,
+                                "type": match['type'], "confidence": match['confidence']})
+            elif match and settings['prefill'] is not None and match['confidence'] >= settings['prefill']:
+                remaining.append(dict(doc, suggested={
+                    "sender": match['sender'], "type": match['type'], "date": date,
+                    "confidence": match['confidence'], "sender_confidence": match['sender_confidence'],
+                }))
+            else:
+                remaining.append(doc)
+    
+    organized = []
+    if entries:
+        pending = {doc['id']: doc for doc in pending_docs}
+        batch = organize_batch(entries, output_base, learn=False)
+        for entry, result in zip(entries, batch['documents']):
+            if result['status'] == 'organized':
+                organized.append(dict(result, confidence=entry['confidence']))
+            else:
+                # Left for the agent, with the match as a suggestion
+                remaining.append(dict(pending[entry['id']], suggested={
+                    key: entry[key] for key in ('sender', 'type', 'date', 'confidence')
+                }))
+    return {"pending": remaining, "auto_organized": organized}
+
+
+def sync_spool(prefs: Optional[Dict] = None) -> Dict:
+    """Write queued documents to their archive and update its search index
+    
+    Only one drain runs at a time; a second caller just reports the queue.
+    A document whose name was taken on the archive meanwhile is filed under
+    the next free one, and its fingerprint follows it.
+    """
+    import sqlite3
+    from archive_index import ArchiveIndex, index_path
+    from extraction import extract_dates
+    from fingerprints import FingerprintIndex
+    from nas_writer import write_settings
+    from spool import WriteSpool
+    indexes: Dict[str, 'ArchiveIndex'] = {}
+    
+    def index_written(entry: Dict) -> None:
+        # A failed index update must not fail the write; reindex catches up
+        info = entry['payload']
         try:
-            staging_dir.relative_to(WORKSPACE_DIR)
-            shutil.rmtree(staging_dir)
-        except ValueError:
-            pass  # Not under workspace, don't delete
+            if entry.get('renamed_from'):
+                with FingerprintIndex(FINGERPRINT_FILE) as fingerprints:
+                    fingerprints.move(Path(entry['renamed_from']), Path(entry['dest_path']), entry['sha256'],
+                                      info['text'])
+            if entry['dest_root'] not in indexes:
+                indexes[entry['dest_root']] = ArchiveIndex(index_path(Path(entry['dest_root'])))
+            indexes[entry['dest_root']].add(Path(entry['dest_path']), info['text'], info['sender'],
+                                            info['type'] or "Document", info['date'],
+                                            extract_dates(info['text']), info['pages'])
+        except (sqlite3.Error, KeyError) as e:
+            print(f"Search index not updated: {e}", file=sys.stderr)
+    
+    with WriteSpool(SPOOL_DIR) as spool:
+        with spool.draining() as acquired:
+            if not acquired:
+                return {"status": "busy", "message": "Another sync is running", "queue": spool.depth()}
+            spool.recover()
+            try:
+                result = spool.drain(output_available, index_written, write_settings(prefs))
+            finally:
+                for index in indexes.values():
+                    index.close()
+        result["queue"] = spool.depth()
+    return {"status": "ok" if not result['failed'] else "partial", **result}
 
 
-def main():
+class CommandState:
+    """Preferences and discovered scanners for one CLI invocation
+    
+    Scanner discovery is answered from known_scanners while it is younger
+    than scanner_cache_ttl. Older entries are still returned but refreshed
+    in the background; only an empty cache waits for a full discovery.
+    """
+    
+    def __init__(self):
+        self._scanners = None
+    
+    def preferences(self) -> Dict:
+        return load_preferences()
+    
+    def cache_ttl(self) -> float:
+        return self.preferences().get('scanner_cache_ttl', DEFAULT_SCANNER_CACHE_TTL)
+    
+    def scanners(self, refresh: bool = False) -> List[str]:
+        if self._scanners is not None and not refresh:
+            return self._scanners
+        
+        ages = known_scanner_ages(self.preferences())
+        if refresh or not ages:
+            self._scanners = refresh_scanners()
+        else:
+            if max(ages.values()) > self.cache_ttl():
+                self.refresh_in_background()
+            self._scanners = list(ages)
+        return self._scanners
+    
+    def verify_scanner(self, scanner: str) -> Tuple[bool, List[str]]:
+        """Hot-path check: cache, then a probe of this scanner, then full discovery"""
+        ages = known_scanner_ages(self.preferences())
+        if ages.get(scanner, float('inf')) <= self.cache_ttl():
+            return True, list(ages)
+        
+        if probe_scanner(scanner):
+            record_scanners([scanner])
+            self._scanners = None
+            return True, list(known_scanner_ages(self.preferences()))
+        
+        available = self.scanners(refresh=True)
+        return scanner in available, available
+    
+    def refresh_in_background(self) -> None:
+        """Start a detached full discovery that outlives this process"""
+        try:
+            if time.time() - REFRESH_LOCK.stat().st_mtime < PROBE_TIMEOUT * 6:
+                return  # another refresh is already running
+        except FileNotFoundError:
+            pass
+        REFRESH_LOCK.parent.mkdir(parents=True, exist_ok=True)
+        REFRESH_LOCK.touch()
+        import subprocess
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), 'list-scanners', '--refresh', '--no-daemon'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+    
+    def sync_in_background(self) -> None:
+        """Start a detached sync so queued documents reach the archive after we exit"""
+        import subprocess
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), 'sync', '--no-daemon'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+
+
+class WarmState(CommandState):
+    """Long-lived state for serve mode"""
+    
+    def __init__(self):
+        super().__init__()
+        self._prefs = None
+        self._prefs_mtime = None
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._sync_thread = None
+    
+    def preferences(self) -> Dict:
+        """Cached preferences, re-read only when the file changes"""
+        mtime = PREFERENCES_FILE.stat().st_mtime_ns if PREFERENCES_FILE.exists() else None
+        with self._lock:
+            if self._prefs is None or mtime != self._prefs_mtime:
+                self._prefs = load_preferences()
+                self._prefs_mtime = mtime
+            return dict(self._prefs)
+    
+    def scanners(self, refresh: bool = False) -> List[str]:
+        # Never memoize for the daemon's lifetime; the preference cache has the TTL
+        self._scanners = None
+        return super().scanners(refresh)
+    
+    def refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refresh_thread and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=refresh_scanners, daemon=True)
+            self._refresh_thread.start()
+    
+    def sync_in_background(self) -> None:
+        with self._lock:
+            if self._sync_thread and self._sync_thread.is_alive():
+                return
+            self._sync_thread = threading.Thread(target=sync_spool, args=(self.preferences(),), daemon=True)
+            self._sync_thread.start()
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description='Document Scanner')
     parser.add_argument('mode', nargs='?', default='front', 
-                        choices=['front', 'back', 'single', 'list-scanners', 'setup-check', 'organize', 'list-pending'],
+                        choices=COMMANDS + ['serve'],
                         help='Scan mode or command')
+    parser.add_argument('query', nargs='?', help='Search terms (search)')
     parser.add_argument('--front-pdf', help='Path to front PDF (for back mode)')
+    parser.add_argument('--job', help='Scan job ID to continue (resume)')
     parser.add_argument('--scanner', help='Scanner name override')
     parser.add_argument('--output', help='Output directory override')
     parser.add_argument('--resolution', type=int, help='Resolution override')
+    parser.add_argument('--workers', type=int, help='Parallel page-analysis workers (0 = one per core)')
+    parser.add_argument('--stream', action='store_true', help='Process pages while the feeder is still scanning')
+    parser.add_argument('--refresh', action='store_true', help='Force a full scanner discovery (list-scanners)')
+    parser.add_argument('--no-daemon', action='store_true', help='Run locally even if a serve daemon is running')
+    parser.add_argument('--timings', action='store_true', help='Include per-stage timings in the result')
+    parser.add_argument('--profile', action='store_true', help='Write a cProfile dump of the run to scan-staging/profiles/')
     # For organize mode
     parser.add_argument('--id', help='Pending document ID')
     parser.add_argument('--sender', help='Document sender/source')
     parser.add_argument('--date', help='Document date (YYYY-MM-DD)')
     parser.add_argument('--type', dest='doc_type', help='Document type')
+    # For organize-batch
+    parser.add_argument('--batch', help='JSON or JSON Lines file of {id, sender, date, type} (- = stdin)')
+    parser.set_defaults(documents=None)
+    parser.add_argument('--wait', action='store_true', help='Write organized documents to the archive before returning')
+    # For sync
+    parser.add_argument('--status', action='store_true',
+                        help='Only report the write spool queue (sync) or the hot-folder watcher (watch)')
+    # For watch
+    parser.add_argument('--folder', help='Hot folder to watch (default: the watch.folder preference)')
+    # For list-pending
+    parser.add_argument('--limit', type=int, help='Maximum pending documents to return')
+    parser.add_argument('--offset', type=int, default=0, help='Skip this many pending documents')
+    parser.add_argument('--since', help='Only documents scanned on/after this date (YYYY-MM-DD)')
+    parser.add_argument('--until', help='Only documents scanned on/before this date (YYYY-MM-DD)')
+    parser.add_argument('--older-than', type=float, help='Only documents pending for more than N days')
+    return parser
+
+
+def invalid_date_filter(args: argparse.Namespace) -> Optional[Dict]:
+    """The error result for a --since/--until that isn't an ISO date, None if both are fine"""
+    for flag, value in (('--since', args.since), ('--until', args.until)):
+        if not value:
+            continue
+        try:
+            datetime.fromisoformat(value)
+        except ValueError:
+            return {"status": "error", "error": "invalid_date",
+                    "message": f"{flag} must be a date as YYYY-MM-DD, not {value!r}"}
+    return None
+
+
+def finish_organize(result: Dict, args: argparse.Namespace, state: 'CommandState', timings: Timings) -> Dict:
+    """Write queued documents now (--wait) or in the background"""
+    if result['status'] == 'error':
+        return result
+    if args.wait:
+        with timings.span("sync_spool"):
+            result['sync'] = sync_spool(state.preferences())
+    else:
+        state.sync_in_background()
+    return result
+
+
+def run_command(args: argparse.Namespace, state: Optional['CommandState'] = None) -> Dict:
+    """Execute one command and return its JSON result
     
-    args = parser.parse_args()
+    Its stage timings are appended to the trace log and, with --timings,
+    returned as 'timings'; --profile also writes a cProfile dump.
+    """
+    state = state or CommandState()
+    timings = Timings()
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        result = dispatch_command(args, state, timings)
+    finally:
+        if profiler:
+            profiler.disable()
     
+    if profiler:
+        result['profile'] = str(write_profile(profiler, PROFILE_DIR, args.mode, timings))
+    record_trace(args.mode, timings, result, state)
+    if args.timings:
+        result['timings'] = timings.as_dict()
+    return result
+
+
+def record_trace(command: str, timings: Timings, result: Dict, state: 'CommandState') -> None:
+    """Append a command's stage timings to the trace log, if tracing is on"""
+    settings = trace_settings(state.preferences())
+    if settings['enabled']:
+        try:
+            append_trace(TRACE_FILE, command, timings, result.get('status'), settings)
+        except OSError as e:
+            print(f"Trace log not written: {e}", file=sys.stderr)
+
+
+def dispatch_command(args: argparse.Namespace, state: 'CommandState', timings: Timings) -> Dict:
+    """Run the command args.mode, timing its stages into timings"""
     # Handle special commands
     if args.mode == 'list-scanners':
-        scanners = detect_scanners()
-        print(json.dumps({"status": "ok", "scanners": scanners}))
-        return
+        with timings.span("detect_scanners"):
+            scanners = state.scanners(refresh=args.refresh)
+        return {"status": "ok", "scanners": scanners}
+    
+    if args.mode in ('list-pending', 'search'):
+        error = invalid_date_filter(args)
+        if error:
+            return error
     
     if args.mode == 'list-pending':
-        pending_docs = []
-        if PENDING_DIR.exists():
-            for pdf in PENDING_DIR.glob("pending_*.pdf"):
-                try:
-                    reader = PdfReader(pdf)
-                    text = ""
-                    if len(reader.pages) > 0:
-                        text = reader.pages[0].extract_text() or ""
-                    pending_docs.append({
-                        "id": pdf.stem.replace("pending_", ""),
-                        "path": str(pdf),
-                        "pages": len(reader.pages),
-                        "text_preview": text[:1000]
-                    })
-                except Exception:
-                    pass
-        print(json.dumps({"status": "ok", "pending": pending_docs}))
-        return
+        from pending_manifest import PendingManifest
+        from preview import preview_budget, preview_settings
+        preview_config = preview_settings(state.preferences())
+        with PendingManifest(MANIFEST_FILE) as manifest:
+            manifest.sync(PENDING_DIR, lambda path: describe_pending(path, preview_config))
+            listing = manifest.query(limit=args.limit, offset=args.offset, since=args.since,
+                                     until=args.until, older_than_days=args.older_than)
+        # Entries saved before previews were budgeted hold plain truncated text
+        for entry in listing['pending']:
+            entry['text_preview'] = entry['text_preview'][:preview_budget(preview_config)]
+        return {"status": "ok", **listing}
+    
+    if args.mode == 'sync':
+        if args.status:
+            from spool import WriteSpool
+            with WriteSpool(SPOOL_DIR) as spool:
+                return {"status": "ok", "queue": spool.depth()}
+        return sync_spool(state.preferences())
+    
+    if args.mode in ('search', 'reindex'):
+        from archive_index import ArchiveIndex, index_path
+        output_base = get_output_base(state.preferences(), args.output)
+        if not output_available(output_base):
+            return {"status": "error", "error": "output_unavailable",
+                    "message": f"Archive not reachable: {output_base}"}
+        with ArchiveIndex(index_path(output_base)) as index:
+            if args.mode == 'reindex':
+                from extraction import extract_dates
+                from fingerprints import FingerprintIndex
+                from page_analysis import resolve_workers
+                from spool import WriteSpool
+                # Write what we can first; documents still queued keep their fingerprints
+                sync_spool(state.preferences())
+                with WriteSpool(SPOOL_DIR) as spool:
+                    queued = spool.queued_paths()
+                workers = resolve_workers(args.workers if args.workers is not None else 0)
+                # One read of each changed file serves both indexes
+                extracted: Dict[str, Dict] = {}
+                result = index.reindex(output_base, extract_dates, workers=workers, extracted=extracted)
+                with FingerprintIndex(FINGERPRINT_FILE) as fingerprints:
+                    result.update(fingerprints.sync(output_base, workers=workers, keep=queued,
+                                                    extracted=extracted))
+                return {"status": "ok", "archive": str(output_base), **result}
+            
+            if not args.query:
+                return {"status": "error", "error": "missing_params", "message": "search requires a query"}
+            start = time.perf_counter()
+            found = index.search(args.query, limit=args.limit or 20, offset=args.offset,
+                                 sender=args.sender, doc_type=args.doc_type,
+                                 since=args.since, until=args.until)
+            return {"status": "ok", "query": args.query, **found,
+                    "query_ms": round((time.perf_counter() - start) * 1000, 2)}
     
     if args.mode == 'organize':
         if not args.id or not args.sender:
-            print(json.dumps({
+            return {
                 "status": "error",
                 "error": "missing_params",
                 "message": "organize requires --id and --sender"
-            }))
-            return
+            }
         
-        prefs = load_preferences()
+        from letterheads import letterhead_settings
+        prefs = state.preferences()
         output_base = get_output_base(prefs, args.output)
-        result = organize_document(args.id, args.sender, args.date, args.doc_type, output_base)
-        print(json.dumps(result))
-        return
+        with timings.span("organize_document"):
+            result = organize_document(args.id, args.sender, args.date, args.doc_type, output_base,
+                                       letterhead_settings(prefs))
+        return finish_organize(result, args, state, timings)
+    
+    if args.mode == 'organize-batch':
+        try:
+            entries = args.documents if args.documents is not None else load_batch(args.batch or '-')
+        except (OSError, ValueError) as e:
+            return {"status": "error", "error": "invalid_batch", "message": str(e)}
+        if not isinstance(entries, list):
+            return {"status": "error", "error": "invalid_batch", "message": "batch must be a list of documents"}
+        
+        from letterheads import letterhead_settings
+        prefs = state.preferences()
+        output_base = get_output_base(prefs, args.output)
+        with timings.span("organize_batch"):
+            result = organize_batch(entries, output_base, letterhead_settings(prefs))
+        return finish_organize(result, args, state, timings)
+    
+    if args.mode == 'watch':
+        if not args.status:
+            return {"status": "error", "error": "not_supported",
+                    "message": "watch runs in the foreground: scan_and_organize.py watch [--folder DIR]"}
+        from hot_folder import read_status, watch_settings
+        settings = watch_settings(state.preferences())
+        return {"status": "ok", **read_status(WATCH_STATUS_FILE, INGEST_LEDGER, settings)}
+    
+    if args.mode == 'resume':
+        from jobs import ScanJob
+        if not args.job:
+            return {"status": "error", "error": "missing_params", "message": "resume requires --job",
+                    "unfinished_jobs": ScanJob.unfinished(JOBS_DIR)}
+        job = ScanJob.load(JOBS_DIR, args.job)
+        if job is None:
+            return {"status": "error", "error": "job_not_found", "message": f"Job {args.job} not found"}
+        if job.manifest['status'] == 'complete':
+            return job.manifest['result']
+        return run_job(job, state, timings)
     
     if args.mode == 'setup-check':
-        prefs = load_preferences()
+        prefs = state.preferences()
         missing_tools = check_tools()
-        scanners = detect_scanners()
+        scanners = state.scanners()
         
         if missing_tools:
-            print(json.dumps({
+            return {
                 "status": "error",
                 "error": "missing_tools",
                 "missing": missing_tools,
                 "message": f"Missing tools: {', '.join(missing_tools)}. Install with: brew install {' '.join(missing_tools)}"
-            }))
-            return
+            }
         
         if not prefs.get('setup_complete'):
-            print(json.dumps({
+            return {
                 "status": "setup_required",
                 "available_scanners": scanners,
                 "questions": [
                     {"key": "default_scanner", "question": "Which scanner should I use by default?", "options": scanners},
                     {"key": "default_output", "question": "Where should I save scanned documents?", "default": "/Volumes/home/Scanned Documents"}
                 ]
-            }))
-            return
+            }
         
-        print(json.dumps({"status": "ok", "preferences": prefs}))
-        return
+        return {"status": "ok", "preferences": prefs}
     
     # Load preferences
-    prefs = load_preferences()
+    prefs = state.preferences()
     
     # Check tools
     missing_tools = check_tools()
     if missing_tools:
-        print(json.dumps({
+        return {
             "status": "error",
             "error": "missing_tools",
             "missing": missing_tools
-        }))
-        return
+        }
     
     # Check setup
     if not prefs.get('setup_complete') and not args.scanner:
-        scanners = detect_scanners()
-        print(json.dumps({
+        scanners = state.scanners()
+        return {
             "status": "setup_required",
             "available_scanners": scanners,
             "questions": [
                 {"key": "default_scanner", "question": "Which scanner should I use by default?", "options": scanners},
                 {"key": "default_output", "question": "Where should I save scanned documents?", "default": "/Volumes/home/Scanned Documents"}
             ]
-        }))
-        return
+        }
     
     # Get scanner
     scanner = args.scanner or prefs.get('default_scanner')
     if not scanner:
-        print(json.dumps({"status": "error", "error": "no_scanner", "message": "No scanner configured"}))
-        return
+        return {"status": "error", "error": "no_scanner", "message": "No scanner configured"}
     
     # Verify scanner is available
-    available = detect_scanners()
-    if scanner not in available:
-        print(json.dumps({
+    with timings.span("detect_scanners"):
+        found, available = state.verify_scanner(scanner)
+    if not found:
+        return {
             "status": "error",
             "error": "scanner_not_found",
             "message": f"Scanner '{scanner}' not available",
             "available_scanners": available
-        }))
-        return
+        }
+    
+    from jobs import ScanJob
+    job = ScanJob.create(JOBS_DIR, args.mode, {
+        'scanner': scanner,
+        'front_pdf': args.front_pdf,
+        'output': args.output,
+        'stream': bool(args.stream or prefs.get('streaming')),
+        'workers': args.workers,
+    })
+    return run_job(job, state, timings)
+
+
+def run_job(job: 'ScanJob', state: 'CommandState', timings: Timings) -> Dict:
+    """Run a scan job's stages in order, skipping those already done
+    
+    The stages are scan, merge (duplex merge and OCR, or assembling a
+    streamed scan), analyze, save_pending (which also re-encodes the
+    documents for storage) and identify (letterhead
+    matching, which may organize documents); an ingest job's scan copies
+    the file from the hot folder instead. Each is checkpointed in the
+    job manifest; a stage whose inputs hash as recorded and whose outputs
+    are intact is not run again, so resuming never rescans paper that
+    reached the disk and never repeats OCR or analysis.
+    """
+    from PyPDF2 import PdfReader
+    from blank_detection import blank_settings
+    from ocr_stage import ocr_settings
+    from streaming import PageStream
+    from page_analysis import cache_settings, file_hash, prune_cache, resolve_workers
+    from boundaries import boundary_settings
+    from preview import preview_settings
+    from letterheads import letterhead_settings
+    from output_optimizer import optimize_settings
+    from jobs import ScanJob, job_settings, value_hash
+    prefs = state.preferences()
+    params = job.params
+    ocr_config = ocr_settings(prefs)
+    ScanJob.prune(JOBS_DIR, job_settings(prefs), keep=[job.id])
+    for cache_dir in (PAGE_CACHE_DIR, OCR_CACHE_DIR):
+        prune_cache(cache_dir, cache_settings(prefs))
+    
+    def stream_for(side: str) -> 'PageStream':
+        return PageStream(job.directory / f"{side}-stream", OCR_CACHE_DIR,
+                          blank_settings(prefs), ocr_config, workers=ocr_config['workers'])
     
-    # Get output directory
-    output_base = get_output_base(prefs, args.output)
-    using_fallback = args.output is None and prefs.get('default_output') and not Path(prefs['default_output']).exists()
+    def failed(error: str, message: str) -> Dict:
+        job.fail(message)
+        return {"status": "error", "error": error, "message": message, "job": job.id}
     
     try:
-        # Scan
-        pdf_path = scan_documents(args.mode, scanner, STAGING_DIR)
-        
-        if pdf_path is None:
-            print(json.dumps({"status": "empty", "message": "No documents in feeder"}))
-            return
+        # Scan - the only stage that needs the paper, and the scanner to itself
+        stream = None
+        scan = job.stage('scan')
+        if scan is None and job.mode == 'ingest':
+            pdf_path = job.directory / "ingest-scan.pdf"
+            with timings.span("ingest.copy"):
+                shutil.copyfile(params['source'], pdf_path)
+            scan = job.complete('scan', {}, {'pdf': pdf_path})
+        if scan is None:
+            with scanner_lock(LOCK_DIR, params['scanner']), timings.span("scan_documents"):
+                if params['stream']:
+                    stream = stream_for(job.mode)
+                    pdf_path = scan_documents_streaming(job.mode, params['scanner'], stream)
+                else:
+                    pdf_path = scan_documents(job.mode, params['scanner'], job.directory)
+            
+            if pdf_path is None:
+                return job.finish({"status": "empty", "message": "No documents in feeder"})
+            scan = job.complete('scan', {}, {'pdf': pdf_path})
+        pdf_path = job.output('scan')
         
         # Front mode - wait for back
-        if args.mode == 'front':
+        if job.mode == 'front':
             page_count = len(PdfReader(pdf_path).pages)
-            print(json.dumps({
+            return job.finish({
                 "status": "awaiting_flip",
                 "pages": page_count,
                 "front_pdf": str(pdf_path),
                 "message": f"Scanned {page_count} pages (front sides). Please flip the entire stack and reload."
-            }))
-            return
+            }, keep=[pdf_path])
         
-        # Back mode - merge with front
-        if args.mode == 'back':
-            if not args.front_pdf:
-                print(json.dumps({"status": "error", "error": "missing_front_pdf", "message": "Front PDF path required for back mode"}))
-                return
-            
-            front_pdf = Path(args.front_pdf)
-            if not front_pdf.exists():
-                print(json.dumps({"status": "error", "error": "front_pdf_not_found", "message": f"Front PDF not found: {args.front_pdf}"}))
-                return
+        # Back mode - merge with front; a streamed scan is assembled from its OCR'd pages
+        if job.mode in ('back', 'ingest') or params['stream']:
+            inputs = {'scan': scan['outputs']['pdf']['sha256']}
+            if job.mode == 'back':
+                if not params['front_pdf']:
+                    return failed("missing_front_pdf", "Front PDF path required for back mode")
+                
+                front_pdf = Path(params['front_pdf'])
+                if not front_pdf.exists():
+                    return failed("front_pdf_not_found", f"Front PDF not found: {params['front_pdf']}")
+                inputs['front'] = file_hash(front_pdf)
             
-            pdf_path = merge_duplex(front_pdf, pdf_path, STAGING_DIR)
+            if job.stage('merge', inputs) is None:
+                if job.mode == 'ingest':
+                    merged_path = prune_and_ocr(PdfReader(pdf_path).pages, job.directory / "ingest.pdf",
+                                                job.directory / "ingest-ocr.pdf", blank_settings(prefs),
+                                                ocr_config, timings, spans=("ingest.prune", "ingest.ocr"))
+                elif not params['stream']:
+                    merged_path = merge_duplex(front_pdf, pdf_path, job.directory, blank_settings(prefs),
+                                               ocr_config, timings)
+                else:
+                    # Resuming has no live stream; the OCR cache still holds its pages
+                    raw_pages = stream.pages() if stream else PdfReader(pdf_path).pages
+                    stream = stream or stream_for(job.mode)
+                    if job.mode == 'back':
+                        with timings.span("assemble"):
+                            front_pages = PdfReader(front_pdf).pages
+                            merged_path = stream.assemble(interleave_duplex(front_pages, raw_pages),
+                                                          job.directory / "merged-scan-ocr.pdf", PAGE_CACHE_DIR)
+                    else:
+                        with timings.span("assemble"):
+                            merged_path = stream.assemble(raw_pages, job.directory / "single-scan-ocr.pdf",
+                                                          PAGE_CACHE_DIR)
+                
+                if merged_path is None:
+                    return job.finish({"status": "empty", "message": "Only blank pages were scanned"})
+                job.complete('merge', inputs, {'pdf': merged_path})
+            pdf_path = job.output('merge')
         
         # Analyze and split
-        documents = analyze_and_split(pdf_path)
+        inputs = {'pdf': file_hash(pdf_path)}
+        analyzed = job.stage('analyze', inputs)
+        if analyzed is None:
+            workers = params['workers'] if params['workers'] is not None else prefs.get('analysis_workers', 1)
+            with timings.span("analyze_and_split"):
+                documents = analyze_and_split(pdf_path, workers=resolve_workers(workers),
+                                              settings=boundary_settings(prefs),
+                                              preview_config=preview_settings(prefs))
+            analyzed = job.complete('analyze', inputs, documents=documents)
+        documents = analyzed['documents']
         
         # Save to pending for agent identification
-        pending_docs = save_pending_documents(pdf_path, documents)
+        inputs = dict(inputs, documents=value_hash(documents))
+        saved = job.stage('save_pending', inputs)
+        if saved is None:
+            with timings.span("save_pending_documents"):
+                pending_docs = save_pending_documents(pdf_path, documents, batch_id=job.id,
+                                                      preview_config=preview_settings(prefs),
+                                                      optimize_config=optimize_settings(prefs), timings=timings)
+            saved = job.complete('save_pending', inputs, pending=pending_docs)
+        
+        # Documents from known letterheads are organized or pre-filled
+        output_base = get_output_base(prefs, params['output'])
+        inputs = dict(inputs, pending=value_hash(saved['pending']))
+        identified = job.stage('identify', inputs)
+        if identified is None:
+            with timings.span("identify_pending"):
+                matched = identify_pending(saved['pending'], output_base, letterhead_settings(prefs))
+            identified = job.complete('identify', inputs, **matched)
+        if identified['auto_organized']:
+            state.sync_in_background()
         
         result = {
-            "status": "needs_identification",
-            "documents": pending_docs,
-            "total_documents": len(pending_docs),
+            "status": "needs_identification" if identified['pending'] else "organized",
+            "documents": identified['pending'],
+            "total_documents": len(saved['pending']),
             "message": "Documents scanned and split. Please identify each document (sender, date, type) using the document-analysis skill, then call 'organize' for each."
         }
+        optimized = [doc for doc in saved['pending'] if 'optimized_bytes' in doc]
+        if optimized:
+            written = sum(doc['bytes_written'] for doc in optimized)
+            stored = sum(doc['optimized_bytes'] for doc in optimized)
+            result["storage"] = {
+                "bytes_written": written,
+                "bytes_optimized": stored,
+                "ratio": round(written / stored, 2) if stored else 1.0,
+                "optimize_seconds": round(sum(doc['optimize_seconds'] for doc in optimized), 4),
+                "pages_over_budget": sum(len(doc.get('pages_over_budget', [])) for doc in optimized),
+            }
+        if identified['auto_organized']:
+            result["auto_organized"] = identified['auto_organized']
+            result["message"] = (f"{len(identified['auto_organized'])} of {len(saved['pending'])} documents matched "
+                                 f"known letterheads and were organized. " +
+                                 (result["message"] if identified['pending'] else ""))
         
-        if using_fallback:
-            result["warning"] = "Default output not accessible, will use fallback location"
+        if not output_available(output_base):
+            result["warning"] = "Default output not accessible; organized documents will wait in the local spool until it is back"
         
-        print(json.dumps(result))
+        return job.finish(result)
         
     except Exception as e:
-        print(json.dumps({"status": "error", "error": "scan_failed", "message": str(e)}))
+        return failed("scan_failed", str(e))
+
+
+def ingest_file(path: Path, sha256: str, state: 'CommandState') -> Dict:
+    """Run a PDF from the hot folder through OCR, splitting and pending, as a job
+    
+    An unfinished ingest job for the same content is resumed rather than
+    started over, so a watcher restarted after a crash picks up where it was.
+    """
+    from jobs import ScanJob
+    timings = Timings()
+    job = None
+    for job_id in ScanJob.unfinished(JOBS_DIR):
+        unfinished = ScanJob.load(JOBS_DIR, job_id)
+        if unfinished.mode == 'ingest' and unfinished.params.get('source_sha256') == sha256:
+            job = unfinished
+            break
+    if job is None:
+        job = ScanJob.create(JOBS_DIR, 'ingest', {
+            'source': str(path),
+            'source_sha256': sha256,
+            'scanner': None,
+            'front_pdf': None,
+            'output': None,
+            'stream': False,
+            'workers': None,
+        })
+    result = run_job(job, state, timings)
+    record_trace('ingest', timings, result, state)
+    return result
+
+
+def watch(folder: Optional[str] = None, state: Optional['CommandState'] = None,
+          stop=None, backend: Optional[str] = None) -> Dict:
+    """Ingest PDFs arriving in the hot folder until interrupted; returns the final status"""
+    from hot_folder import HotFolder, read_status, watch_settings
+    state = state or WarmState()
+    settings = watch_settings(state.preferences())
+    folder = folder or settings['folder']
+    if not folder:
+        return {"status": "error", "error": "missing_params",
+                "message": "watch requires --folder or the watch.folder preference"}
+    folder = Path(folder).expanduser()
+    if not folder.is_dir():
+        return {"status": "error", "error": "folder_not_found", "message": f"Hot folder not found: {folder}"}
+    
+    hot_folder = HotFolder(folder, lambda path, sha256: ingest_file(path, sha256, state),
+                           INGEST_LEDGER, WATCH_STATUS_FILE, settings, backend)
+    print(f"Watching {folder} ({hot_folder.backend})", file=sys.stderr)
+    hot_folder.run(stop)
+    return {"status": "ok", **read_status(WATCH_STATUS_FILE, INGEST_LEDGER, settings), "watching": False}
+
+
+def serve(socket_path: Path = None) -> None:
+    """Run the long-lived daemon until it receives 'shutdown'"""
+    from jobs import ScanJob
+    from spool import WriteSpool
+    state = WarmState()
+    
+    def handle(method: str, params: Dict) -> Dict:
+        args = build_parser().parse_args([method])
+        for key, value in params.items():
+            if hasattr(args, key):
+                setattr(args, key, value)
+        return run_command(args, state)
+    
+    def retry_spool() -> None:
+        # Keep retrying queued documents, e.g. until the NAS is mounted again
+        while True:
+            time.sleep(SPOOL_RETRY_INTERVAL)
+            with WriteSpool(SPOOL_DIR) as spool:
+                queued = spool.depth()['files']
+            if queued:
+                state.sync_in_background()
+    
+    def scanner_of(method: str, params: Dict) -> str:
+        # Scans on different scanners run in parallel, on the same one in order
+        if method == 'resume' and params.get('job'):
+            job = ScanJob.load(JOBS_DIR, params['job'])
+            if job:
+                return job.params['scanner']
+        return params.get('scanner') or state.preferences().get('default_scanner') or ''
+    
+    server = ScannerDaemon(socket_path or SOCKET_PATH, handle, COMMANDS, SCANNER_COMMANDS, scanner_of)
+    threading.Thread(target=retry_spool, name="spool-retry", daemon=True).start()
+    print(f"Serving on {server.socket_path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+# Options naming files or folders, resolved against the caller's cwd before a daemon sees them
+PATH_OPTIONS = ('front_pdf', 'output', 'folder', 'batch')
+
+
+def main():
+    args = build_parser().parse_args()
+    
+    missing = missing_dependency(args.mode)
+    if missing:
+        print(json.dumps(missing))
+        sys.exit(1)
+    
+    if args.mode == 'serve':
+        serve()
+        return
+    
+    # The watcher runs in the foreground; only its status goes through the daemon
+    if args.mode == 'watch' and not args.status:
+        print(json.dumps(watch(args.folder)))
+        return
+    
+    # The daemon has its own cwd and can't read our stdin
+    if args.mode == 'organize-batch' and (args.batch or '-') == '-':
+        try:
+            args.documents = load_batch('-')
+        except ValueError as e:
+            print(json.dumps({"status": "error", "error": "invalid_batch", "message": str(e)}))
+            return
+    for option in PATH_OPTIONS:
+        value = getattr(args, option)
+        if value and value != '-':
+            setattr(args, option, str(Path(value).expanduser().resolve()))
+    
+    # Hand the command to a running daemon; run locally if there is none
+    if not args.no_daemon:
+        params = {k: v for k, v in vars(args).items() if k not in ('mode', 'no_daemon')}
+        try:
+            print(json.dumps(daemon_request(SOCKET_PATH, args.mode, params)))
+            return
+        except DaemonUnavailable:
+            pass
+    
+    print(json.dumps(run_command(args)))
 
 
 if __name__ == "__main__":
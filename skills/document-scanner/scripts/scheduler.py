@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Scheduler - concurrent scans on several scanners, one job per scanner at a time
+
+The daemon used to push every scanner command through one queue, and
+scan_documents found its output by globbing the shared staging folder for
+PDFs newer than the scan's start, so two scans at once could take each
+other's files. Scan jobs now run in their own directories. ScanScheduler
+gives each scanner its own queue and worker thread, so jobs on different
+scanners run in parallel and jobs on the same scanner run in order.
+scanner_lock keeps that order across processes as well. A scan's output is
+the PDF scanline reports writing, or else the PDF that a snapshot diff of
+the job directory shows appeared during the scan.
+"""
+import re
+import sys
+import fcntl
+import queue
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+PDF_SUFFIX = re.compile(r'\.pdf\b', re.IGNORECASE)
+
+
+def lock_name(scanner: str) -> str:
+    """A file name for the scanner's lock"""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', scanner).strip('_') or 'default'
+
+
+@contextmanager
+def scanner_lock(lock_dir: Path, scanner: str) -> Iterator[None]:
+    """Exclusive use of one scanner across threads and processes; blocks until it is free"""
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    with open(lock_dir / f"{lock_name(scanner)}.lock", "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            print(f"Waiting for {scanner} to finish another scan...", file=sys.stderr)
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def snapshot(directory: Path) -> Dict[Path, Tuple[int, int]]:
+    """(mtime_ns, size) of every PDF under directory, one stat per file"""
+    if not directory.exists():
+        return {}
+    files = {}
+    for path in directory.rglob("*.pdf"):
+        stat = path.stat()
+        files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def new_files(before: Dict[Path, Tuple[int, int]], after: Dict[Path, Tuple[int, int]]) -> List[Path]:
+    """PDFs that appeared or changed between two snapshots, oldest first"""
+    changed = [path for path, stat in after.items() if before.get(path) != stat]
+    return sorted(changed, key=lambda path: after[path][0])
+
+
+def reported_paths(output: str) -> List[Path]:
+    """Existing PDF files named in scanline's output, in the order reported"""
+    paths: List[Path] = []
+    for line in output.splitlines():
+        for match in PDF_SUFFIX.finditer(line):
+            # The longest path ending here that exists, e.g. after "Scanned to "
+            for start in [i for i, char in enumerate(line[:match.end()]) if char == '/']:
+                candidate = Path(line[start:match.end()])
+                if candidate.is_file():
+                    if candidate not in paths:
+                        paths.append(candidate)
+                    break
+    return paths
+
+
+class ScanScheduler:
+    """Runs jobs one at a time per scanner, on a worker thread per scanner"""
+
+    def __init__(self, handler: Callable[[str, Dict], Dict]):
+        self.handler = handler
+        self._queues: Dict[str, queue.Queue] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, scanner: str, method: str, params: Dict) -> Dict:
+        """Queue a job behind the scanner's earlier jobs and wait for its result"""
+        done = threading.Event()
+        outcome: Dict[str, Any] = {}
+        self._queue(scanner).put((method, params, done, outcome))
+        done.wait()
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['result']
+
+    @property
+    def depth(self) -> int:
+        return sum(self.depths().values())
+
+    def depths(self) -> Dict[str, int]:
+        """Jobs waiting per scanner, not counting the one running"""
+        with self._lock:
+            return {scanner: jobs.qsize() for scanner, jobs in self._queues.items()}
+
+    def _queue(self, scanner: str) -> queue.Queue:
+        with self._lock:
+            if scanner not in self._queues:
+                self._queues[scanner] = queue.Queue()
+                threading.Thread(target=self._work, args=(self._queues[scanner],),
+                                 name=f"scanner-{lock_name(scanner)}", daemon=True).start()
+            return self._queues[scanner]
+
+    def _work(self, jobs: queue.Queue) -> None:
+        while True:
+            method, params, done, outcome = jobs.get()
+            try:
+                outcome['result'] = self.handler(method, params)
+            except Exception as e:
+                outcome['error'] = e
+            finally:
+                done.set()
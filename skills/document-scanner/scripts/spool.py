@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Write Spool - local write-behind queue in front of the archive
+
+organize used to write straight to the NAS, blocking on a slow SMB link and
+falling back to a local folder for good when the share wasn't mounted.
+Now organize only moves the pending file into the spool and records where
+it belongs in a SQLite journal, which is a local rename. drain() later
+copies queued files to their destination with verified, concurrent writes
+(nas_writer), skipping destinations that are unavailable. A destination
+name taken on the archive since the entry was queued is never overwritten;
+the entry moves to the next free name. Each entry stays
+in the journal until its copy is verified and its completion hook has run,
+so an interrupted drain simply resumes on the next run.
+
+Entries are journaled as 'incoming' before their file is moved in and
+flipped to 'queued' after, so a crash mid-enqueue is repaired by recover().
+"""
+import os
+import json
+import fcntl
+import shutil
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from nas_writer import copy_all, DEFAULT_WRITE_SETTINGS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spool (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    state TEXT NOT NULL,
+    dest_root TEXT NOT NULL,
+    dest_path TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    queued_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS spool_state ON spool (state, id);
+"""
+
+
+class WriteSpool:
+    """Journaled local spool of files waiting to be written to the archive"""
+
+    def __init__(self, spool_dir: Path):
+        self.spool_dir = Path(spool_dir)
+        self.files_dir = self.spool_dir / "files"
+        self.files_dir.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.spool_dir / "journal.sqlite"), timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> 'WriteSpool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def file_for(self, entry_id: int) -> Path:
+        return self.files_dir / f"{entry_id:08d}.pdf"
+
+    def enqueue(self, src: Path, dest: Path, dest_root: Path, checksum: str,
+                payload: Optional[Dict] = None) -> Path:
+        """Move src into the spool, bound for dest; returns the spooled file"""
+        size = src.stat().st_size
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO spool (state, dest_root, dest_path, sha256, size, payload, queued_at) "
+                "VALUES ('incoming', ?, ?, ?, ?, ?, ?)",
+                (str(dest_root), str(dest), checksum, size, json.dumps(payload or {}),
+                 datetime.now().isoformat(timespec='seconds'))
+            )
+        spooled = self.file_for(cursor.lastrowid)
+        try:
+            os.replace(src, spooled)
+        except OSError:
+            # Pending and spool directories on different filesystems
+            shutil.copy2(src, spooled)
+            src.unlink()
+        with self.conn:
+            self.conn.execute("UPDATE spool SET state = 'queued' WHERE id = ?", (cursor.lastrowid,))
+        return spooled
+
+    def recover(self) -> int:
+        """Finish or roll back enqueues that were interrupted; returns entries repaired"""
+        repaired = 0
+        for row in self.conn.execute("SELECT id, size FROM spool WHERE state = 'incoming'").fetchall():
+            spooled = self.file_for(row['id'])
+            with self.conn:
+                if spooled.exists() and spooled.stat().st_size == row['size']:
+                    self.conn.execute("UPDATE spool SET state = 'queued' WHERE id = ?", (row['id'],))
+                else:
+                    self.conn.execute("DELETE FROM spool WHERE id = ?", (row['id'],))
+            repaired += 1
+        return repaired
+
+    def entries(self) -> List[Dict]:
+        rows = self.conn.execute("SELECT * FROM spool WHERE state = 'queued' ORDER BY id").fetchall()
+        return [dict(row, payload=json.loads(row['payload'])) for row in rows]
+
+    def queued_paths(self) -> set:
+        return {row[0] for row in self.conn.execute("SELECT dest_path FROM spool")}
+
+    def depth(self) -> Dict:
+        """Queue depth, total and per destination"""
+        row = self.conn.execute(
+            "SELECT COUNT(*) AS files, COALESCE(SUM(size), 0) AS bytes, MIN(queued_at) AS oldest, "
+            "SUM(attempts > 0) AS retrying FROM spool"
+        ).fetchone()
+        destinations = {
+            r['dest_root']: r['files']
+            for r in self.conn.execute("SELECT dest_root, COUNT(*) AS files FROM spool GROUP BY dest_root")
+        }
+        return {
+            "files": row['files'],
+            "bytes": row['bytes'],
+            "oldest": row['oldest'],
+            "retrying": row['retrying'] or 0,
+            "destinations": destinations,
+        }
+
+    @contextmanager
+    def draining(self) -> Iterator[bool]:
+        """Exclusive drain lock across processes; yields False if another drain holds it"""
+        with open(self.spool_dir / "drain.lock", "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def drain(self, available: Callable[[Path], bool], on_done: Optional[Callable[[Dict], None]] = None,
+              settings: Optional[Dict] = None) -> Dict:
+        """Copy queued files to available destinations; returns written/failed/waiting counts
+
+        on_done(entry) runs after an entry's copy is verified and before it
+        leaves the journal, so its side effects are redone, never lost, if
+        the drain is interrupted. An entry written under another name than
+        it was queued with has its dest_path updated and carries the queued
+        one as renamed_from.
+        """
+        settings = settings or DEFAULT_WRITE_SETTINGS
+        reachable: Dict[str, bool] = {}
+        ready, waiting = [], 0
+        for entry in self.entries():
+            root = entry['dest_root']
+            if root not in reachable:
+                reachable[root] = available(Path(root))
+            if reachable[root]:
+                ready.append(entry)
+            else:
+                waiting += 1
+
+        reports = copy_all([(self.file_for(e['id']), Path(e['dest_path'])) for e in ready], settings)
+
+        written, errors, renamed = 0, [], []
+        for entry, report in zip(ready, reports):
+            if report['status'] == 'ok' and report['sha256'] != entry['sha256']:
+                report = {"status": "error", "message": "spooled file changed since it was queued"}
+            if report['status'] != 'ok':
+                errors.append({"path": entry['dest_path'], "message": report['message']})
+                with self.conn:
+                    self.conn.execute("UPDATE spool SET attempts = attempts + 1, last_error = ? WHERE id = ?",
+                                      (report['message'], entry['id']))
+                continue
+            if report['path'] != entry['dest_path']:
+                with self.conn:
+                    self.conn.execute("UPDATE spool SET dest_path = ? WHERE id = ?", (report['path'], entry['id']))
+                renamed.append({"from": entry['dest_path'], "to": report['path']})
+                entry = dict(entry, dest_path=report['path'], renamed_from=entry['dest_path'])
+            if on_done:
+                on_done(entry)
+            self.file_for(entry['id']).unlink()
+            with self.conn:
+                self.conn.execute("DELETE FROM spool WHERE id = ?", (entry['id'],))
+            written += 1
+
+        return {
+            "written": written,
+            "failed": len(errors),
+            "errors": errors,
+            "renamed": renamed,
+            "waiting": waiting,
+            "unavailable": sorted(root for root, ok in reachable.items() if not ok),
+        }
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Streaming Scan - process pages while the feeder is still running
+
+PageStream runs scanline in the background and watches its output directory.
+Every PDF that lands there (once its size has settled and it parses) is
+handed to a worker pool that prunes blank pages, OCRs the rest into the
+shared OCR cache and extracts page features. When the physical scan ends,
+assemble() only has to stitch cached pages together and seed the page
+analysis, leaving just the grouping and split.
+"""
+import sys
+import time
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from PyPDF2 import PdfReader, PdfWriter
+
+from blank_detection import is_blank_raster, DEFAULT_BLANK_SETTINGS
+from ocr_stage import ocr_pages, ocr_available, page_hash, DEFAULT_OCR_SETTINGS
+from page_analysis import PageAnalysis
+
+POLL_INTERVAL = 0.25
+
+
+class PageStream:
+    """Watches a scan directory and processes pages as they land"""
+
+    def __init__(self, watch_dir: Path, ocr_cache_dir: Path,
+                 settings: Optional[Dict] = None, ocr_config: Optional[Dict] = None,
+                 workers: int = 2, poll_interval: float = POLL_INTERVAL):
+        self.watch_dir = Path(watch_dir)
+        self.ocr_cache_dir = Path(ocr_cache_dir)
+        self.settings = settings or DEFAULT_BLANK_SETTINGS
+        self.ocr_config = ocr_config or DEFAULT_OCR_SETTINGS
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.landed: List[Path] = []
+        # page hash -> blank verdict / page features of the OCR'd page
+        self.blank: Dict[str, bool] = {}
+        self.features: Dict[str, Dict] = {}
+        # PdfWriter maps source objects by id(reader): keep readers alive
+        self._readers: List[PdfReader] = []
+
+    def run(self, command: List[str]) -> subprocess.CompletedProcess:
+        """Run the scanner command, processing each landed file concurrently"""
+        if self.watch_dir.exists():
+            shutil.rmtree(self.watch_dir)
+        self.watch_dir.mkdir(parents=True)
+
+        sizes: Dict[Path, int] = {}
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            futures = []
+            while True:
+                finished = process.poll() is not None
+                for path in self._settled_files(sizes, final=finished):
+                    self.landed.append(path)
+                    futures.append(pool.submit(self._process_file, path))
+                if finished:
+                    break
+                time.sleep(self.poll_interval)
+
+            stdout, stderr = process.communicate()
+            for future in futures:
+                future.result()
+
+        return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
+    def _settled_files(self, sizes: Dict[Path, int], final: bool) -> List[Path]:
+        """New PDFs whose size is unchanged since the last poll and that parse"""
+        settled = []
+        for path in sorted(self.watch_dir.rglob("*.pdf")):
+            if path in self.landed:
+                continue
+            size = path.stat().st_size
+            if size == 0 or (sizes.get(path) != size and not final):
+                sizes[path] = size
+                continue
+            try:
+                PdfReader(path)
+            except Exception:
+                continue
+            settled.append(path)
+        return settled
+
+    def _process_file(self, path: Path) -> None:
+        """Blank pruning, OCR and feature extraction for one landed file"""
+        reader = PdfReader(path)
+        kept = []
+        for page in reader.pages:
+            key = page_hash(page)
+            self.blank[key] = bool(is_blank_raster(page, self.settings))
+            if not self.blank[key]:
+                kept.append((key, page))
+        if not kept:
+            return
+
+        with tempfile.TemporaryDirectory(dir=self.watch_dir.parent) as tmp:
+            raw_path = Path(tmp) / "pages.pdf"
+            writer = PdfWriter()
+            for _, page in kept:
+                writer.add_page(page)
+            with open(raw_path, "wb") as f:
+                writer.write(f)
+
+            text_path = raw_path
+            if ocr_available(self.ocr_config):
+                text_path = Path(tmp) / "pages-ocr.pdf"
+                ocr_pages(raw_path, text_path, self.ocr_cache_dir, self.ocr_config)
+
+            analyses = PageAnalysis(text_path).pages()
+            for (key, _), analysis in zip(kept, analyses):
+                self.features[key] = analysis
+
+    def pages(self) -> List:
+        """Raw scanned pages in landing order"""
+        pages = []
+        for path in self.landed:
+            self._readers.append(PdfReader(path))
+            pages.extend(self._readers[-1].pages)
+        return pages
+
+    def combine(self, output_path: Path) -> Optional[Path]:
+        """Write all raw pages into one PDF, like a non-streaming scan"""
+        pages = self.pages()
+        if not pages:
+            return None
+        writer = PdfWriter()
+        for page in pages:
+            writer.add_page(page)
+        with open(output_path, "wb") as f:
+            writer.write(f)
+        return output_path
+
+    def assemble(self, raw_pages: List, output_path: Path,
+                 page_cache_dir: Optional[Path] = None) -> Optional[Path]:
+        """Build the final OCR'd PDF from cached pages and seed its page analysis"""
+        kept = []
+        for page in raw_pages:
+            key = page_hash(page)
+            if key not in self.blank:
+                self.blank[key] = bool(is_blank_raster(page, self.settings))
+            if not self.blank[key]:
+                kept.append((key, page))
+        if not kept:
+            return None
+
+        raw_path = output_path.with_name(output_path.stem + "-raw.pdf")
+        writer = PdfWriter()
+        for _, page in kept:
+            writer.add_page(page)
+        with open(raw_path, "wb") as f:
+            writer.write(f)
+
+        if not ocr_available(self.ocr_config):
+            shutil.copy(raw_path, output_path)
+        else:
+            # Streamed pages are all OCR cache hits; only unseen pages run now
+            stats = ocr_pages(raw_path, output_path, self.ocr_cache_dir, self.ocr_config)
+            if stats['failed']:
+                print(f"OCR failed for {stats['failed']} of {stats['pages']} pages", file=sys.stderr)
+
+        analyses = [self.features.get(key) for key, _ in kept]
+        if all(analyses):
+            PageAnalysis.seed(output_path, analyses, cache_dir=page_cache_dir)
+        return output_path
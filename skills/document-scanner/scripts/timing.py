@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Timing - per-stage spans, a JSONL trace log and cProfile dumps
+
+A slow scan used to be a single opaque JSON result. Each command now
+collects named wall-clock spans (scan_documents, merge_duplex.ocr, ...)
+in a Timings object; the result can carry them as a 'timings' object and
+every run appends them to a trace log, one JSON line per span, so trends
+over weeks of real use can be read back with any JSONL tool. The log is
+rotated to a single .1 file once it grows past max_bytes.
+"""
+import os
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    import cProfile
+
+DEFAULT_TRACE_SETTINGS = {
+    'enabled': True,               # append spans to the trace log
+    'max_bytes': 5 * 1024 * 1024,  # rotate the log past this size
+}
+
+
+def trace_settings(prefs: Optional[Dict] = None) -> Dict:
+    """Merge the trace preferences over the defaults"""
+    settings = dict(DEFAULT_TRACE_SETTINGS)
+    if prefs:
+        settings.update(prefs.get('trace') or {})
+    return settings
+
+
+class Timings:
+    """Named wall-clock spans of one command"""
+
+    def __init__(self):
+        self.run_id = os.urandom(6).hex()
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self.spans: List[Dict] = []
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as name; repeated names add up"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append({
+                "span": name,
+                "offset": round(start - self._start, 4),
+                "seconds": round(time.perf_counter() - start, 4),
+            })
+
+    def total(self) -> float:
+        return round(time.perf_counter() - self._start, 4)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Seconds per span name, plus the total so far"""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            totals[span['span']] = round(totals.get(span['span'], 0.0) + span['seconds'], 4)
+        totals['total'] = self.total()
+        return totals
+
+
+def append_trace(path: Path, command: str, timings: Timings, status: Optional[str],
+                 settings: Optional[Dict] = None) -> None:
+    """Append one JSON line per span (and one for the total) to the trace log"""
+    settings = settings or DEFAULT_TRACE_SETTINGS
+    base = {"ts": timings.started.isoformat(timespec='milliseconds'), "run": timings.run_id,
+            "command": command, "status": status}
+    lines = [dict(base, **span) for span in timings.spans]
+    lines.append(dict(base, span="total", offset=0.0, seconds=timings.total()))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if path.stat().st_size > settings['max_bytes']:
+            os.replace(path, path.with_name(path.name + ".1"))
+    except FileNotFoundError:
+        pass
+    # One write per run, so concurrent runs don't interleave lines
+    with open(path, "a") as f:
+        f.write("".join(json.dumps(line) + "\n" for line in lines))
+
+
+def write_profile(profiler: 'cProfile.Profile', directory: Path, command: str, timings: Timings) -> Path:
+    """Dump a finished profile as directory/YYYYmmdd_HHMMSS_<command>_<run>.prof"""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{timings.started.strftime('%Y%m%d_%H%M%S')}_{command}_{timings.run_id}.prof"
+    profiler.dump_stats(str(path))
+    return path
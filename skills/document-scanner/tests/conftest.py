@@ -0,0 +1,72 @@
+"""
+Shared fixtures for the document scanner tests
+"""
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+# Add script and benchmark directories to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from synthetic import write_text_pdf, letter_page  # noqa: E402
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    def _make(pages: List[str], name: str = "scan.pdf") -> Path:
+        return write_text_pdf(tmp_path / name, pages)
+    return _make
+
+
+@pytest.fixture
+def stub_tool(tmp_path):
+    """Write an executable Python stub standing in for an external tool"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir(exist_ok=True)
+
+    def _stub(name: str, body: str) -> Path:
+        path = bin_dir / name
+        path.write_text(f"#!{sys.executable}\nimport sys, shutil\n{body}\n")
+        path.chmod(0o755)
+        return path
+    return _stub
+
+
+@pytest.fixture
+def scanner(tmp_path, monkeypatch):
+    """The scanner script with its staging paths redirected into tmp_path"""
+    import scan_and_organize
+    staging = tmp_path / "scan-staging"
+    monkeypatch.setattr(scan_and_organize, "STAGING_DIR", staging)
+    monkeypatch.setattr(scan_and_organize, "PENDING_DIR", staging / "pending")
+    monkeypatch.setattr(scan_and_organize, "PAGE_CACHE_DIR", staging / "page-cache")
+    monkeypatch.setattr(scan_and_organize, "OCR_CACHE_DIR", staging / "ocr-cache")
+    monkeypatch.setattr(scan_and_organize, "MANIFEST_FILE", staging / "pending.sqlite")
+    monkeypatch.setattr(scan_and_organize, "FINGERPRINT_FILE", staging / "fingerprints.sqlite")
+    monkeypatch.setattr(scan_and_organize, "LETTERHEAD_FILE", staging / "letterheads.sqlite")
+    monkeypatch.setattr(scan_and_organize, "SPOOL_DIR", staging / "spool")
+    # Drain the write spool in-process instead of in a detached sync
+    monkeypatch.setattr(scan_and_organize.CommandState, "sync_in_background",
+                        lambda self: scan_and_organize.sync_spool(self.preferences()))
+    monkeypatch.setattr(scan_and_organize, "SOCKET_PATH", staging / "scanner.sock")
+    monkeypatch.setattr(scan_and_organize, "TRACE_FILE", staging / "trace.jsonl")
+    monkeypatch.setattr(scan_and_organize, "PROFILE_DIR", staging / "profiles")
+    monkeypatch.setattr(scan_and_organize, "JOBS_DIR", staging / "jobs")
+    monkeypatch.setattr(scan_and_organize, "LOCK_DIR", staging / "locks")
+    monkeypatch.setattr(scan_and_organize, "WATCH_STATUS_FILE", staging / "watch-status.json")
+    monkeypatch.setattr(scan_and_organize, "INGEST_LEDGER", staging / "ingested.sqlite")
+    monkeypatch.setattr(scan_and_organize, "REFRESH_LOCK", staging / "scanner-refresh.lock")
+    monkeypatch.setattr(scan_and_organize, "PREFERENCES_FILE", tmp_path / "preferences.json")
+    return scan_and_organize
+
+
+@pytest.fixture
+def pending(scanner, make_pdf):
+    """Put a PDF of pages into pending as document doc_id"""
+    def _pending(doc_id: str, pages: List[str]) -> Path:
+        scanner.PENDING_DIR.mkdir(parents=True, exist_ok=True)
+        return make_pdf(pages, name=f"{doc_id}.pdf").rename(scanner.PENDING_DIR / f"pending_{doc_id}.pdf")
+    return _pending
@@ -0,0 +1,74 @@
+"""
+Tests for the archive full-text search index
+"""
+import archive_index
+from archive_index import ArchiveIndex, index_path
+
+
+def test_organize_indexes_text_and_search_ranks_it(scanner, pending, tmp_path):
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    pending("a", ["Stadtwerke Winterthur\nStromrechnung Januar 08.01.2026"])
+    pending("b", ["Krankenkasse\nLeistungsabrechnung 03.02.2026\nStromrechnung erwaehnt"])
+
+    first = scanner.organize_document("a", "Stadtwerke", "2026-01-08", "Rechnung", archive)
+    scanner.organize_document("b", "Krankenkasse", "2026-02-03", "Abrechnung", archive)
+    assert scanner.sync_spool()["written"] == 2
+
+    args = scanner.build_parser().parse_args(["search", "stromrechnung", "--output", str(archive)])
+    result = scanner.run_command(args)
+    assert result["total"] == 2
+    assert result["results"][0]["path"] == first["saved_to"]
+    assert "[Stromrechnung]" in result["results"][0]["snippet"]
+
+    filtered = scanner.run_command(scanner.build_parser().parse_args(
+        ["search", "stromrechnung", "--sender", "krankenkasse", "--output", str(archive)]))
+    assert [r["type"] for r in filtered["results"]] == ["Abrechnung"]
+
+
+def test_search_tolerates_query_syntax(tmp_path):
+    with ArchiveIndex(tmp_path / "index.sqlite") as index:
+        assert index.search('"AND (') == {"total": 0, "results": []}
+        assert index.search("Rechnung NEAR(") == {"total": 0, "results": []}
+
+
+def test_reindex_skips_unchanged_files_and_drops_missing(make_pdf, tmp_path):
+    archive = tmp_path / "archive"
+    folder = archive / "2026" / "Muster_AG"
+    folder.mkdir(parents=True)
+    kept = make_pdf(["Muster AG\nMahnung 12.03.2026"], name="k.pdf").rename(folder / "2026-03-12_Muster AG_Mahnung.pdf")
+    gone = make_pdf(["Muster AG\nOfferte"], name="g.pdf").rename(folder / "2026-03-01_Muster AG_Offerte_1.pdf")
+    dates = lambda text: ["2026-03-12"] if "12.03.2026" in text else []
+
+    with ArchiveIndex(index_path(archive)) as index:
+        assert index.reindex(archive, dates, workers=2)["indexed"] == 2
+        hit = index.search("mahnung")["results"][0]
+        assert (hit["sender"], hit["type"], hit["date"]) == ("Muster AG", "Mahnung", "2026-03-12")
+        assert index.search("offerte")["results"][0]["type"] == "Offerte"
+
+        gone.unlink()
+        result = index.reindex(archive, dates)
+        assert (result["indexed"], result["unchanged"], result["removed"], result["total"]) == (0, 1, 1, 1)
+        assert index.search("offerte")["total"] == 0
+
+
+def test_metadata_from_path_handles_missing_date(tmp_path):
+    meta = archive_index.metadata_from_path(tmp_path / "Misc" / "notes.pdf")
+    assert meta == {"sender": "Misc", "doc_type": "", "doc_date": None}
+
+
+def test_reindex_reads_each_archived_file_once(scanner, make_pdf, tmp_path, monkeypatch):
+    archive = tmp_path / "archive"
+    folder = archive / "2026" / "Muster_AG"
+    folder.mkdir(parents=True)
+    for n, doc_type in enumerate(["Mahnung", "Offerte", "Rechnung"]):
+        make_pdf([f"Muster AG\n{doc_type}"], name=f"{n}.pdf").rename(folder / f"2026-03-0{n + 1}_Muster AG_{doc_type}.pdf")
+    reads = []
+    original = archive_index.extract_text
+    monkeypatch.setattr(archive_index, "extract_text", lambda path: reads.append(path) or original(path))
+
+    args = scanner.build_parser().parse_args(["reindex", "--output", str(archive), "--workers", "1"])
+    result = scanner.run_command(args)
+
+    assert (result["indexed"], result["fingerprinted"]) == (3, 3)
+    assert sorted(reads) == sorted(folder.glob("*.pdf"))
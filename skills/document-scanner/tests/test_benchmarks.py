@@ -0,0 +1,101 @@
+"""
+Tests for the benchmark corpus, stub tools and pipeline harness
+"""
+import os
+
+from bench_pipeline import STAGES, compare, run_pipeline
+from bench_boundaries import measure as measure_boundaries
+from bench_memory import legacy_analyze_and_split
+from bench_preview import measure as measure_previews
+from bench_letterheads import measure as measure_letterheads
+from bench_startup import measure as measure_startup
+from bench_output import measure as measure_output
+from synthetic import duplex_stack, letter_stack
+
+
+def test_duplex_stack_has_blank_backs_and_two_sided_letters():
+    fronts, backs = duplex_stack(40)
+
+    assert len(fronts) == len(backs) == 20
+    assert all(fronts)
+    assert "" in backs
+    assert any(backs)
+    assert any("Seite" in text for text in fronts) and any("Page" in text for text in fronts)
+
+
+def test_pipeline_runs_offline_on_stub_tools(scanner, tmp_path, monkeypatch):
+    # run_pipeline rewires PATH and the scanner's staging paths; restore them afterwards
+    monkeypatch.setenv("PATH", os.environ["PATH"])
+    for name in ("SYNTHETIC_SCAN_PAGES", "SYNTHETIC_SCAN_SEED", "SYNTHETIC_SCAN_DPI"):
+        monkeypatch.delenv(name, raising=False)
+
+    result = run_pipeline(20, tmp_path / "run")
+
+    assert set(result['stages']) == set(STAGES)
+    assert result['documents'] > 1
+    assert result['organized'] == result['written'] == result['documents']
+    # Blank backs were pruned before OCR
+    assert result['merged_pages'] < 20
+    assert len(list((tmp_path / "run" / "archive").rglob("*.pdf"))) == result['documents']
+
+
+def test_compare_flags_slower_stages():
+    baseline = {"results": [{"pages": 10, "stages": {"merge_duplex": 1.0, "analyze_and_split": 1.0}}]}
+    results = [{"pages": 10, "stages": {"merge_duplex": 1.1, "analyze_and_split": 2.0}},
+               {"pages": 50, "stages": {"merge_duplex": 9.0}}]
+
+    assert compare(results, baseline, tolerance=0.25) == ["10 pages analyze_and_split: 1.0000s -> 2.0000s"]
+
+
+def test_streaming_split_matches_the_in_memory_split(scanner, make_pdf):
+    # Two-page letters: the legacy even-page rule and boundary scoring agree on them
+    pdf = make_pdf(letter_stack(30, pages_per_letter=2, body_lines=5))
+
+    legacy = legacy_analyze_and_split(pdf)
+    streaming = scanner.analyze_and_split(pdf)
+
+    assert [d['pages'] for d in streaming] == [d['pages'] for d in legacy]
+    assert [d['dates'] for d in streaming] == [d['dates'] for d in legacy]
+
+
+def test_boundary_benchmark_scores_both_methods():
+    result = measure_boundaries(40, seed=1, repeat=1)
+
+    methods = result['methods']
+    assert set(methods) == {"legacy", "boundaries", "boundaries_python"}
+    assert methods['boundaries']['f1'] > methods['legacy']['f1']
+    assert methods['boundaries']['exact_documents'] == methods['boundaries_python']['exact_documents']
+
+
+def test_preview_benchmark_compares_with_truncation():
+    result = measure_previews(20, [100], seed=1)
+
+    methods = result['methods']
+    assert set(methods) == {"save_pending_2000", "list_pending_1000", "preview_100_tokens"}
+    assert methods['preview_100_tokens']['mean_chars'] <= 400
+    assert methods['preview_100_tokens']['fact_recall'] >= methods['save_pending_2000']['fact_recall']
+
+
+def test_letterhead_benchmark_replays_a_sender_stream():
+    result = measure_letterheads(150, senders=10, seed=1)
+
+    assert result['auto_organized'] + result['agent_round_trips'] == 150
+    assert result['auto_organized'] > 0 and result['auto_precision'] == 1.0
+    assert result['letterheads'] <= result['agent_round_trips']
+
+
+def test_startup_benchmark_runs_light_commands_without_the_pdf_stack():
+    results = {r['command']: r for r in measure_startup(["list-scanners", "organize"], repeat=1)}
+
+    assert results['list-scanners']['status'] == "ok"
+    assert results['organize']['status'] == "organized"
+    assert all(r['pdf_stack'] == [] and r['import_ms'] > 0 for r in results.values())
+
+
+def test_output_benchmark_reports_compression_and_time():
+    result = measure_output(2, pages=2, dpi=150, max_page_kb=20)
+
+    assert result['pages'] == 4 and result['ratio'] > 1.2
+    assert result['bytes_after'] < result['bytes_before'] and result['transfer_seconds_saved'] > 0
+    # 150 dpi is below the min_dpi floor, so text pages stay over the budget
+    assert result['pages_downsampled'] == 0 and result['pages_over_budget'] >= 1 and result['seconds'] > 0
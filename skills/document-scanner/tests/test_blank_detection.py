@@ -0,0 +1,71 @@
+"""
+Tests for raster blank detection and pre-OCR pruning
+"""
+import os
+
+from PyPDF2 import PdfReader
+
+import blank_detection
+from synthetic import scan_bitmap, text_bitmap, write_image_pdf
+
+
+def test_ink_coverage_separates_blank_from_inked(tmp_path):
+    pdf = write_image_pdf(tmp_path / "scan.pdf", [scan_bitmap(True, seed=1), scan_bitmap(False, seed=2)])
+    inked, blank = PdfReader(pdf).pages
+
+    assert blank_detection.is_blank_raster(inked) is False
+    assert blank_detection.is_blank_raster(blank) is True
+
+
+def test_text_layer_keeps_a_faint_page(tmp_path):
+    text = "Sehr geehrte Damen und Herren, anbei die Rechnung Nummer 4711."
+    pdf = write_image_pdf(tmp_path / "scan.pdf", [scan_bitmap(False, seed=2)] * 2, [text, "Seite 2"])
+    faint, blank = PdfReader(pdf).pages
+
+    assert blank_detection.is_blank_raster(faint) is False
+    assert blank_detection.is_blank_raster(blank) is True
+
+
+def test_margin_crop_ignores_edge_shadow():
+    darkness = scan_bitmap(False, seed=3).astype(float)
+    settings = dict(blank_detection.DEFAULT_BLANK_SETTINGS)
+
+    assert blank_detection.ink_coverage(darkness, settings) == 0.0
+    settings['margin'] = 0.0
+    assert blank_detection.ink_coverage(darkness, settings) > settings['ink_threshold']
+
+
+def test_text_only_page_is_not_measured(make_pdf):
+    pdf = make_pdf(["Seite 1 von 1"])
+    assert blank_detection.is_blank_raster(PdfReader(pdf).pages[0]) is None
+
+
+def test_merge_duplex_prunes_blank_backs_before_ocr(scanner, tmp_path, monkeypatch, stub_tool):
+    fronts = [scan_bitmap(True, seed=n) for n in range(4)]
+    # Back side is scanned in reverse; sheets 0 and 2 are single-sided
+    backs = [scan_bitmap(n % 2 == 1, seed=10 + n) for n in range(4)][::-1]
+    front_pdf = write_image_pdf(tmp_path / "front.pdf", fronts)
+    back_pdf = write_image_pdf(tmp_path / "back.pdf", backs)
+
+    # Stub ocrmypdf: copy input to output so we can see what reached OCR
+    stub = stub_tool("ocrmypdf", "shutil.copy(sys.argv[-2], sys.argv[-1])")
+    monkeypatch.setenv("PATH", f"{stub.parent}{os.pathsep}{os.environ['PATH']}")
+
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    result = scanner.merge_duplex(front_pdf, back_pdf, staging)
+
+    assert result.name == "merged-scan-ocr.pdf"
+    assert len(PdfReader(result).pages) == 6
+
+
+def test_group4_pages_are_measured_without_pillow(tmp_path, monkeypatch):
+    from output_optimizer import optimize_document
+    pdf = write_image_pdf(tmp_path / "scan.pdf", [text_bitmap(seed=1), scan_bitmap(False, seed=2)])
+    optimize_document(pdf)
+    monkeypatch.setattr(blank_detection, "Image", None)
+    inked, blank = PdfReader(pdf).pages
+
+    assert all(page['/Resources']['/XObject']['/Im0']['/Filter'] == '/CCITTFaxDecode' for page in (inked, blank))
+    assert blank_detection.is_blank_raster(inked) is False
+    assert blank_detection.is_blank_raster(blank) is True
@@ -0,0 +1,63 @@
+"""
+Tests for boundary scoring: shingle signatures, adjacent similarity, split points
+"""
+import pytest
+
+import boundaries
+from boundaries import adjacent_similarity, shingle_signature, split_points
+from page_analysis import PageFeatures, analyze_page_format
+from synthetic import letter_stack, mixed_stack
+
+
+def features_of(texts):
+    features = []
+    for index, text in enumerate(texts):
+        analysis = analyze_page_format(None, text)
+        analysis['index'] = index
+        features.append(PageFeatures.from_analysis(analysis))
+    return features
+
+
+def test_signature_ignores_page_numbers_and_folds_digits():
+    first = shingle_signature("Muster AG, Rechnung vom 08.01.2026\nSeite 1 von 3")
+    second = shingle_signature("Muster AG, Rechnung vom 17.12.2025\nSeite 2 von 3")
+
+    assert first == second
+    assert shingle_signature("Seite 1 von 3") == ""
+    assert shingle_signature("Beispiel GmbH") != shingle_signature("Muster AG")
+
+
+def test_numpy_and_python_similarity_agree(monkeypatch):
+    signatures = [shingle_signature(text) for text in
+                  ("Muster AG Bahnhofstrasse", "Muster AG Seestrasse", "", "Beispiel GmbH", "Beispiel GmbH")]
+
+    vectorized = adjacent_similarity(signatures, unknown=0.5)
+    monkeypatch.setattr(boundaries, "np", None)
+    python = adjacent_similarity(signatures, unknown=0.5)
+
+    assert vectorized == pytest.approx(python)
+    assert vectorized[0] == 0.0 and vectorized[2] == vectorized[3] == 0.5 and vectorized[4] == 1.0
+
+
+def test_three_page_letters_split_on_odd_pages(scanner, make_pdf):
+    pdf = make_pdf(letter_stack(9, pages_per_letter=3, body_lines=5))
+
+    documents = scanner.analyze_and_split(pdf)
+
+    assert [d['pages'] for d in documents] == [[0, 1, 2], [3, 4, 5], [6, 7, 8]]
+
+
+def test_mixed_stack_splits_at_every_document():
+    pages, starts = mixed_stack(60, seed=2)
+
+    assert split_points(features_of(pages)) == starts
+
+
+def test_declared_pages_keep_an_unlike_page_in_the_document():
+    pages = [
+        "Muster AG\nBahnhofstrasse 1\nSehr geehrte Damen und Herren\nSeite 1 von 2",
+        "Anhang: Tabelle der Positionen\nPosition 1\nPosition 2",
+        "Beispiel GmbH\nSeestrasse 2\nSehr geehrte Frau Beispiel\nSeite 1 von 1",
+    ]
+
+    assert split_points(features_of(pages)) == [0, 2]
@@ -0,0 +1,61 @@
+"""
+Tests for the single-pass bulk split writer
+"""
+import PyPDF2
+from PyPDF2 import PdfReader
+
+import bulk_split
+import page_analysis
+from conftest import letter_page
+from synthetic import scan_bitmap, write_image_pdf
+
+
+def test_concurrent_writes_match_serial_output(tmp_path, make_pdf):
+    pdf = make_pdf([letter_page(n % 2 + 1, 2, sender=f"Absender {n // 2}") for n in range(12)])
+    reader = PdfReader(pdf)
+    groups = [[0, 1], [2, 3, 4], [5], [6, 7, 8, 9, 10, 11]]
+
+    serial = [tmp_path / f"serial-{n}.pdf" for n in range(4)]
+    parallel = [tmp_path / f"parallel-{n}.pdf" for n in range(4)]
+    bulk_split.write_documents(reader, groups, serial, workers=1)
+    reports = bulk_split.write_documents(reader, groups, parallel, workers=4)
+
+    for a, b in zip(serial, parallel):
+        assert a.read_bytes() == b.read_bytes()
+    assert [r["pages"] for r in reports] == [2, 3, 1, 6]
+    assert all(r["bytes_written"] == p.stat().st_size for r, p in zip(reports, parallel))
+
+
+def test_identical_streams_are_stored_once(tmp_path):
+    logo = scan_bitmap(True, dpi=40, seed=7)
+    pdf = write_image_pdf(tmp_path / "scan.pdf", [logo, logo, logo])
+
+    report, = bulk_split.write_documents(PdfReader(pdf), [[0, 1, 2]], [tmp_path / "out.pdf"])
+
+    assert report["deduplicated_bytes"] > 0
+    assert report["bytes_written"] < pdf.stat().st_size / 2
+    out = PdfReader(tmp_path / "out.pdf")
+    images = [page['/Resources']['/XObject']['/Im0'].get_data() for page in out.pages]
+    assert len(out.pages) == 3 and len(set(images)) == 1
+
+
+def test_save_pending_reuses_the_analysis_parse(scanner, make_pdf, monkeypatch):
+    pdf = make_pdf([letter_page(1, 2), "", letter_page(2, 2), letter_page(1, 1, sender="Beispiel GmbH")])
+    opened = []
+    original = PyPDF2.PdfReader
+
+    def counting(*args, **kwargs):
+        opened.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(PyPDF2, "PdfReader", counting)
+    monkeypatch.setattr(page_analysis, "_page_cache", {})
+    monkeypatch.setattr(page_analysis, "_page_counts", {})
+    monkeypatch.setattr(page_analysis, "_readers", {})
+
+    documents = scanner.analyze_and_split(pdf)
+    pending = scanner.save_pending_documents(pdf, documents)
+
+    assert len(opened) == 1
+    assert [p["pages"] for p in pending] == [2, 1]
+    assert all(p["bytes_written"] > 0 and p["write_seconds"] >= 0 for p in pending)
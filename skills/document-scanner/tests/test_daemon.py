@@ -0,0 +1,141 @@
+"""
+Tests for serve mode: JSON-RPC daemon, warm state and scanner queue
+"""
+import json
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import daemon
+from conftest import letter_page
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to ~100 characters, tmp_path is too deep
+    directory = Path(tempfile.mkdtemp(prefix="scand", dir="/tmp"))
+    yield directory / "scanner.sock"
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def _start(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_client_output_matches_local_run(scanner, make_pdf, socket_path, monkeypatch, capsys):
+    pdf = make_pdf([letter_page(1, 1), letter_page(1, 2, sender="B AG"), letter_page(2, 2, sender="B AG")])
+    scanner.save_pending_documents(pdf, scanner.analyze_and_split(pdf))
+    monkeypatch.setattr(scanner, "SOCKET_PATH", socket_path)
+
+    monkeypatch.setattr("sys.argv", ["scan_and_organize.py", "list-pending", "--limit", "1"])
+    scanner.main()
+    local = capsys.readouterr().out
+
+    server_thread = threading.Thread(target=scanner.serve, daemon=True)
+    server_thread.start()
+    for _ in range(100):
+        if daemon.daemon_available(socket_path):
+            break
+        time.sleep(0.02)
+
+    scanner.main()
+    assert capsys.readouterr().out == local
+    assert len(json.loads(local)["pending"]) == 1
+
+    daemon.request(socket_path, "shutdown")
+    server_thread.join(timeout=5)
+    assert not socket_path.exists()
+
+
+def test_warm_state_discovers_scanners_once(scanner, monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(scanner, "detect_scanners", lambda: calls.append(1) or ["Fake Scanner"])
+    monkeypatch.setattr(scanner, "PREFERENCES_FILE", tmp_path / "preferences.json")
+    state = scanner.WarmState()
+
+    for mode in ["setup-check", "list-scanners", "setup-check"]:
+        scanner.run_command(scanner.build_parser().parse_args([mode]), state)
+    assert len(calls) == 1
+
+    state.scanners(refresh=True)
+    assert len(calls) == 2
+
+
+def test_warm_state_reloads_changed_preferences(scanner, monkeypatch, tmp_path):
+    prefs = tmp_path / "preferences.json"
+    prefs.write_text(json.dumps({"setup_complete": False}))
+    monkeypatch.setattr(scanner, "PREFERENCES_FILE", prefs)
+    state = scanner.WarmState()
+    assert state.preferences()["setup_complete"] is False
+
+    prefs.write_text(json.dumps({"setup_complete": True, "default_scanner": "X"}))
+    assert state.preferences()["default_scanner"] == "X"
+
+
+def test_scanner_commands_are_serialized(socket_path):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def handler(method, params):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.1)
+        with lock:
+            active[0] -= 1
+        return {"status": "ok", "method": method}
+
+    server = daemon.ScannerDaemon(socket_path, handler, ["single", "list-pending"], ["single"])
+    _start(server)
+    results = []
+    clients = [
+        threading.Thread(target=lambda: results.append(daemon.request(socket_path, "single")))
+        for _ in range(3)
+    ]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    assert peak[0] == 1 and len(results) == 3
+
+    # Non-scanner commands bypass the queue
+    started = time.monotonic()
+    scan = threading.Thread(target=lambda: daemon.request(socket_path, "single"))
+    scan.start()
+    time.sleep(0.02)
+    assert daemon.request(socket_path, "list-pending")["method"] == "list-pending"
+    scan.join()
+    assert time.monotonic() - started < 0.35
+
+    assert daemon.request(socket_path, "bogus")["error"] == "daemon_failed"
+    assert daemon.request(socket_path, "ping")["status"] == "ok"
+    server.shutdown()
+    server.server_close()
+
+
+def test_request_without_daemon_raises(socket_path):
+    with pytest.raises(daemon.DaemonUnavailable):
+        daemon.request(socket_path, "ping")
+
+
+def test_client_resolves_paths_against_its_own_cwd(scanner, tmp_path, monkeypatch, capsys):
+    sent = []
+    monkeypatch.setattr(scanner, "daemon_request", lambda socket, mode, params: sent.append(params) or {})
+    monkeypatch.chdir(tmp_path)
+
+    monkeypatch.setattr("sys.argv", ["scan_and_organize.py", "back", "--front-pdf", "front.pdf",
+                                     "--output", "~/Archiv", "--folder", "inbox"])
+    scanner.main()
+    monkeypatch.setattr("sys.argv", ["scan_and_organize.py", "organize-batch", "--batch", "docs.json"])
+    scanner.main()
+
+    assert sent[0]["front_pdf"] == str(tmp_path / "front.pdf")
+    assert sent[0]["output"] == str(Path("~/Archiv").expanduser())
+    assert sent[0]["folder"] == str(tmp_path / "inbox")
+    assert sent[1]["batch"] == str(tmp_path / "docs.json")
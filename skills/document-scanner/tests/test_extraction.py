@@ -0,0 +1,87 @@
+"""
+Tests for the compiled date and page-indicator extraction
+"""
+from datetime import datetime
+
+import pytest
+
+import extraction
+from extraction import extract_dates, extract_page_indicator, find_dates, parse_date
+
+# (as written, parsed) - every format organize and list-pending rely on
+DATES = [
+    ("08.01.2026", datetime(2026, 1, 8)),
+    ("8.1.2026", datetime(2026, 1, 8)),
+    ("31.12.25", datetime(2025, 12, 31)),
+    ("01.02.99", datetime(1999, 2, 1)),
+    ("2026-01-15", datetime(2026, 1, 15)),
+    ("2026-1-5", datetime(2026, 1, 5)),
+    ("January 2026", datetime(2026, 1, 1)),
+    ("February 2026", datetime(2026, 2, 1)),
+    ("Sept. 2025", datetime(2025, 9, 1)),
+    ("Dec 2025", datetime(2025, 12, 1)),
+    ("Januar 2026", datetime(2026, 1, 1)),
+    ("März 2026", datetime(2026, 3, 1)),
+    ("Mai 2026", datetime(2026, 5, 1)),
+    ("Oktober 2025", datetime(2025, 10, 1)),
+    ("8. Januar 2026", datetime(2026, 1, 8)),
+    ("15. März 2026", datetime(2026, 3, 15)),
+    ("1. Dezember 2025", datetime(2025, 12, 1)),
+    ("3 June 2026", datetime(2026, 6, 3)),
+]
+
+
+@pytest.mark.parametrize("written, expected", DATES)
+def test_parse_date(written, expected):
+    assert parse_date(written) == expected
+
+
+@pytest.mark.parametrize("written, expected", DATES)
+def test_extracted_from_running_text(written, expected):
+    text = f"Muster AG\nBetrifft Ihre Bestellung vom {written}, bitte beachten Sie die Frist.\n"
+    found = find_dates(text)
+    assert [(c.text, c.date) for c in found] == [(written, expected)]
+
+
+@pytest.mark.parametrize("text", [
+    "31.02.2026", "2026-13-01", "Version 1.2.3", "Mailbox 2026", "Email 2026",
+    "Tel. 052 123 45 67", "IBAN CH93 0076 2011 6238 5295 7", "Bestellung 12.500.00",
+])
+def test_not_dates(text):
+    assert extract_dates(text) == []
+    assert parse_date(text) is None
+
+
+def test_letterhead_date_ranked_first():
+    body = "Wir beziehen uns auf Ihr Schreiben vom 02.12.2025.\n" * 5
+    text = "Muster AG\n8400 Winterthur\nWinterthur, 8. Januar 2026\n" + body + "Gedruckt 2026-01-09"
+
+    dates = extract_dates(text)
+
+    assert dates == ["8. Januar 2026", "02.12.2025", "2026-01-09"]
+
+
+def test_duplicates_reported_once():
+    assert extract_dates("08.01.2026 und 08.01.2026") == ["08.01.2026"]
+
+
+def test_parse_date_memoized():
+    extraction.parse_date.cache_clear()
+    parse_date("08.01.2026")
+    parse_date("08.01.2026")
+    assert extraction.parse_date.cache_info().hits == 1
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Rechnung\nSeite 2 von 5", (2, 5)),
+    ("Invoice\nPage 3 of 4", (3, 4)),
+    ("Beilage 1/3", (1, 3)),
+    ("Beilage 1 / 3", (1, 3)),
+    ("Seite 1 von 2\nBeilage 2/3", (2, 3)),
+    ("Seite 1 von 2\nPage 4 of 9", (4, 9)),
+    ("seite 1 von 2", (1, 2)),
+    ("Winterthur, 08.01.2026", (None, None)),
+    ("", (None, None)),
+])
+def test_page_indicator(text, expected):
+    assert extract_page_indicator(text) == expected
@@ -0,0 +1,117 @@
+"""
+Tests for duplicate fingerprints and index-based filename allocation
+"""
+import random
+import sqlite3
+
+import fingerprints
+from fingerprints import FingerprintIndex
+from page_analysis import file_hash
+
+
+def _text(seed, words=400):
+    rng = random.Random(seed)
+    return " ".join(f"wort{rng.randrange(5000)}" for _ in range(words))
+
+
+def _rescan(text, errors=4):
+    words = text.split()
+    for n in range(errors):
+        words[n * 97 % len(words)] = "ocrfehler"
+    return " ".join(words)
+
+
+def test_minhash_separates_rescans_from_other_letters():
+    letter = _text(1)
+    assert fingerprints.similarity(fingerprints.minhash(letter), fingerprints.minhash(_rescan(letter))) >= 0.8
+    assert fingerprints.similarity(fingerprints.minhash(letter), fingerprints.minhash(_text(2))) < 0.2
+
+
+def _lines(text):
+    words = text.split()
+    return "\n".join(" ".join(words[i:i + 12]) for i in range(0, len(words), 12))
+
+
+def test_organize_reports_duplicates_and_names_from_the_index(scanner, pending, tmp_path):
+    archive = tmp_path / "archive"
+    letter = _text(3)
+    pending("a", [_lines(letter)])
+    pending("b", [_lines(letter)])
+    pending("c", [_lines(_rescan(letter))])
+    pending("d", [_lines(_text(4))])
+
+    first = scanner.organize_document("a", "Muster AG", "2026-01-08", "Rechnung", archive)
+    second = scanner.organize_document("b", "Muster AG", "2026-01-08", "Rechnung", archive)
+    third = scanner.organize_document("c", "Muster AG", "2026-01-08", "Rechnung", archive)
+    other = scanner.organize_document("d", "Muster AG", "2026-01-08", "Rechnung", archive)
+
+    assert first["duplicates"] == []
+    assert second["saved_to"].endswith("2026-01-08_Muster AG_Rechnung_1.pdf")
+    assert second["duplicates"] == [{"path": first["saved_to"], "match": "exact", "similarity": 1.0}]
+    assert {d["path"] for d in third["duplicates"]} == {first["saved_to"], second["saved_to"]}
+    assert all(d["match"] == "near" for d in third["duplicates"])
+    assert other["duplicates"] == []
+    assert other["saved_to"].endswith("_Rechnung_3.pdf")
+
+
+def test_stale_index_falls_back_to_the_folder(scanner, make_pdf, pending, tmp_path):
+    folder = tmp_path / "archive" / "2026" / "Muster_AG"
+    folder.mkdir(parents=True)
+    make_pdf(["Von Hand abgelegt"], name="x.pdf").rename(folder / "2026-01-08_Muster AG_Rechnung.pdf")
+    pending("a", [_lines(_text(5))])
+
+    result = scanner.organize_document("a", "Muster AG", "2026-01-08", "Rechnung", tmp_path / "archive")
+    assert result["saved_to"].endswith("_Rechnung_1.pdf")
+    assert (folder / "2026-01-08_Muster AG_Rechnung.pdf").exists()
+
+
+def test_sync_rebuilds_from_the_archive(make_pdf, tmp_path):
+    folder = tmp_path / "archive" / "2026" / "Muster_AG"
+    folder.mkdir(parents=True)
+    text = _lines(_text(6))
+    kept = make_pdf([text], name="k.pdf").rename(folder / "2026-02-01_Muster AG_Brief.pdf")
+    gone = make_pdf(["Offerte Nummer 1"], name="g.pdf").rename(folder / "2026-02-02_Muster AG_Offerte.pdf")
+
+    with FingerprintIndex(tmp_path / "fingerprints.sqlite") as index:
+        assert index.sync(tmp_path / "archive", workers=2) == {"fingerprinted": 2, "removed": 0, "failed": 0}
+        assert index.next_free_name(folder, "2026-02-01_Muster AG_Brief").name == "2026-02-01_Muster AG_Brief_1.pdf"
+        assert [d["path"] for d in index.duplicates("", text)] == [str(kept)]
+
+        gone.unlink()
+        assert index.sync(tmp_path / "archive") == {"fingerprinted": 0, "removed": 1, "failed": 0}
+        assert index.count() == 1
+
+
+def test_textless_documents_only_match_the_same_file(scanner, pending, tmp_path):
+    archive = tmp_path / "archive"
+    blank_hash = file_hash(pending("a", [""]))
+    pending("b", ["", " 1 2 "])
+
+    first = scanner.organize_document("a", "Muster AG", "2026-01-08", "Foto", archive)
+    second = scanner.organize_document("b", "Muster AG", "2026-01-09", "Foto", archive)
+
+    assert first["duplicates"] == [] and second["duplicates"] == []
+    with FingerprintIndex(scanner.FINGERPRINT_FILE) as index:
+        assert index.duplicates("other", "") == []
+        assert index.duplicates(blank_hash, "") == [{"path": first["saved_to"], "match": "exact", "similarity": 1.0}]
+        assert index.conn.execute("SELECT COUNT(*) FROM bands").fetchone()[0] == 0
+
+
+def test_old_indexes_stop_matching_textless_documents(tmp_path):
+    db = tmp_path / "fingerprints.sqlite"
+    old_schema = fingerprints.SCHEMA.replace("text_hash TEXT,", "text_hash TEXT NOT NULL,").replace(
+        "signature BLOB,", "signature BLOB NOT NULL,")
+    conn = sqlite3.connect(str(db))
+    conn.executescript(old_schema)
+    signature = fingerprints._pack([0] * fingerprints.PERMUTATIONS)
+    for path, text in (("/a.pdf", fingerprints.EMPTY_TEXT_HASH), ("/b.pdf", "f" * 64)):
+        conn.execute("INSERT INTO fingerprints VALUES (?, '/', ?, ?, ?, ?, 0, 0)", (path, path[1:], path, text, signature))
+        conn.execute("INSERT INTO bands VALUES (1, ?)", (path,))
+    conn.commit()
+    conn.close()
+
+    with FingerprintIndex(db) as index:
+        assert index.duplicates("other", "") == []
+        assert index.count() == 2
+        assert [row[0] for row in index.conn.execute("SELECT path FROM bands")] == ["/b.pdf"]
+        assert [row[0] for row in index.conn.execute("SELECT text_hash FROM fingerprints ORDER BY path")] == [None, "f" * 64]
@@ -0,0 +1,182 @@
+"""
+Tests for the hot-folder watcher: complete writes, dedup, backpressure, status
+"""
+import sys
+import json
+import threading
+import time
+
+import pytest
+
+from synthetic import letter_stack, write_text_pdf
+from hot_folder import DEFAULT_WATCH_SETTINGS, HotFolder, IngestLedger, read_status
+from jobs import ScanJob
+
+FAST = dict(DEFAULT_WATCH_SETTINGS, settle_seconds=0.05, poll_interval=0.02, rescan_interval=0.5)
+
+
+@pytest.fixture
+def folder(tmp_path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    return inbox
+
+
+def make_hot_folder(tmp_path, folder, ingest, backend='polling', **settings):
+    return HotFolder(folder, ingest, tmp_path / "ingested.sqlite", tmp_path / "status.json",
+                     dict(FAST, **settings), backend)
+
+
+def step_until(hot_folder, condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        hot_folder.step()
+
+
+def recorder():
+    ingested = []
+
+    def ingest(path, sha256):
+        ingested.append(path.name)
+        return {"status": "needs_identification", "documents": [{}, {}], "job": path.stem}
+
+    return ingested, ingest
+
+
+def test_waits_until_the_file_is_written(tmp_path, folder):
+    ingested, ingest = recorder()
+    hot_folder = make_hot_folder(tmp_path, folder, ingest)
+    scan = folder / "scan.pdf"
+    scan.write_bytes(b"%PDF-1.4\n")
+    (folder / ".partial.pdf").write_bytes(b"%PDF-1.4\n%%EOF")
+    (folder / "notes.txt").write_bytes(b"%%EOF")
+
+    for _ in range(10):
+        hot_folder.step()
+    assert ingested == []
+    assert hot_folder.status()['queue']['settling'] == 1
+
+    with open(scan, 'ab') as f:
+        f.write(b"1 0 obj\n%%EOF\n")
+    step_until(hot_folder, lambda: hot_folder.counts['ingested'] == 1)
+    hot_folder.close()
+
+    assert ingested == ["scan.pdf"]
+
+
+def test_same_content_is_ingested_once(tmp_path, folder):
+    ingested, ingest = recorder()
+    write_text_pdf(folder / "a.pdf", letter_stack(2))
+    (folder / "copy.pdf").write_bytes((folder / "a.pdf").read_bytes())
+
+    hot_folder = make_hot_folder(tmp_path, folder, ingest)
+    step_until(hot_folder, lambda: hot_folder.counts['ingested'] + hot_folder.counts['duplicates'] == 2)
+    hot_folder.close()
+
+    restarted = make_hot_folder(tmp_path, folder, ingest)
+    step_until(restarted, lambda: restarted.counts['duplicates'] == 2)
+    restarted.close()
+
+    assert len(ingested) == 1
+
+
+def test_backpressure_holds_files_in_the_backlog(tmp_path, folder):
+    release = threading.Event()
+    active = []
+
+    def ingest(path, sha256):
+        active.append(path.name)
+        release.wait()
+        return {"status": "needs_identification", "documents": []}
+
+    for n in range(6):
+        write_text_pdf(folder / f"scan{n}.pdf", [f"Brief {n}"])
+    hot_folder = make_hot_folder(tmp_path, folder, ingest, workers=1, queue_size=1)
+    step_until(hot_folder, lambda: hot_folder.status()['queue']['backlog'] == 4)
+
+    queue = json.loads((tmp_path / "status.json").read_text())['queue']
+    assert queue == {"settling": 0, "backlog": 4, "queued": 1, "active": 1, "capacity": 2}
+    assert len(active) == 1
+
+    release.set()
+    step_until(hot_folder, lambda: hot_folder.counts['ingested'] == 6)
+    status = hot_folder.status()
+    hot_folder.close()
+
+    assert status['queue']['backlog'] == 0 and status['files_per_minute'] > 0
+
+
+def test_interrupted_ingest_is_retried(tmp_path, folder):
+    ingested, ingest = recorder()
+    scan = write_text_pdf(folder / "scan.pdf", letter_stack(2))
+    with IngestLedger(tmp_path / "ingested.sqlite") as ledger:
+        ledger.start("abc", scan, scan.stat().st_size)
+
+    hot_folder = make_hot_folder(tmp_path, folder, ingest)
+    step_until(hot_folder, lambda: hot_folder.counts['ingested'] == 1)
+    hot_folder.close()
+
+    assert ingested == ["scan.pdf"]
+    assert read_status(tmp_path / "status.json", tmp_path / "ingested.sqlite")['totals'] == {"done": 1}
+
+
+def test_failed_ingest_is_retried_then_given_up(tmp_path, folder):
+    attempts = []
+
+    def ingest(path, sha256):
+        attempts.append(path.name)
+        if path.name == "flaky.pdf" and attempts.count("flaky.pdf") > 1:
+            return {"status": "needs_identification", "documents": [{}]}
+        return {"status": "error", "error": "ocr_failed", "message": "ocrmypdf crashed"}
+
+    write_text_pdf(folder / "flaky.pdf", ["Brief 1"])
+    write_text_pdf(folder / "broken.pdf", ["Brief 2"])
+    hot_folder = make_hot_folder(tmp_path, folder, ingest, max_attempts=2)
+    step_until(hot_folder, lambda: hot_folder.counts['failed'] == 3 and hot_folder.counts['ingested'] == 1)
+    hot_folder.close()
+
+    restarted = make_hot_folder(tmp_path, folder, ingest, max_attempts=2)
+    step_until(restarted, lambda: restarted.counts['duplicates'] == 2)
+    restarted.close()
+
+    assert sorted(attempts) == ["broken.pdf", "broken.pdf", "flaky.pdf", "flaky.pdf"]
+    status = read_status(tmp_path / "status.json", tmp_path / "ingested.sqlite", dict(FAST, max_attempts=2))
+    assert status['totals'] == {"done": 1, "failed": 1}
+    assert [(f['path'], f['error'], f['attempts']) for f in status['given_up']] == [
+        (str(folder / "broken.pdf"), "ocrmypdf crashed", 2)]
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="inotify is Linux only")
+def test_inotify_backend_sees_moved_in_files(tmp_path, folder):
+    ingested, ingest = recorder()
+    hot_folder = make_hot_folder(tmp_path, folder, ingest, backend='inotify', rescan_interval=60)
+    assert hot_folder.backend == 'inotify'
+    hot_folder.step()
+
+    source = write_text_pdf(tmp_path / "upload.pdf", letter_stack(2))
+    source.rename(folder / "scan.pdf")
+    step_until(hot_folder, lambda: hot_folder.counts['ingested'] == 1)
+    hot_folder.close()
+
+    assert ingested == ["scan.pdf"]
+
+
+def test_watch_ingests_into_pending(scanner, tmp_path, folder, monkeypatch):
+    monkeypatch.setattr("hot_folder.DEFAULT_WATCH_SETTINGS", FAST)
+    write_text_pdf(folder / "scan.pdf", letter_stack(6))
+    ledger = scanner.INGEST_LEDGER
+
+    def ingested():
+        if not ledger.exists():
+            return False
+        with IngestLedger(ledger) as entries:
+            return entries.totals().get('done') == 1
+
+    result = scanner.watch(str(folder), stop=ingested)
+
+    assert result['status'] == "ok" and result['ingested'] == 1
+    assert result['documents'] == 3 == len(list(scanner.PENDING_DIR.glob("*.pdf")))
+    status = scanner.run_command(scanner.build_parser().parse_args(["watch", "--status"]))
+    assert status['totals'] == {"done": 1} and status['last']['path'] == str(folder / "scan.pdf")
+    assert ScanJob.load(scanner.JOBS_DIR, status['last']['job']).mode == "ingest"
@@ -0,0 +1,142 @@
+"""
+Tests for checkpointed scan jobs and resume
+"""
+import os
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from synthetic import letter_stack, write_text_pdf
+from jobs import DEFAULT_JOB_SETTINGS, ScanJob
+
+FAKE_SCANLINE = """
+from pathlib import Path
+args = sys.argv[1:]
+if '-list' in args:
+    print('* Fake Scanner')
+    sys.exit(0)
+open({calls!r}, 'a').write(args[-1] + '\\n')
+out = Path(args[args.index('-dir') + 1]) / args[-1]
+out.mkdir(parents=True, exist_ok=True)
+shutil.copy({source!r}, out / 'scan.pdf')
+"""
+
+
+@pytest.fixture
+def tools(scanner, tmp_path, stub_tool, monkeypatch):
+    """Fake scanline copying a text PDF, and an ocrmypdf that copies; both count their calls"""
+    source = write_text_pdf(tmp_path / "source.pdf", letter_stack(6))
+    calls = tmp_path / "calls"
+    stub_tool("scanline", FAKE_SCANLINE.format(calls=str(calls), source=str(source)))
+    stub_tool("ocrmypdf", f"open({str(calls)!r}, 'a').write('ocr\\n')\nshutil.copy(sys.argv[-2], sys.argv[-1])")
+    monkeypatch.setenv("PATH", f"{tmp_path / 'bin'}{os.pathsep}{os.environ['PATH']}")
+    scanner.PREFERENCES_FILE.write_text(json.dumps({
+        "setup_complete": True, "default_scanner": "Fake Scanner", "default_output": str(tmp_path / "out")
+    }))
+    return lambda: calls.read_text().split() if calls.exists() else []
+
+
+def run(scanner, *argv):
+    return scanner.run_command(scanner.build_parser().parse_args(list(argv)))
+
+
+def crash_once(monkeypatch, module, name):
+    """Make module.name raise on its next call only"""
+    original = getattr(module, name)
+    calls = []
+
+    def crashing(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError("killed")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(module, name, crashing)
+    return calls
+
+
+def test_resume_continues_after_the_scan(scanner, tools, monkeypatch):
+    analyzed = crash_once(monkeypatch, scanner, "analyze_and_split")
+
+    failed = run(scanner, "single")
+    assert failed['status'] == "error" and failed['job']
+    job = ScanJob.load(scanner.JOBS_DIR, failed['job'])
+    assert job.manifest['status'] == "failed"
+    assert list(job.manifest['stages']) == ["scan"]
+    assert run(scanner, "resume")['unfinished_jobs'] == [failed['job']]
+
+    result = run(scanner, "resume", "--job", failed['job'])
+
+    assert result['status'] == "needs_identification"
+    assert result['job'] == failed['job']
+    assert tools() == ["single-scan"]
+    assert len(analyzed) == 2
+    assert all(doc['id'].startswith(failed['job']) for doc in result['documents'])
+    assert run(scanner, "resume", "--job", failed['job']) == result
+    assert run(scanner, "resume")['unfinished_jobs'] == []
+    assert [p.name for p in job.directory.iterdir()] == ["manifest.json"]
+
+
+def test_resume_skips_ocr_and_analysis_with_unchanged_inputs(scanner, tools, monkeypatch):
+    front = run(scanner, "front")
+    assert front['status'] == "awaiting_flip"
+    assert front['front_pdf'].startswith(str(scanner.JOBS_DIR / front['job']))
+    analyzed = []
+    original = scanner.analyze_and_split
+    monkeypatch.setattr(scanner, "analyze_and_split", lambda *a, **kw: analyzed.append(a) or original(*a, **kw))
+    crash_once(monkeypatch, scanner, "save_pending_documents")
+
+    failed = run(scanner, "back", "--front-pdf", front['front_pdf'])
+    before_resume = tools()
+    result = run(scanner, "resume", "--job", failed['job'])
+
+    assert result['status'] == "needs_identification"
+    assert before_resume[:2] == ["front-scan", "back-scan"] and "ocr" in before_resume
+    assert tools() == before_resume
+    assert len(analyzed) == 1
+    pending = sorted(p.name for p in scanner.PENDING_DIR.glob("*.pdf"))
+    assert pending == sorted(f"pending_{doc['id']}.pdf" for doc in result['documents'])
+    # The front job keeps its scan for the back side; the finished back job only its manifest
+    front_dir = scanner.JOBS_DIR / front['job']
+    assert Path(front['front_pdf']).exists() and len(list(front_dir.iterdir())) == 2
+    assert [p.name for p in (scanner.JOBS_DIR / result['job']).iterdir()] == ["manifest.json"]
+
+
+def test_changed_output_invalidates_the_stage(tmp_path):
+    job = ScanJob.create(tmp_path / "jobs", "single", {})
+    output = job.directory / "merged.pdf"
+    output.write_bytes(b"one")
+    job.complete("merge", {"scan": "abc"}, {"pdf": output})
+
+    assert job.stage("merge", {"scan": "abc"}) is not None
+    assert job.stage("merge", {"scan": "def"}) is None
+    output.write_bytes(b"two!")
+    assert job.stage("merge", {"scan": "abc"}) is None
+    assert ScanJob.create(tmp_path / "jobs", "single", {}).id != job.id
+
+
+def test_resume_unknown_job(scanner):
+    assert run(scanner, "resume", "--job", "19990101_000000")['error'] == "job_not_found"
+
+
+def test_old_jobs_are_pruned(tmp_path):
+    jobs_dir = tmp_path / "jobs"
+
+    def aged(status, days):
+        job = ScanJob.create(jobs_dir, "single", {})
+        job.manifest['status'] = status
+        job.save()
+        job.manifest['updated'] = (datetime.now() - timedelta(days=days)).isoformat(timespec='seconds')
+        job.manifest_path.write_text(json.dumps(job.manifest))
+        return job.id
+
+    old_complete, recent_complete = aged("complete", 40), aged("complete", 20)
+    old_failed, recent_failed = aged("failed", 20), aged("failed", 1)
+    running = aged("running", 100)
+
+    removed = ScanJob.prune(jobs_dir, DEFAULT_JOB_SETTINGS, keep=[running])
+
+    assert sorted(removed) == sorted([old_complete, old_failed])
+    assert sorted(p.name for p in jobs_dir.iterdir()) == sorted([recent_complete, recent_failed, running])
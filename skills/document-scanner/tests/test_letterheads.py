@@ -0,0 +1,105 @@
+"""
+Tests for the letterhead index and identification of documents from known senders
+"""
+import json
+from pathlib import Path
+
+from letterheads import DEFAULT_LETTERHEAD_SETTINGS, LetterheadIndex, auto_organizable
+from page_analysis import analyze_page_format
+from synthetic import write_text_pdf
+
+RECIPIENT = "Frau Anna Beispiel\nDorfstrasse 5\n8600 Duebendorf"
+BODY = "\n".join(f"Wir danken Ihnen fuer Ihr Vertrauen und bitten um Kenntnisnahme, Absatz {n}." for n in range(16))
+
+
+def letter(sender, street, town, date, subject):
+    return (f"{sender}\n{street}\n{town}\n{RECIPIENT}\n{town.split()[1]}, {date}\nBetreff: {subject}\n"
+            f"Sehr geehrte Frau Beispiel\n{BODY}\n{sender} - {street} - {town}\nSeite 1 von 1")
+
+
+def invoice(sender, street, town, date, number):
+    positions = "\n".join(f"Position {n} Dienstleistung {n * 37}.00" for n in range(16))
+    return (f"{sender}\n{street}\n{town}\nRECHNUNG Nr. {number}\n{RECIPIENT}\nDatum {date}\n"
+            f"{positions}\n{sender} - {street} - {town}\nSeite 1 von 1")
+
+
+MUSTER = ("Muster Energie AG", "Industriestrasse 10", "8400 Winterthur")
+ALPINA = ("Alpina Versicherungen AG", "Seestrasse 44", "3011 Bern")
+RHEIN = ("Rhein Treuhand GmbH", "Marktplatz 3", "4051 Basel")
+
+
+def header(text):
+    return analyze_page_format(None, text)['header_shingles']
+
+
+def test_match_ignores_shared_recipient_lines(tmp_path):
+    with LetterheadIndex(tmp_path / "letterheads.sqlite") as index:
+        index.record(header(invoice(*MUSTER, "08.01.2026", 1001)), "Muster Energie AG", "Rechnung")
+        index.record(header(letter(*ALPINA, "03.02.2026", "Praemie 2026")), "Alpina", "Police")
+
+        match = index.match(header(invoice(*MUSTER, "17.03.2026", 2002)))
+        assert match['sender'] == "Muster Energie AG" and match['type'] == "Rechnung"
+        assert match['confidence'] == 1.0 and match['seen'] == 1
+        assert not auto_organizable(match, DEFAULT_LETTERHEAD_SETTINGS)
+        assert index.match(header(letter(*RHEIN, "03.02.2026", "Praemie 2026"))) is None
+
+        # A second confirmation counts for the letterhead already known
+        index.record(header(invoice(*MUSTER, "02.04.2026", 3003)), "Muster Energie AG", "Rechnung")
+        assert index.count() == 2
+        assert auto_organizable(index.match(header(invoice(*MUSTER, "05.05.2026", 4004))),
+                                DEFAULT_LETTERHEAD_SETTINGS)
+
+
+def test_type_is_told_apart_by_the_whole_header(tmp_path):
+    with LetterheadIndex(tmp_path / "letterheads.sqlite") as index:
+        for n in range(2):
+            index.record(header(letter(*MUSTER, f"0{n + 1}.02.2026", "Vertragsanpassung")), "Muster Energie AG", "Brief")
+        index.record(header(letter(*RHEIN, "03.02.2026", "Mandat")), "Rhein Treuhand GmbH", "Brief")
+
+        # An invoice from a sender known only for letters is not filed as a letter
+        first_invoice = index.match(header(invoice(*MUSTER, "08.01.2026", 1001)))
+        assert first_invoice['sender'] == "Muster Energie AG" and first_invoice['type'] == "Brief"
+        assert not auto_organizable(first_invoice, DEFAULT_LETTERHEAD_SETTINGS)
+
+        for n in range(2):
+            index.record(header(invoice(*MUSTER, f"1{n}.01.2026", 1001 + n)), "Muster Energie AG", "Rechnung")
+        assert index.match(header(invoice(*MUSTER, "08.03.2026", 1005)))['type'] == "Rechnung"
+        assert index.match(header(letter(*MUSTER, "08.03.2026", "Vertragsanpassung")))['type'] == "Brief"
+
+
+def test_known_letterheads_are_organized_without_the_agent(scanner, tmp_path):
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    scanner.PREFERENCES_FILE.write_text(json.dumps({"setup_complete": True, "default_output": str(archive)}))
+    state = scanner.CommandState()
+
+    first = write_text_pdf(tmp_path / "first.pdf", [
+        invoice(*MUSTER, "08.01.2026", 1001), invoice(*MUSTER, "09.02.2026", 1002),
+        letter(*ALPINA, "03.02.2026", "Praemie 2026"),
+    ])
+    result = scanner.ingest_file(first, "first", state)
+    assert result['status'] == "needs_identification" and "auto_organized" not in result
+    organized = scanner.organize_batch([
+        {"id": doc['id'], "sender": sender, "date": doc['dates_found'][0], "type": doc_type}
+        for doc, (sender, doc_type) in zip(result['documents'], [("Muster Energie AG", "Rechnung")] * 2 +
+                                           [("Alpina", "Police")])
+    ], archive)
+    assert organized['organized'] == 3
+
+    second = write_text_pdf(tmp_path / "second.pdf", [
+        invoice(*MUSTER, "12.03.2026", 1003), letter(*ALPINA, "14.03.2026", "Schadenmeldung"),
+        letter(*RHEIN, "15.03.2026", "Mandat"),
+    ])
+    result = scanner.ingest_file(second, "second", state)
+
+    assert [(doc['sender'], doc['type'], doc['date']) for doc in result['auto_organized']] == \
+        [("Muster Energie AG", "Rechnung", "2026-03-12")]
+    assert result['total_documents'] == 3 and len(result['documents']) == 2
+    suggested, unknown = result['documents']
+    assert suggested['suggested']['sender'] == "Alpina" and suggested['suggested']['date'] == "14.03.2026"
+    assert "suggested" not in unknown
+    saved_to = result['auto_organized'][0]['saved_to']
+    assert saved_to.startswith(str(archive / "2026" / "Muster_Energie_AG")) and Path(saved_to).exists()
+    with LetterheadIndex(scanner.LETTERHEAD_FILE) as index:
+        # Organizing on its own is not a confirmation
+        assert index.match(header(invoice(*MUSTER, "01.04.2026", 1004)))['seen'] == 2
@@ -0,0 +1,107 @@
+"""
+Tests for verified NAS copies and organize-batch
+"""
+import json
+
+import pytest
+
+import nas_writer
+
+
+def test_copy_verified_writes_atomically(tmp_path):
+    src = tmp_path / "src.pdf"
+    src.write_bytes(b"%PDF-1.4 scan" * 1000)
+    dest = tmp_path / "nas" / "doc.pdf"
+    dest.parent.mkdir()
+
+    report = nas_writer.copy_verified(src, dest)
+    assert dest.read_bytes() == src.read_bytes()
+    assert report["sha256"] == nas_writer.sha256_file(src)
+    assert report["attempts"] == 1
+    assert [p.name for p in dest.parent.iterdir()] == ["doc.pdf"]
+
+
+def test_copy_verified_never_replaces_a_file(tmp_path):
+    src = tmp_path / "src.pdf"
+    src.write_bytes(b"new scan")
+    nas = tmp_path / "nas"
+    nas.mkdir()
+    (nas / "doc.pdf").write_bytes(b"filed earlier")
+    (nas / "doc_1.pdf").write_bytes(b"filed earlier too")
+
+    report = nas_writer.copy_verified(src, nas / "doc.pdf")
+    assert report["path"] == str(nas / "doc_2.pdf")
+    assert (nas / "doc.pdf").read_bytes() == b"filed earlier"
+    assert (nas / "doc_2.pdf").read_bytes() == b"new scan"
+
+    # A copy already in place from an interrupted run is recognized, not copied again
+    assert nas_writer.copy_verified(src, nas / "doc_2.pdf")["path"] == str(nas / "doc_2.pdf")
+    assert sorted(p.name for p in nas.iterdir()) == ["doc.pdf", "doc_1.pdf", "doc_2.pdf"]
+
+
+def test_copy_verified_retries_with_backoff(tmp_path, monkeypatch):
+    src = tmp_path / "src.pdf"
+    src.write_bytes(b"scan")
+    original = nas_writer._copy_once
+    failures, sleeps = [2], []
+
+    def flaky(s, d):
+        if failures[0]:
+            failures[0] -= 1
+            raise OSError("share went away")
+        return original(s, d)
+
+    monkeypatch.setattr(nas_writer, "_copy_once", flaky)
+    monkeypatch.setattr(nas_writer.time, "sleep", sleeps.append)
+    assert nas_writer.copy_verified(src, tmp_path / "dest.pdf", retries=3, backoff=0.5)["attempts"] == 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_checksum_mismatch_is_not_renamed_into_place(tmp_path, monkeypatch):
+    src = tmp_path / "src.pdf"
+    src.write_bytes(b"scan")
+    monkeypatch.setattr(nas_writer, "sha256_file", lambda path: "0" * 64)
+    monkeypatch.setattr(nas_writer.time, "sleep", lambda s: None)
+
+    with pytest.raises(nas_writer.VerificationError):
+        nas_writer.copy_verified(src, tmp_path / "dest.pdf", retries=1)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["src.pdf"]
+
+
+def test_organize_batch_reports_each_document(scanner, pending, tmp_path):
+    archive = tmp_path / "archive"
+    for doc_id, text in [("a", "Rechnung Januar"), ("b", "Rechnung Februar"), ("c", "Police")]:
+        pending(doc_id, [text])
+    batch = tmp_path / "batch.jsonl"
+    batch.write_text("\n".join(json.dumps(entry) for entry in [
+        {"id": "a", "sender": "Muster AG", "date": "2026-01-08", "type": "Rechnung"},
+        {"id": "b", "sender": "Muster AG", "date": "2026-01-08", "type": "Rechnung"},
+        {"id": "missing", "sender": "Muster AG"},
+        {"sender": "Muster AG"},
+        {"id": "c", "sender": "Versicherung", "date": "2026-02-01", "type": "Police"},
+    ]))
+
+    args = scanner.build_parser().parse_args(["organize-batch", "--batch", str(batch), "--output", str(archive)])
+    result = scanner.run_command(args)
+
+    assert (result["status"], result["organized"], result["failed"]) == ("partial", 3, 2)
+    statuses = [(doc.get("id"), doc["status"]) for doc in result["documents"]]
+    assert statuses == [("a", "organized"), ("b", "organized"), ("missing", "error"),
+                        (None, "error"), ("c", "organized")]
+    names = [doc["saved_to"].rsplit("/", 1)[1] for doc in result["documents"] if doc["status"] == "organized"]
+    assert names == ["2026-01-08_Muster AG_Rechnung.pdf", "2026-01-08_Muster AG_Rechnung_1.pdf",
+                     "2026-02-01_Versicherung_Police.pdf"]
+    assert not list(scanner.PENDING_DIR.glob("pending_*.pdf"))
+
+
+def test_failed_copy_stays_queued(scanner, pending, tmp_path, monkeypatch):
+    pending("a", ["Rechnung"])
+    (tmp_path / "archive").mkdir()
+    scanner.organize_batch([{"id": "a", "sender": "Muster AG"}], tmp_path / "archive")
+    monkeypatch.setattr(nas_writer, "_copy_once", lambda s, d: (_ for _ in ()).throw(OSError("EIO")))
+    monkeypatch.setattr(nas_writer.time, "sleep", lambda s: None)
+
+    result = scanner.sync_spool()
+    assert (result["status"], result["written"], result["failed"]) == ("partial", 0, 1)
+    assert result["errors"][0]["message"] == "EIO"
+    assert (result["queue"]["files"], result["queue"]["retrying"]) == (1, 1)
@@ -0,0 +1,83 @@
+"""
+Tests for the page-sharded OCR stage, driven by a stub OCR command
+"""
+from PyPDF2 import PdfReader
+
+import ocr_stage
+from synthetic import text_bitmap, write_image_pdf
+
+# Copies input to output and logs each call, standing in for ocrmypdf
+COPY_STUB = "open(LOG, 'a').write(sys.argv[-2] + '\\n')\nshutil.copy(sys.argv[-2], sys.argv[-1])"
+
+
+def _settings(tmp_path, stub_tool, body=COPY_STUB, **overrides):
+    log = tmp_path / "ocr.log"
+    stub = stub_tool("fake-ocr", f"LOG = {str(log)!r}\n{body}")
+    settings = dict(ocr_stage.DEFAULT_OCR_SETTINGS, command=[str(stub)], chunk_pages=4, workers=3)
+    settings.update(overrides)
+    return settings, log
+
+
+def _texts(pdf):
+    return [page.extract_text() for page in PdfReader(pdf).pages]
+
+
+def test_chunks_run_in_order_and_are_reused(tmp_path, make_pdf, stub_tool):
+    pdf = make_pdf([f"Seite {n} von 10" for n in range(1, 11)])
+    settings, log = _settings(tmp_path, stub_tool)
+    cache = tmp_path / "ocr-cache"
+
+    stats = ocr_stage.ocr_pages(pdf, tmp_path / "out.pdf", cache, settings)
+    assert stats == {"pages": 10, "cached": 0, "ocr": 10, "failed": 0}
+    assert len(log.read_text().splitlines()) == 3
+    assert _texts(tmp_path / "out.pdf") == _texts(pdf)
+
+    # A retry OCRs nothing
+    stats = ocr_stage.ocr_pages(pdf, tmp_path / "retry.pdf", cache, settings)
+    assert stats["cached"] == 10
+    assert len(log.read_text().splitlines()) == 3
+    assert _texts(tmp_path / "retry.pdf") == _texts(pdf)
+
+
+def test_rescanned_pages_only_ocr_new_ones(tmp_path, make_pdf, stub_tool):
+    settings, log = _settings(tmp_path, stub_tool)
+    cache = tmp_path / "ocr-cache"
+    first = make_pdf(["page a", "page b"], name="first.pdf")
+    ocr_stage.ocr_pages(first, tmp_path / "out1.pdf", cache, settings)
+
+    second = make_pdf(["page b", "page c", "page c"], name="second.pdf")
+    stats = ocr_stage.ocr_pages(second, tmp_path / "out2.pdf", cache, settings)
+    assert stats["cached"] == 1
+    assert stats["ocr"] == 2
+    assert len(log.read_text().splitlines()) == 2
+
+
+def test_failed_chunk_falls_back_for_its_pages_only(tmp_path, make_pdf, stub_tool):
+    body = "if 'chunk-0004' in sys.argv[-2]:\n    sys.exit(2)\nshutil.copy(sys.argv[-2], sys.argv[-1])"
+    settings, _ = _settings(tmp_path, stub_tool, body=body)
+    pdf = make_pdf([f"Seite {n} von 10" for n in range(1, 11)])
+
+    stats = ocr_stage.ocr_pages(pdf, tmp_path / "out.pdf", tmp_path / "ocr-cache", settings)
+    assert stats["failed"] == 4
+    assert _texts(tmp_path / "out.pdf") == _texts(pdf)
+
+
+def test_changed_ocr_command_is_not_served_from_the_cache(tmp_path, make_pdf, stub_tool):
+    settings, log = _settings(tmp_path, stub_tool)
+    cache = tmp_path / "ocr-cache"
+    pdf = make_pdf(["page a", "page b"])
+    ocr_stage.ocr_pages(pdf, tmp_path / "out1.pdf", cache, settings)
+
+    german = dict(settings, command=settings['command'] + ["-l", "deu"])
+    stats = ocr_stage.ocr_pages(pdf, tmp_path / "out2.pdf", cache, german)
+    assert stats["cached"] == 0 and stats["ocr"] == 2
+    assert ocr_stage.ocr_pages(pdf, tmp_path / "out3.pdf", cache, settings)["cached"] == 2
+
+
+def test_scans_drawn_the_same_way_hash_by_their_images(tmp_path):
+    pdf = write_image_pdf(tmp_path / "scan.pdf", [text_bitmap(dpi=50, seed=n) for n in (1, 2, 1)])
+    first, second, repeat = PdfReader(pdf).pages
+
+    assert first.get_contents().get_data() == second.get_contents().get_data()
+    assert ocr_stage.page_hash(first) != ocr_stage.page_hash(second)
+    assert ocr_stage.page_hash(first) == ocr_stage.page_hash(repeat)
@@ -0,0 +1,146 @@
+"""
+Tests for Group 4 coding and the storage optimization of pending documents
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+from PyPDF2 import PdfReader
+
+from ccitt import BLACK_CODES, EOL, HORIZONTAL, VERTICAL, WHITE_CODES, decode_g4, encode_g4
+from conftest import letter_page
+from output_optimizer import DEFAULT_OPTIMIZE_SETTINGS, downsample, optimize_documents
+from synthetic import scan_bitmap, text_bitmap, write_image_pdf
+
+# A small image and its Group 4 code, as checked against libtiff's decoder
+SAMPLE = ["................................",
+          "....########........##..........",
+          "....########.......####.........",
+          "....##..............##....######",
+          "################################"]
+SAMPLE_G4 = "9b14cfe9e7d11b226a0d40020020"
+
+
+def settings(**overrides):
+    return {**DEFAULT_OPTIMIZE_SETTINGS, 'workers': 1, **overrides}
+
+
+def images(pdf):
+    return [page['/Resources']['/XObject']['/Im0'].get_object() for page in PdfReader(pdf).pages]
+
+
+def test_group4_code_is_standard_and_round_trips():
+    sample = np.array([[c == '#' for c in row] for row in SAMPLE])
+    assert encode_g4(sample).hex() == SAMPLE_G4
+
+    rng = np.random.default_rng(0)
+    # Runs past the longest make-up code, solid and empty rows, noise and text
+    wide = np.zeros((4, 6000), dtype=bool)
+    wide[1, 100:5900] = wide[3] = True
+    for ink in (sample, wide, rng.random((60, 301)) < 0.3, text_bitmap(dpi=100, seed=1)):
+        assert (decode_g4(encode_g4(ink), ink.shape[1], ink.shape[0]) == ink).all()
+
+
+def test_zero_length_runs_decode_as_no_change():
+    # Other encoders may code a row as white 3, black 0, white 2, black 3
+    row = HORIZONTAL + WHITE_CODES[3] + BLACK_CODES[0] + HORIZONTAL + WHITE_CODES[2] + BLACK_CODES[3]
+    # The row below repeats it in vertical mode, coded against the row above
+    code = row + VERTICAL[0] * 2 + EOL + EOL
+    code += "0" * (-len(code) % 8)
+    data = int(code, 2).to_bytes(len(code) // 8, 'big')
+
+    expected = np.array([[c == '#' for c in ".....###"]] * 2)
+    assert (decode_g4(data, 8, 2) == expected).all()
+
+
+def test_downsampling_keeps_strokes_and_drops_specks():
+    ink = np.zeros((40, 40), dtype=bool)
+    ink[10, :] = True
+    ink[30, 30] = True
+
+    small = downsample(ink, 0.5)
+
+    assert small.shape == (20, 20)
+    assert small[5].all() and small.sum() == 20
+
+
+def test_scans_are_recoded_with_their_text_layer(tmp_path):
+    pages = [text_bitmap(dpi=150, seed=n) for n in range(2)]
+    texts = [letter_page(1, 3), letter_page(2, 3), letter_page(3, 3)]
+    # The last page repeats the first image, as a separate stream
+    pdf = write_image_pdf(tmp_path / "pending.pdf", pages + [pages[0]], texts)
+    before = pdf.stat().st_size
+    text_layer = [page.extract_text() for page in PdfReader(pdf).pages]
+
+    result = optimize_documents([pdf], settings())
+
+    report, = result["documents"]
+    assert report["bytes_before"] == before and report["bytes_after"] == pdf.stat().st_size
+    assert result["ratio"] > 1.5 and result["pages_over_budget"] == 0
+    assert report["images_recoded"] == 3 and report["seconds"] > 0
+    assert [page.extract_text() for page in PdfReader(pdf).pages] == text_layer
+    recoded = images(pdf)
+    assert all(image['/Filter'] == '/CCITTFaxDecode' for image in recoded)
+    assert recoded[0].indirect_reference == recoded[2].indirect_reference
+    for image, bitmap in zip(recoded, pages):
+        params = image['/DecodeParms']
+        assert (decode_g4(image._data, params['/Columns'], params['/Rows']) == bitmap).all()
+
+
+def test_documents_are_optimized_in_parallel_as_serially(tmp_path):
+    serial = [write_image_pdf(tmp_path / f"serial-{n}.pdf", [text_bitmap(dpi=100, seed=n)]) for n in range(3)]
+    parallel = [write_image_pdf(tmp_path / f"parallel-{n}.pdf", [text_bitmap(dpi=100, seed=n)]) for n in range(3)]
+
+    optimize_documents(serial, settings())
+    result = optimize_documents(parallel, settings(workers=3))
+
+    assert [a.read_bytes() for a in serial] == [b.read_bytes() for b in parallel]
+    assert result["bytes_after"] == sum(path.stat().st_size for path in parallel)
+    assert result["bytes_before"] > result["bytes_after"]
+
+
+def test_jobs_on_threads_optimize_without_a_process_pool(tmp_path, monkeypatch):
+    import threading
+    import output_optimizer
+    monkeypatch.setattr(output_optimizer, "process_pool", None)
+    paths = [write_image_pdf(tmp_path / f"{n}.pdf", [text_bitmap(dpi=100, seed=n)]) for n in range(2)]
+    results = []
+    worker = threading.Thread(target=lambda: results.append(optimize_documents(paths, settings(workers=2))))
+    worker.start()
+    worker.join()
+
+    assert [report["path"] for report in results[0]["documents"]] == [str(path) for path in paths]
+
+
+def test_pages_over_budget_are_downsampled_to_min_dpi(tmp_path):
+    pdf = write_image_pdf(tmp_path / "pending.pdf", [text_bitmap(dpi=300, seed=2), scan_bitmap(False, dpi=300)])
+
+    report, = optimize_documents([pdf], settings(max_page_bytes=2000, min_dpi=150))["documents"]
+
+    # The text page can't get that small at 150 dpi; the blank one fits at full resolution
+    assert report["pages_downsampled"] == [1] and report["pages_over_budget"] == [1]
+    text_page, blank_page = images(pdf)
+    assert abs(text_page['/Width'] - 8.27 * 150) < 2 and blank_page['/Width'] == 2481
+
+    # Optimizing again finds nothing left to gain
+    again, = optimize_documents([pdf], settings(max_page_bytes=2000, min_dpi=150))["documents"]
+    assert again["bytes_after"] == again["bytes_before"] and again["pages_downsampled"] == []
+
+
+def test_ingested_documents_are_stored_optimized(scanner, tmp_path):
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    scanner.PREFERENCES_FILE.write_text(json.dumps({
+        "setup_complete": True, "default_output": str(archive), "optimize": {"workers": 1},
+    }))
+    pdf = write_image_pdf(tmp_path / "inbox.pdf", [text_bitmap(dpi=150, seed=n) for n in range(3)],
+                          [letter_page(1, 2), letter_page(2, 2), letter_page(1, 1, sender="Beispiel GmbH")])
+
+    result = scanner.ingest_file(pdf, "inbox", scanner.CommandState())
+
+    assert result['status'] == "needs_identification" and len(result['documents']) == 2
+    storage = result['storage']
+    assert storage['ratio'] > 1.2 and storage['bytes_optimized'] < storage['bytes_written']
+    for doc in result['documents']:
+        assert doc['optimized_bytes'] == Path(doc['pending_path']).stat().st_size
+        assert "Muster AG" in doc['text_preview'] or "Beispiel GmbH" in doc['text_preview']
@@ -0,0 +1,247 @@
+"""
+Tests for the shared page-analysis layer
+"""
+import os
+import json
+import time
+
+import pytest
+from PyPDF2 import PdfReader
+from PyPDF2._page import PageObject
+
+import page_analysis
+from conftest import letter_page
+
+
+@pytest.fixture
+def extract_calls(monkeypatch):
+    calls = []
+    original = PageObject.extract_text
+
+    def counting(self, *args, **kwargs):
+        calls.append(self)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(PageObject, "extract_text", counting)
+    monkeypatch.setattr(page_analysis, "_page_cache", {})
+    monkeypatch.setattr(page_analysis, "_page_counts", {})
+    monkeypatch.setattr(page_analysis, "_text_spools", {})
+    monkeypatch.setattr(page_analysis, "_documents", {})
+    return calls
+
+
+def test_each_page_extracted_once_per_run(scanner, make_pdf, extract_calls):
+    pdf = make_pdf([letter_page(1, 2), "", letter_page(2, 2), ""])
+
+    documents = scanner.analyze_and_split(pdf)
+    pending = scanner.save_pending_documents(pdf, documents)
+
+    assert len(extract_calls) == 4
+    assert [d['pages'] for d in documents] == [[0, 2]]
+    assert pending[0]['pages'] == 2
+
+
+def test_sidecar_reused_by_later_invocations(scanner, make_pdf, extract_calls, monkeypatch):
+    pdf = make_pdf([letter_page(1, 1), ""])
+    scanner.analyze_and_split(pdf)
+
+    content_hash = page_analysis.file_hash(pdf)
+    sidecar = scanner.PAGE_CACHE_DIR / f"{content_hash}.json"
+    data = json.loads(sidecar.read_text())
+    assert data['page_count'] == 2
+    assert data['pages']['1']['is_blank'] is True
+
+    # A fresh process only has the sidecar
+    monkeypatch.setattr(page_analysis, "_page_cache", {})
+    monkeypatch.setattr(page_analysis, "_page_counts", {})
+    extract_calls.clear()
+
+    analysis = page_analysis.PageAnalysis(pdf, cache_dir=scanner.PAGE_CACHE_DIR)
+    assert analysis.page(0)['page_indicator'] == (1, 1)
+    assert analysis.page_count == 2
+    assert analysis._reader is None
+    assert extract_calls == []
+
+
+def test_list_pending_uses_seeded_pending_pages(scanner, make_pdf, extract_calls, monkeypatch, capsys):
+    pdf = make_pdf([letter_page(1, 2), letter_page(2, 2), letter_page(1, 1, sender="Beispiel GmbH")])
+    scanner.save_pending_documents(pdf, scanner.analyze_and_split(pdf))
+    extract_calls.clear()
+
+    monkeypatch.setattr("sys.argv", ["scan_and_organize.py", "list-pending"])
+    scanner.main()
+
+    result = json.loads(capsys.readouterr().out)
+    assert len(result['pending']) == 2
+    assert sorted(p['pages'] for p in result['pending']) == [1, 2]
+    assert extract_calls == []
+
+
+def test_unreadable_text_is_not_blank(make_pdf, monkeypatch):
+    pdf = make_pdf([letter_page(1, 1)])
+    monkeypatch.setattr(page_analysis, "_page_cache", {})
+
+    def broken(self, *args, **kwargs):
+        raise ValueError("bad content stream")
+
+    monkeypatch.setattr(PageObject, "extract_text", broken)
+    analysis = page_analysis.PageAnalysis(pdf).page(0)
+    assert analysis['is_blank'] is False
+    assert analysis['full_text'] == ""
+
+
+def test_parallel_analysis_matches_serial(scanner, make_pdf, monkeypatch):
+    pages = []
+    for n in range(8):
+        pages += [letter_page(1, 2, sender=f"Absender {n} AG"), "", letter_page(2, 2, sender=f"Absender {n} AG"), ""]
+    pdf = make_pdf(pages)
+    monkeypatch.setattr(scanner, "PAGE_CACHE_DIR", None)
+
+    monkeypatch.setattr(page_analysis, "_page_cache", {})
+    serial = scanner.analyze_and_split(pdf, workers=1)
+    monkeypatch.setattr(page_analysis, "_page_cache", {})
+    parallel = scanner.analyze_and_split(pdf, workers=2)
+
+    assert parallel == serial
+    assert len(serial) == 8
+
+
+def test_shard_indices_are_contiguous_and_complete():
+    shards = page_analysis.shard_indices(list(range(10)), 3)
+    assert shards == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+    assert page_analysis.shard_indices([1, 2], 8) == [[1], [2]]
+
+
+def test_page_text_is_spooled_not_cached(scanner, make_pdf, extract_calls):
+    pdf = make_pdf([letter_page(2, 2), letter_page(1, 2), letter_page(1, 1, sender="Beispiel GmbH")])
+
+    documents = scanner.analyze_and_split(pdf)
+
+    assert [d['pages'] for d in documents] == [[1, 0], [2]]
+    assert all('full_text' not in d for d in documents)
+    assert all('full_text' not in entry for entry in page_analysis._page_cache.values())
+    analysis = page_analysis.PageAnalysis(pdf, cache_dir=scanner.PAGE_CACHE_DIR)
+    assert analysis.text_path.exists()
+    assert "Beispiel GmbH" in analysis.text(2)
+    assert analysis.full_text(limit=40) == analysis.full_text()[:40]
+
+    pending = scanner.save_pending_documents(pdf, documents)
+    # A short letter fits the preview budget whole; page 2 repeats it, bar its indicator
+    assert pending[0]['text_preview'] == analysis.text(1).strip()
+    assert len(extract_calls) == 3
+
+
+def test_missing_text_spool_falls_back_to_extraction(scanner, make_pdf, extract_calls):
+    pdf = make_pdf([letter_page(1, 1)])
+    analysis = page_analysis.PageAnalysis(pdf, cache_dir=scanner.PAGE_CACHE_DIR)
+    expected = analysis.text(0)
+    analysis.text_path.unlink()
+
+    assert analysis.text(0) == expected
+    assert len(extract_calls) == 2
+
+
+def test_page_features_hold_no_text():
+    features = page_analysis.PageFeatures.from_analysis(
+        {'index': 3, 'page_indicator': (1, 2), 'opens_letter': True, 'full_text': "x" * 1000})
+
+    assert (features.index, features.page_num, features.page_total, features.opens_letter) == (3, 1, 2, True)
+    assert not hasattr(features, '__dict__')
+
+
+def test_seeding_again_keeps_the_spooled_text(scanner, make_pdf, extract_calls, monkeypatch):
+    pdf = make_pdf([letter_page(1, 2), letter_page(2, 2)])
+    analyses = page_analysis.PageAnalysis(pdf).pages()
+    seeded = page_analysis.PageAnalysis.seed(pdf, analyses, cache_dir=scanner.PAGE_CACHE_DIR)
+    size = seeded.text_path.stat().st_size
+
+    page_analysis.PageAnalysis.seed(pdf, analyses, cache_dir=scanner.PAGE_CACHE_DIR)
+    # ...also in a fresh process that only has the sidecar
+    monkeypatch.setattr(page_analysis, "_page_cache", {})
+    monkeypatch.setattr(page_analysis, "_page_counts", {})
+    monkeypatch.setattr(page_analysis, "_text_spools", {})
+    again = page_analysis.PageAnalysis.seed(pdf, analyses, cache_dir=scanner.PAGE_CACHE_DIR)
+
+    assert again.text_path.stat().st_size == size
+    assert again.text(1) == analyses[1]['full_text']
+
+
+def test_memory_holds_the_most_recently_used_documents(make_pdf, extract_calls, monkeypatch):
+    monkeypatch.setattr(page_analysis, "MAX_CACHED_DOCUMENTS", 2)
+    pdfs = [make_pdf([letter_page(1, 1, sender=f"Absender {n}")], name=f"{n}.pdf") for n in range(3)]
+    hashes = []
+    for pdf in pdfs:
+        analysis = page_analysis.PageAnalysis(pdf)
+        analysis.page(0)
+        hashes.append(analysis.content_hash)
+
+    assert list(page_analysis._documents) == hashes[1:]
+    assert {key[0] for key in page_analysis._page_cache} == set(hashes[1:])
+    assert hashes[0] not in page_analysis._page_counts
+
+
+def test_prune_cache_drops_old_and_least_recently_used_entries(make_pdf, extract_calls, tmp_path):
+    cache_dir = tmp_path / "cache"
+    pdfs = [make_pdf([letter_page(1, 1, sender=f"Absender {n}")], name=f"{n}.pdf") for n in range(4)]
+    now = time.time()
+    for age, pdf in zip((200, 3, 2, 1), pdfs):
+        analysis = page_analysis.PageAnalysis(pdf, cache_dir=cache_dir)
+        analysis.page(0)
+        analysis.save()
+        for path in (analysis.sidecar_path, analysis.text_path):
+            os.utime(path, (now - age * 86400, now - age * 86400))
+    sizes = [sum(p.stat().st_size for p in cache_dir.glob(f"{page_analysis.file_hash(pdf)}.*")) for pdf in pdfs]
+
+    # Room for the two newest entries only
+    budget = (sizes[3] + sizes[2] + sizes[1] / 2) / (1024 * 1024)
+    result = page_analysis.prune_cache(cache_dir, {'max_mb': budget, 'max_age_days': 90})
+
+    kept = {page_analysis.file_hash(pdf) for pdf in pdfs[2:]}
+    assert result == {"removed": 2, "bytes_freed": sizes[0] + sizes[1]}
+    assert {path.name.split('.')[0] for path in cache_dir.iterdir()} == kept
+    assert {key[0] for key in page_analysis._page_cache} == kept
+
+
+def test_concurrent_jobs_share_the_caches_safely(scanner, make_pdf, extract_calls, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    monkeypatch.setattr(page_analysis, "_readers", {})
+    pdfs = [make_pdf([letter_page(1, 2, sender=f"Absender {n}"), "", letter_page(2, 2, sender=f"Absender {n}")],
+                     name=f"{n}.pdf") for n in range(6)]
+    expected = [[page.extract_text() for page in PdfReader(pdf).pages] for pdf in pdfs]
+    # Small caps, so threads keep evicting each other's entries
+    monkeypatch.setattr(page_analysis, "MAX_CACHED_DOCUMENTS", 2)
+    monkeypatch.setattr(page_analysis, "MAX_OPEN_READERS", 1)
+
+    def analyze(n):
+        analysis = page_analysis.PageAnalysis(pdfs[n % len(pdfs)], cache_dir=scanner.PAGE_CACHE_DIR)
+        features = [(f.index, f.page_num) for f in analysis.features()]
+        texts = [analysis.text(i) for i in range(analysis.page_count)]
+        analysis.save()
+        return features, texts
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(analyze, range(60)))
+
+    for n, (features, texts) in enumerate(results):
+        assert features == [(0, 1), (2, 2)]
+        assert texts == expected[n % len(pdfs)]
+
+
+def test_one_pdf_analyzed_by_several_threads_is_spooled_once(scanner, make_pdf, extract_calls):
+    import threading
+    pdf = make_pdf([letter_page(1, 2), letter_page(2, 2)])
+    start = threading.Barrier(4)
+
+    def analyze():
+        start.wait()
+        page_analysis.PageAnalysis(pdf, cache_dir=scanner.PAGE_CACHE_DIR).pages()
+
+    threads = [threading.Thread(target=analyze) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    analysis = page_analysis.PageAnalysis(pdf, cache_dir=scanner.PAGE_CACHE_DIR)
+    texts = [analysis.text(i) for i in range(2)]
+    assert analysis.text_path.stat().st_size == sum(len(text.encode('utf-8')) for text in texts)
@@ -0,0 +1,85 @@
+"""
+Tests for the pending-document manifest behind list-pending
+"""
+import os
+import json
+import shutil
+
+from conftest import letter_page
+from pending_manifest import PendingManifest
+
+
+def _list_pending(scanner, monkeypatch, capsys, *args):
+    monkeypatch.setattr("sys.argv", ["scan_and_organize.py", "list-pending", *args])
+    scanner.main()
+    return json.loads(capsys.readouterr().out)
+
+
+def _scan(scanner, make_pdf, letters, name="scan.pdf"):
+    pages = []
+    for n in range(letters):
+        pages += [letter_page(1, 2, sender=f"Absender {n}"), letter_page(2, 2, sender=f"Absender {n}")]
+    pdf = make_pdf(pages, name=name)
+    return scanner.save_pending_documents(pdf, scanner.analyze_and_split(pdf))
+
+
+def test_list_pending_pages_through_manifest(scanner, make_pdf, monkeypatch, capsys):
+    saved = _scan(scanner, make_pdf, 5)
+
+    result = _list_pending(scanner, monkeypatch, capsys, "--limit", "2", "--offset", "1")
+    assert result["total"] == 5
+    assert [p["id"] for p in result["pending"]] == [d["id"] for d in saved[1:3]]
+    assert result["pending"][0]["dates_found"] == ["08.01.2026"]
+    assert len(result["pending"][0]["text_preview"]) <= 1000
+
+
+def test_filters_by_scan_date_and_age(scanner, make_pdf, monkeypatch, capsys):
+    _scan(scanner, make_pdf, 2)
+    old = scanner.PENDING_DIR / "pending_20250101_090000_00.pdf"
+    shutil.copy(next(scanner.PENDING_DIR.glob("pending_*.pdf")), old)
+
+    assert _list_pending(scanner, monkeypatch, capsys, "--until", "2025-01-01")["total"] == 1
+    assert _list_pending(scanner, monkeypatch, capsys, "--since", "2025-01-02")["total"] == 2
+    assert _list_pending(scanner, monkeypatch, capsys, "--older-than", "30")["total"] == 1
+
+
+def test_non_iso_date_filter_is_an_error(scanner, make_pdf, monkeypatch, capsys):
+    _scan(scanner, make_pdf, 1)
+
+    result = _list_pending(scanner, monkeypatch, capsys, "--until", "2026/10/01")
+    assert result["status"] == "error" and result["error"] == "invalid_date"
+    assert "--until" in result["message"]
+    assert _list_pending(scanner, monkeypatch, capsys, "--since", "2026-10-01T08:00:00")["status"] == "ok"
+
+
+def test_sync_detects_changed_added_and_removed_files(scanner, make_pdf, tmp_path):
+    saved = _scan(scanner, make_pdf, 2)
+    described = []
+
+    def describe(path):
+        described.append(path.name)
+        return scanner.describe_pending(path)
+
+    with PendingManifest(scanner.MANIFEST_FILE) as manifest:
+        assert manifest.sync(scanner.PENDING_DIR, describe) == {"updated": 0, "removed": 0}
+
+        # Replaced on disk, dropped by hand, and added outside the pipeline
+        changed = scanner.PENDING_DIR / f"pending_{saved[0]['id']}.pdf"
+        shutil.copy(make_pdf([letter_page(1, 1, sender="Neu AG")], name="new.pdf"), changed)
+        os.utime(changed, ns=(1, 1))
+        os.remove(scanner.PENDING_DIR / f"pending_{saved[1]['id']}.pdf")
+        shutil.copy(changed, scanner.PENDING_DIR / "pending_20260101_120000_07.pdf")
+
+        assert manifest.sync(scanner.PENDING_DIR, describe) == {"updated": 2, "removed": 1}
+        assert sorted(described) == sorted([changed.name, "pending_20260101_120000_07.pdf"])
+        listing = manifest.query()
+        assert listing["total"] == 2
+        assert all("Neu AG" in p["text_preview"] for p in listing["pending"])
+
+
+def test_organize_removes_manifest_entry(scanner, make_pdf, tmp_path):
+    saved = _scan(scanner, make_pdf, 1)
+    scanner.organize_document(saved[0]["id"], "Absender", "2026-01-08", "Rechnung", tmp_path / "archive")
+
+    with PendingManifest(scanner.MANIFEST_FILE) as manifest:
+        assert manifest.query()["total"] == 0
@@ -0,0 +1,56 @@
+"""
+Tests for budgeted identification previews
+"""
+import preview
+from preview import DEFAULT_PREVIEW_SETTINGS, build_preview, preview_budget
+from synthetic import write_text_pdf
+
+BODY = "\n".join(f"Wir bitten Sie, die beiliegenden Unterlagen zu pruefen, Absatz {n}." for n in range(30))
+PAGES = [
+    "Muster Versicherungen AG\nBahnhofstrasse 1\n8400 Winterthur\n\nFrau Anna Beispiel\nDorfstrasse 5\n"
+    "8600 Duebendorf\n\nWinterthur, 8. Januar 2026\nBetreff: Praemienrechnung 2026\n"
+    f"Sehr geehrte Frau Beispiel\nIhre Praemie fuer das Jahr 2026 betraegt CHF 1200.\n{BODY}\n"
+    "Muster Versicherungen AG - Bahnhofstrasse 1 - 8400 Winterthur\nSeite 1 von 2",
+    f"Muster Versicherungen AG\n{BODY}\nKundennummer 55-1234-9\nIBAN CH93 0076 2011 6238 5295 7\n"
+    "Muster Versicherungen AG - Bahnhofstrasse 1 - 8400 Winterthur\nSeite 2 von 2",
+]
+
+
+def test_preview_keeps_identifying_lines_from_every_page():
+    preview = build_preview(PAGES)
+    lines = preview.split("\n")
+
+    assert lines[:3] == ["Muster Versicherungen AG", "Bahnhofstrasse 1", "8400 Winterthur"]
+    for expected in ("Frau Anna Beispiel", "Winterthur, 8. Januar 2026", "Betreff: Praemienrechnung 2026",
+                     "Sehr geehrte Frau Beispiel", "Kundennummer 55-1234-9",
+                     "IBAN CH93 0076 2011 6238 5295 7", "Seite 1 von 2"):
+        assert expected in lines
+    assert "Seite 2 von 2" not in lines
+    assert not any("Absatz" in line for line in lines)
+    assert lines.count("Muster Versicherungen AG") == 1
+    assert len(preview) <= preview_budget(DEFAULT_PREVIEW_SETTINGS)
+
+
+def test_small_budget_keeps_the_best_lines_in_reading_order():
+    settings = dict(DEFAULT_PREVIEW_SETTINGS, max_tokens=25, max_line_chars=30)
+
+    preview = build_preview(PAGES, settings)
+
+    assert len(preview) <= 100
+    assert preview.split("\n")[:3] == ["Muster Versicherungen AG", "Bahnhofstrasse 1", "8400 Winterthur"]
+    assert preview.split("\n")[3] == "Betreff: Praemienrechnung 2026"
+    assert build_preview(["x" * 100], settings) == "x" * 29 + "…"
+
+
+def test_preview_is_built_at_split_time(scanner, tmp_path, monkeypatch):
+    pdf = write_text_pdf(tmp_path / "scan.pdf", PAGES)
+    documents = scanner.analyze_and_split(pdf)
+    assert "IBAN CH93 0076 2011 6238 5295 7" in documents[0]['preview']
+
+    def rebuilt(*args):
+        raise AssertionError("preview built again")
+
+    monkeypatch.setattr(preview, "build_preview", rebuilt)
+    pending = scanner.save_pending_documents(pdf, documents)
+
+    assert pending[0]['text_preview'] == documents[0]['preview']
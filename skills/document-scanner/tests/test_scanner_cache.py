@@ -0,0 +1,98 @@
+"""
+Tests for cached scanner discovery
+"""
+import os
+import json
+import importlib.util
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def _known(scanner, entries):
+    prefs = {"setup_complete": True, "known_scanners": entries}
+    scanner.PREFERENCES_FILE.write_text(json.dumps(prefs))
+
+
+def _seen(minutes_ago):
+    return (datetime.now() - timedelta(minutes=minutes_ago)).isoformat()
+
+
+@pytest.fixture
+def counted(scanner, monkeypatch):
+    calls = {"detect": 0, "probe": 0, "background": 0}
+
+    def detect():
+        calls["detect"] += 1
+        return ["Fake Scanner"]
+
+    def probe(name, timeout=None):
+        calls["probe"] += 1
+        return name == "Fake Scanner"
+
+    monkeypatch.setattr(scanner, "detect_scanners", detect)
+    monkeypatch.setattr(scanner, "probe_scanner", probe)
+    monkeypatch.setattr(scanner.CommandState, "refresh_in_background",
+                        lambda self: calls.__setitem__("background", calls["background"] + 1))
+    return calls
+
+
+def test_empty_cache_runs_full_discovery_and_records_it(scanner, counted):
+    assert scanner.CommandState().scanners() == ["Fake Scanner"]
+    assert counted["detect"] == 1
+
+    known = json.loads(scanner.PREFERENCES_FILE.read_text())["known_scanners"]
+    assert [entry["name"] for entry in known] == ["Fake Scanner"]
+    assert scanner.CommandState().scanners() == ["Fake Scanner"]
+    assert counted["detect"] == 1
+
+
+def test_stale_cache_answers_immediately_and_refreshes_in_background(scanner, counted):
+    _known(scanner, [{"name": "Old Scanner", "last_seen": _seen(60)}])
+    assert scanner.CommandState().scanners() == ["Old Scanner"]
+    assert counted == {"detect": 0, "probe": 0, "background": 1}
+
+
+def test_fresh_cache_verifies_without_subprocesses(scanner, counted):
+    _known(scanner, [{"name": "Fake Scanner", "last_seen": _seen(1)}])
+    found, _ = scanner.CommandState().verify_scanner("Fake Scanner")
+    assert found
+    assert counted == {"detect": 0, "probe": 0, "background": 0}
+
+
+def test_expired_entry_is_probed_before_full_discovery(scanner, counted):
+    _known(scanner, [{"name": "Fake Scanner", "last_seen": _seen(60)}, "Legacy Scanner"])
+    found, available = scanner.CommandState().verify_scanner("Fake Scanner")
+    assert found and "Legacy Scanner" in available
+    assert counted["probe"] == 1 and counted["detect"] == 0
+
+    ages = scanner.known_scanner_ages(scanner.load_preferences())
+    assert ages["Fake Scanner"] < 60
+
+    found, _ = scanner.CommandState().verify_scanner("Missing Scanner")
+    assert not found
+    assert counted["detect"] == 1
+
+
+def test_probe_stops_at_the_requested_scanner(scanner, stub_tool, tmp_path, monkeypatch):
+    stub_tool("scanline", "import time\nprint('* First', flush=True)\nprint('* Second', flush=True)\ntime.sleep(30)")
+    monkeypatch.setenv("PATH", f"{tmp_path / 'bin'}{os.pathsep}{os.environ['PATH']}")
+
+    assert scanner.probe_scanner("Second", timeout=10)
+    assert not scanner.probe_scanner("Third", timeout=0.5)
+
+
+def test_missing_pdf_library_only_stops_commands_that_read_pdfs(scanner, counted, monkeypatch, capsys):
+    _known(scanner, [{"name": "Fake Scanner", "last_seen": _seen(1)}])
+    real_find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, "find_spec",
+                        lambda name, *args: None if name == "PyPDF2" else real_find_spec(name, *args))
+
+    monkeypatch.setattr("sys.argv", ["scan_and_organize.py", "list-scanners", "--no-daemon"])
+    scanner.main()
+    assert json.loads(capsys.readouterr().out)["scanners"] == ["Fake Scanner"]
+
+    monkeypatch.setattr("sys.argv", ["scan_and_organize.py", "organize", "--id", "x", "--sender", "A", "--no-daemon"])
+    with pytest.raises(SystemExit):
+        scanner.main()
+    assert json.loads(capsys.readouterr().out)["error"] == "missing_dependency"
@@ -0,0 +1,162 @@
+"""
+Tests for concurrent scans: per-scanner locks, isolated job output, the scheduler
+"""
+import os
+import json
+import threading
+import time
+
+import pytest
+
+from synthetic import letter_stack, write_text_pdf
+from scheduler import ScanScheduler, new_files, reported_paths, scanner_lock, snapshot
+
+FAKE_SCANLINE = """
+import time
+from pathlib import Path
+args = sys.argv[1:]
+if '-list' in args:
+    print('* Scanner A')
+    print('* Scanner B')
+    sys.exit(0)
+scanner = args[args.index('-scanner') + 1]
+out = Path(args[args.index('-dir') + 1]) / args[-1]
+out.mkdir(parents=True, exist_ok=True)
+start = time.time()
+time.sleep({delay})
+target = out / 'scan.pdf'
+shutil.copy(Path({sources!r}) / (scanner + '.pdf'), target)
+# Scanner A names its output; Scanner B leaves it to the snapshot diff
+if scanner == 'Scanner A':
+    print('Scanned to ' + str(target))
+with open({log!r}, 'a') as log:
+    log.write(json.dumps([scanner, start, time.time()]) + '\\n')
+"""
+
+
+@pytest.fixture
+def scanners(scanner, tmp_path, stub_tool, monkeypatch):
+    """Fake scanline for Scanner A and B, each scanning its own sender's letters"""
+    sources = tmp_path / "sources"
+    sources.mkdir()
+    for name, sender in (("Scanner A", "Alpha AG"), ("Scanner B", "Beta GmbH")):
+        pages = [page.replace("Absender", sender) for page in letter_stack(4)]
+        write_text_pdf(sources / f"{name}.pdf", pages)
+    log = tmp_path / "scans.jsonl"
+    stub_tool("scanline", "import json\n" + FAKE_SCANLINE.format(delay=0.5, sources=str(sources), log=str(log)))
+    monkeypatch.setenv("PATH", f"{tmp_path / 'bin'}{os.pathsep}{os.environ['PATH']}")
+    scanner.PREFERENCES_FILE.write_text(json.dumps({
+        "setup_complete": True, "default_scanner": "Scanner A", "default_output": str(tmp_path / "out")
+    }))
+    return lambda: [json.loads(line) for line in log.read_text().splitlines()]
+
+
+def run_concurrently(scanner, *scanner_names):
+    results = {}
+
+    def scan(n, name):
+        args = scanner.build_parser().parse_args(["single", "--scanner", name])
+        results[n] = scanner.run_command(args)
+
+    threads = [threading.Thread(target=scan, args=(n, name)) for n, name in enumerate(scanner_names)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [results[n] for n in range(len(scanner_names))]
+
+
+def overlaps(scans):
+    (_, start_a, end_a), (_, start_b, end_b) = scans
+    return start_a < end_b and start_b < end_a
+
+
+def test_two_scanners_scan_in_parallel_into_their_own_jobs(scanner, scanners):
+    results = run_concurrently(scanner, "Scanner A", "Scanner B")
+
+    assert [r['status'] for r in results] == ["needs_identification"] * 2
+    assert results[0]['job'] != results[1]['job']
+    assert overlaps(scanners())
+    for result, sender in zip(results, ("Alpha AG", "Beta GmbH")):
+        assert all(sender in doc['text_preview'] for doc in result['documents'])
+
+
+def test_one_scanner_runs_one_scan_at_a_time(scanner, scanners):
+    results = run_concurrently(scanner, "Scanner A", "Scanner A")
+
+    assert [r['status'] for r in results] == ["needs_identification"] * 2
+    assert not overlaps(scanners())
+
+
+def test_snapshot_diff_ignores_existing_and_other_jobs_files(tmp_path):
+    job, other = tmp_path / "job", tmp_path / "other"
+    job.mkdir()
+    other.mkdir()
+    (job / "old.pdf").write_bytes(b"old")
+    before = snapshot(job)
+
+    (other / "newer.pdf").write_bytes(b"other job")
+    (job / "single-scan").mkdir()
+    (job / "single-scan" / "scan.pdf").write_bytes(b"ours")
+
+    assert new_files(before, snapshot(job)) == [job / "single-scan" / "scan.pdf"]
+
+
+def test_reported_paths_finds_existing_pdfs(tmp_path):
+    folder = tmp_path / "with space"
+    folder.mkdir()
+    scan = folder / "scan.pdf"
+    scan.write_bytes(b"%PDF")
+
+    output = f"Scanning 1/2 pages\nScanned to {scan}\nFailed: /nowhere/missing.pdf\nScanned to {scan}\n"
+
+    assert reported_paths(output) == [scan]
+
+
+def test_scanner_lock_is_exclusive_across_opens(tmp_path):
+    held = threading.Event()
+    order = []
+
+    def holder():
+        with scanner_lock(tmp_path, "Scanner A"):
+            held.set()
+            time.sleep(0.2)
+            order.append("first")
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    held.wait()
+    with scanner_lock(tmp_path, "Scanner A"):
+        order.append("second")
+    thread.join()
+
+    assert order == ["first", "second"]
+
+
+def test_scheduler_queues_per_scanner():
+    active, peak = {}, {}
+    lock = threading.Lock()
+
+    def handler(method, params):
+        name = params['scanner']
+        with lock:
+            active[name] = active.get(name, 0) + 1
+            peak['all'] = max(peak.get('all', 0), sum(active.values()))
+            peak[name] = max(peak.get(name, 0), active[name])
+        time.sleep(0.1)
+        with lock:
+            active[name] -= 1
+        return {"status": "ok"}
+
+    scheduler = ScanScheduler(handler)
+    threads = [
+        threading.Thread(target=scheduler.submit, args=(name, "single", {"scanner": name}))
+        for name in ("A", "A", "B", "B")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == {"all": 2, "A": 1, "B": 1}
+    assert scheduler.depths() == {"A": 0, "B": 0}
@@ -0,0 +1,99 @@
+"""
+Tests for the write-behind spool, with one archive toggled unavailable
+"""
+import pytest
+
+from fingerprints import FingerprintIndex
+from spool import WriteSpool
+
+
+def test_documents_wait_for_an_unavailable_archive(scanner, pending, tmp_path):
+    nas, local = tmp_path / "nas" / "Scanned", tmp_path / "local"
+    local.mkdir()
+    pending("a", ["Rechnung Stadtwerke"])
+    pending("b", ["Police Versicherung"])
+
+    # The NAS share isn't mounted: organize still returns at once
+    first = scanner.organize_document("a", "Stadtwerke", "2026-01-08", "Rechnung", nas)
+    second = scanner.organize_document("b", "Versicherung", "2026-02-01", "Police", local)
+    assert first["queued"] and first["saved_to"].startswith(str(nas))
+
+    result = scanner.sync_spool()
+    assert (result["written"], result["waiting"], result["unavailable"]) == (1, 1, [str(nas)])
+    assert result["queue"]["destinations"] == {str(nas): 1}
+    assert (local / "2026" / "Versicherung" / "2026-02-01_Versicherung_Police.pdf").exists()
+
+    nas.mkdir(parents=True)
+    result = scanner.sync_spool()
+    assert (result["written"], result["waiting"], result["queue"]["files"]) == (1, 0, 0)
+    assert (nas / "2026" / "Stadtwerke" / "2026-01-08_Stadtwerke_Rechnung.pdf").exists()
+
+    search = scanner.build_parser().parse_args(["search", "stadtwerke", "--output", str(nas)])
+    assert scanner.run_command(search)["total"] == 1
+
+
+def test_drain_keeps_files_that_arrived_while_offline(scanner, pending, tmp_path):
+    nas = tmp_path / "nas" / "Scanned"
+    pending("a", ["Rechnung Stadtwerke Januar"])
+    organized = scanner.organize_document("a", "Stadtwerke", "2026-01-08", "Rechnung", nas)
+    planned = nas / "2026" / "Stadtwerke" / "2026-01-08_Stadtwerke_Rechnung.pdf"
+    assert organized["saved_to"] == str(planned)
+
+    # Another machine filed a document under the same name while the share was away
+    planned.parent.mkdir(parents=True)
+    planned.write_bytes(b"%PDF-1.4 filed elsewhere")
+
+    result = scanner.sync_spool()
+    moved = planned.with_name("2026-01-08_Stadtwerke_Rechnung_1.pdf")
+    assert (result["written"], result["renamed"]) == (1, [{"from": str(planned), "to": str(moved)}])
+    assert planned.read_bytes() == b"%PDF-1.4 filed elsewhere"
+
+    search = scanner.build_parser().parse_args(["search", "januar", "--output", str(nas)])
+    assert [r["path"] for r in scanner.run_command(search)["results"]] == [str(moved)]
+    with FingerprintIndex(scanner.FINGERPRINT_FILE) as fingerprints:
+        recorded = [row["path"] for row in fingerprints.conn.execute("SELECT path FROM fingerprints")]
+    assert recorded == [str(moved)]
+
+
+def test_interrupted_drain_resumes(scanner, pending, tmp_path):
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    for doc_id in "abc":
+        pending(doc_id, [f"Brief {doc_id}"])
+        scanner.organize_document(doc_id, "Muster AG", "2026-03-01", f"Brief {doc_id}", archive)
+
+    done = []
+
+    def crash_on_second(entry):
+        if done:
+            raise KeyboardInterrupt
+        done.append(entry['dest_path'])
+
+    with WriteSpool(scanner.SPOOL_DIR) as spool:
+        with pytest.raises(KeyboardInterrupt):
+            spool.drain(lambda root: True, crash_on_second)
+        assert spool.depth()["files"] == 2
+
+    result = scanner.sync_spool()
+    assert (result["written"], result["queue"]["files"]) == (2, 0)
+    assert len(list(archive.rglob("*.pdf"))) == 3
+
+
+def test_recover_finishes_or_drops_interrupted_enqueues(tmp_path):
+    with WriteSpool(tmp_path / "spool") as spool:
+        src = tmp_path / "doc.pdf"
+        src.write_bytes(b"%PDF scan")
+        spool.enqueue(src, tmp_path / "out" / "doc.pdf", tmp_path / "out", "x")
+        spool.conn.execute("UPDATE spool SET state = 'incoming'")
+        spool.conn.execute("INSERT INTO spool (state, dest_root, dest_path, sha256, size, payload, queued_at) "
+                           "VALUES ('incoming', 'r', 'r/lost.pdf', 'y', 5, '{}', '2026-01-01')")
+        spool.conn.commit()
+
+        assert spool.recover() == 2
+        assert [entry['dest_path'] for entry in spool.entries()] == [str(tmp_path / "out" / "doc.pdf")]
+
+
+def test_only_one_drain_at_a_time(scanner):
+    with WriteSpool(scanner.SPOOL_DIR) as spool, spool.draining() as acquired:
+        assert acquired
+        assert scanner.sync_spool()["status"] == "busy"
@@ -0,0 +1,78 @@
+"""
+Tests for the streaming scan pipeline, driven by a fake scanline
+"""
+import os
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+import streaming
+
+BENCHMARKS = Path(__file__).parent.parent / "benchmarks"
+
+FAKE_SCANLINE = """
+import time
+from pathlib import Path
+sys.path.insert(0, {benchmarks!r})
+from synthetic import scan_bitmap, write_image_pdf
+args = sys.argv[1:]
+if '-list' in args:
+    print('* Fake Scanner')
+    sys.exit(0)
+out = Path(args[args.index('-dir') + 1])
+out.mkdir(parents=True, exist_ok=True)
+for n, ink in enumerate({ink!r}):
+    time.sleep({delay})
+    write_image_pdf(out / f'page-{{n:03d}}.pdf', [scan_bitmap(ink, dpi=50, seed=n)])
+open({done!r}, 'w').write(str(time.time()))
+"""
+
+
+@pytest.fixture
+def fake_scanline(tmp_path, stub_tool, monkeypatch):
+    def _install(ink, delay=0.05):
+        done = tmp_path / "scan-done"
+        stub_tool("scanline", FAKE_SCANLINE.format(benchmarks=str(BENCHMARKS), ink=ink, delay=delay, done=str(done)))
+        stub_tool("ocrmypdf", "shutil.copy(sys.argv[-2], sys.argv[-1])")
+        monkeypatch.setenv("PATH", f"{tmp_path / 'bin'}{os.pathsep}{os.environ['PATH']}")
+        return done
+    return _install
+
+
+def test_pages_are_processed_while_scanning(tmp_path, fake_scanline, monkeypatch):
+    done = fake_scanline([True, False, True, True], delay=0.4)
+    processed = []
+    original = streaming.PageStream._process_file
+
+    def recording(self, path):
+        original(self, path)
+        processed.append(time.time())
+
+    monkeypatch.setattr(streaming.PageStream, "_process_file", recording)
+    stream = streaming.PageStream(tmp_path / "single-stream", tmp_path / "ocr-cache", poll_interval=0.05)
+    result = stream.run(["scanline", "-dir", str(stream.watch_dir), "single-scan"])
+
+    assert result.returncode == 0
+    assert len(stream.landed) == 4
+    assert processed[0] < float(done.read_text())
+    assert sorted(stream.blank.values()) == [False, False, False, True]
+    assert len(stream.features) == 3
+
+
+def test_streaming_single_scan_end_to_end(scanner, tmp_path, fake_scanline, monkeypatch, capsys):
+    fake_scanline([True, False, True])
+    prefs = tmp_path / "preferences.json"
+    prefs.write_text(json.dumps({"setup_complete": True, "default_scanner": "Fake Scanner",
+                                 "default_output": str(tmp_path / "out")}))
+    monkeypatch.setattr(scanner, "PREFERENCES_FILE", prefs)
+    monkeypatch.setattr("sys.argv", ["scan_and_organize.py", "single", "--stream"])
+
+    scanner.main()
+
+    result = json.loads(capsys.readouterr().out)
+    assert result["status"] == "needs_identification"
+    assert sum(doc["pages"] for doc in result["documents"]) == 2
+    # The assembled scan went into the pending documents; the finished job keeps only its manifest
+    assert [p.name for p in (scanner.JOBS_DIR / result["job"]).iterdir()] == ["manifest.json"]
@@ -0,0 +1,88 @@
+"""
+Tests for per-stage timings, the trace log and --profile
+"""
+import os
+import json
+import pstats
+
+from synthetic import letter_page, scan_bitmap, write_image_pdf
+from timing import Timings, append_trace
+
+
+def read_trace(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_spans_add_up_per_name():
+    timings = Timings()
+    for _ in range(2):
+        with timings.span("ocr"):
+            pass
+    with timings.span("merge"):
+        pass
+
+    totals = timings.as_dict()
+
+    assert set(totals) == {"ocr", "merge", "total"}
+    assert [s['span'] for s in timings.spans] == ["ocr", "ocr", "merge"]
+    assert totals['total'] >= totals['ocr'] + totals['merge']
+
+
+def test_trace_log_rotates(tmp_path):
+    trace = tmp_path / "trace.jsonl"
+    trace.write_text("x" * 100)
+    timings = Timings()
+    with timings.span("organize_document"):
+        pass
+
+    append_trace(trace, "organize", timings, "organized", {"enabled": True, "max_bytes": 50})
+
+    assert (tmp_path / "trace.jsonl.1").read_text() == "x" * 100
+    lines = read_trace(trace)
+    assert [line['span'] for line in lines] == ["organize_document", "total"]
+    assert {line['run'] for line in lines} == {timings.run_id}
+    assert lines[0]['command'] == "organize" and lines[0]['status'] == "organized"
+
+
+def test_merge_duplex_times_merge_and_ocr(scanner, tmp_path, monkeypatch, stub_tool):
+    front_pdf = write_image_pdf(tmp_path / "front.pdf", [scan_bitmap(True, seed=1)])
+    back_pdf = write_image_pdf(tmp_path / "back.pdf", [scan_bitmap(False, seed=2)])
+    stub = stub_tool("ocrmypdf", "shutil.copy(sys.argv[-2], sys.argv[-1])")
+    monkeypatch.setenv("PATH", f"{stub.parent}{os.pathsep}{os.environ['PATH']}")
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    timings = Timings()
+
+    scanner.merge_duplex(front_pdf, back_pdf, staging, timings=timings)
+
+    assert {"merge_duplex.merge", "merge_duplex.ocr"} <= set(timings.as_dict())
+
+
+def test_command_timings_trace_and_profile(scanner, make_pdf, tmp_path):
+    pdf = make_pdf([letter_page(1, 1)])
+    pending = scanner.save_pending_documents(pdf, scanner.analyze_and_split(pdf))
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    args = scanner.build_parser().parse_args([
+        "organize", "--id", pending[0]['id'], "--sender", "Muster AG", "--date", "2026-01-08",
+        "--output", str(archive), "--timings", "--profile", "--wait"
+    ])
+
+    result = scanner.run_command(args)
+
+    assert result['status'] == "organized"
+    assert {"organize_document", "sync_spool", "total"} <= set(result['timings'])
+    stats = pstats.Stats(result['profile'])
+    assert any(func[2] == "organize_document" for func in stats.stats)
+    trace = read_trace(scanner.TRACE_FILE)
+    assert {line['span'] for line in trace} == {"organize_document", "sync_spool", "total"}
+    assert all(line['command'] == "organize" for line in trace)
+
+
+def test_timings_are_opt_in_and_trace_can_be_disabled(scanner):
+    scanner.PREFERENCES_FILE.write_text(json.dumps({"trace": {"enabled": False}}))
+
+    result = scanner.run_command(scanner.build_parser().parse_args(["sync", "--status"]))
+
+    assert "timings" not in result and "profile" not in result
+    assert not scanner.TRACE_FILE.exists()
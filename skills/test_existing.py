@@ -1,41 +1,70 @@
 #!/usr/bin/env python3
 """
-Test the document scanner on existing PDF
+Test the document scanner on an existing PDF
+
+Runs OCR (if ocrmypdf is installed), analysis and splitting on a PDF that
+was scanned earlier and saves the documents to pending, like the tail of a
+'single' scan. Staging and pending are the scanner's usual directories.
+
+Usage:
+    python3 test_existing.py path/to/scan.pdf
 """
 import sys
 from pathlib import Path
 
 # Add script directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+sys.path.insert(0, str(Path(__file__).parent / "document-scanner" / "scripts"))
+
+from scan_and_organize import (  # noqa: E402
+    OCR_CACHE_DIR, STAGING_DIR, analyze_and_split, load_preferences, save_pending_documents
+)
+from ocr_stage import ocr_available, ocr_pages, ocr_settings  # noqa: E402
 
-from scan_and_organize import ocr_pdf, analyze_pages, split_and_save
 
 def main():
-    pdf_path = Path("/Users/antonhuck/.openclaw/workspace/scan-staging/documents/2026/scan_085244.pdf")
-    
+    if len(sys.argv) != 2:
+        print(__doc__.strip().split("Usage:")[-1].strip())
+        sys.exit(2)
+
+    pdf_path = Path(sys.argv[1]).expanduser()
+    if not pdf_path.exists():
+        print(f"❌ Not found: {pdf_path}")
+        sys.exit(1)
+
     print("Testing document scanner on existing scan...")
     print(f"Input: {pdf_path}\n")
-    
+
     # OCR
     print("Step 1: OCR")
-    ocr_text = ocr_pdf(pdf_path)
+    config = ocr_settings(load_preferences())
+    if ocr_available(config):
+        STAGING_DIR.mkdir(parents=True, exist_ok=True)
+        ocr_path = STAGING_DIR / f"{pdf_path.stem}-ocr.pdf"
+        stats = ocr_pages(pdf_path, ocr_path, OCR_CACHE_DIR, config)
+        print(f"   OCR'd {stats['pages'] - stats['failed']} of {stats['pages']} pages")
+        if stats['failed'] < stats['pages']:
+            pdf_path = ocr_path
+    else:
+        print("   ocrmypdf not installed, using the PDF's own text layer")
     print()
-    
+
     # Analyze
     print("Step 2: Analyze & Group")
-    documents = analyze_pages(pdf_path, ocr_text)
+    documents = analyze_and_split(pdf_path)
+    print(f"   {len(documents)} document(s)")
     print()
-    
+
     # Split and save
     print("Step 3: Split & Save")
-    saved_files = split_and_save(pdf_path, documents)
+    pending = save_pending_documents(pdf_path, documents)
     print()
-    
+
     print("=" * 60)
-    print(f"✅ SUCCESS - Saved {len(saved_files)} document(s)")
+    print(f"✅ SUCCESS - Saved {len(pending)} document(s)")
     print("=" * 60)
-    for f in saved_files:
-        print(f"   {f}")
+    for doc in pending:
+        print(f"   {doc['pending_path']} ({doc['pages']} pages)")
+
 
 if __name__ == "__main__":
     main()